@@ -0,0 +1,324 @@
+# backend/admission.py
+#
+# Admission control, applied to every HTTP request before it reaches a route:
+#
+#   - load shedding: while the event loop lags, or requests wait for a database
+#     connection, longer than the thresholds below, new requests get 503 with Retry-After
+#     instead of queueing behind the ones already in flight. Both signals are the largest
+#     value measured over the last LOAD_SHED_WINDOW_SECONDS.
+#   - rate limiting: a token bucket per client and route class (ROUTE_CLASSES, LIMITS);
+#     a request that finds its bucket empty gets 429 with Retry-After. Clients are the
+#     token's user, or the remote address for requests without a valid token. Logins are
+#     limited per submitted username and address, so people behind one NAT or proxy don't
+#     share a bucket; the address only gets a much looser flood guard ("auth").
+#
+# Both checks run before the body is read, with two exceptions: a login's form is read for
+# the username, and a new comment's body is read up to its first file part, if any, to tell
+# an upload from a plain comment. Only that much of a rejected upload is ever read.
+#
+# Health checks (EXEMPT_PATHS), CORS preflights and WebSockets (/ws) are never rejected.
+# RATE_LIMIT_ENABLED=0 and LOAD_SHED_ENABLED=0 turn the checks off, e.g. for load tests.
+
+import asyncio
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional
+
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+import database, security
+from principal_cache import principal_cache
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+LOAD_SHED_ENABLED = os.getenv("LOAD_SHED_ENABLED", "1") == "1"
+LOAD_SHED_LOOP_LAG_SECONDS = float(os.getenv("LOAD_SHED_LOOP_LAG_SECONDS", "0.25"))
+LOAD_SHED_POOL_WAIT_SECONDS = float(os.getenv("LOAD_SHED_POOL_WAIT_SECONDS", "1.0"))
+LOAD_SHED_WINDOW_SECONDS = float(os.getenv("LOAD_SHED_WINDOW_SECONDS", "2"))
+LOAD_SHED_RETRY_AFTER_SECONDS = int(os.getenv("LOAD_SHED_RETRY_AFTER_SECONDS", "2"))
+
+# How often the event loop's lag is sampled.
+LAG_SAMPLE_INTERVAL_SECONDS = 0.1
+# Most of a body read to classify or key a request. A login form is far smaller; a comment
+# whose file part hasn't started by then counts as an upload.
+PEEK_MAX_BYTES = 64 * 1024
+
+EXEMPT_PATHS = {"/", "/metrics"}
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # requests per second, sustained
+    burst: int   # requests allowed at once from a full bucket
+
+# Route class per client -> its limit.
+LIMITS = {
+    "read": Limit(rate=20, burst=60),
+    "write": Limit(rate=5, burst=20),
+    "upload": Limit(rate=1, burst=5),
+    "bulk": Limit(rate=0.2, burst=3),
+    "search": Limit(rate=5, burst=15),
+    "login": Limit(rate=0.5, burst=10),  # per username and address
+    "auth": Limit(rate=10, burst=100),   # per address: logins and sign-ups, everyone behind it
+}
+
+# (methods, path pattern, route class); the first match wins. A class of None means the
+# request isn't rate limited. "comment" is decided from the body: "upload" with a file,
+# "write" without; "login" is also charged to the address's "auth" bucket.
+ROUTE_CLASSES = [
+    ({"GET", "HEAD"}, re.compile(r"/uploads/.*"), None),
+    ({"POST"}, re.compile(r"/comments/?"), "comment"),
+    ({"POST"}, re.compile(r"/tasks/bulk(/assign)?"), "bulk"),
+    ({"POST"}, re.compile(r"/token"), "login"),
+    ({"POST"}, re.compile(r"/users/?"), "auth"),
+    ({"GET"}, re.compile(r"/search"), "search"),
+    ({"GET", "HEAD"}, re.compile(r".*"), "read"),
+    (None, re.compile(r".*"), "write"),
+]
+
+def route_class(method: str, path: str) -> Optional[str]:
+    for methods, pattern, name in ROUTE_CLASSES:
+        if (methods is None or method in methods) and pattern.fullmatch(path):
+            return name
+    return None
+
+def address_key(scope) -> str:
+    client = scope.get("client")
+    return f"address:{client[0] if client else 'unknown'}"
+
+def client_key(scope) -> str:
+    # The user a bearer token belongs to, from the principal cache or the token itself;
+    # otherwise the remote address. Invalid tokens count against the address.
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        principal = principal_cache.peek(token)
+        if principal is not None:
+            return f"user:{principal.email}"
+        try:
+            subject = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return address_key(scope)
+
+# A multipart part header for a file (file fields carry a filename, text fields don't).
+FILE_PART = re.compile(rb'\r\ncontent-disposition:[^\r\n]*;\s*filename\*?=', re.IGNORECASE)
+
+class BodyPeek:
+    """Reads the start of a request body and hands everything read to the app again."""
+
+    def __init__(self, receive):
+        self._receive = receive
+        self._messages: List[dict] = []
+        self.body = b""
+        self.complete = False
+
+    async def read_more(self):
+        message = await self._receive()
+        self._messages.append(message)
+        if message["type"] == "http.request":
+            self.body += message.get("body", b"")
+            self.complete = not message.get("more_body", False)
+        else:  # http.disconnect
+            self.complete = True
+
+    async def read(self, max_bytes: int = PEEK_MAX_BYTES) -> bool:
+        # Reads until the body ends or max_bytes are buffered; True if the whole body is in.
+        while not self.complete and len(self.body) < max_bytes:
+            await self.read_more()
+        return self.complete
+
+    async def receive(self):
+        # The app's receive: the buffered messages first, then the rest of the body.
+        if self._messages:
+            return self._messages.pop(0)
+        return await self._receive()
+
+async def comment_class(peek: BodyPeek) -> str:
+    # "upload" once a file part shows up, "write" if the body ends without one.
+    while True:
+        if FILE_PART.search(b"\r\n" + peek.body):
+            return "upload"
+        if peek.complete:
+            return "write"
+        if len(peek.body) >= PEEK_MAX_BYTES:
+            return "upload"
+        await peek.read_more()
+
+async def login_key(scope, peek: BodyPeek) -> str:
+    # The submitted username together with the address; the address alone if the form
+    # can't be read.
+    username = None
+    if await peek.read():
+        async def buffered():
+            return {"type": "http.request", "body": peek.body, "more_body": False}
+
+        try:
+            form = await Request(scope, buffered).form()
+            username = form.get("username")
+            await form.close()
+        except Exception:
+            pass
+    if not isinstance(username, str) or not username:
+        return address_key(scope)
+    return f"{address_key(scope)} username:{username.strip().lower()}"
+
+class RateLimiter:
+    """Token buckets per (client, route class), in a bounded LRU. Only touched from the
+    event loop, so no locking; a bucket evicted from the LRU starts over full."""
+
+    def __init__(self, limits: dict = LIMITS, max_clients: int = RATE_LIMIT_MAX_CLIENTS):
+        self.limits = limits
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[tuple, tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, client: str, route_class: str) -> float:
+        # Takes a token; returns 0 if one was available, else the seconds until there is.
+        limit = self.limits[route_class]
+        key = (client, route_class)
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+class RecentMax:
+    """Largest value observed over roughly the last `window` seconds. Thread-safe: pool
+    checkouts are timed on threadpool threads."""
+
+    def __init__(self, window: float = LOAD_SHED_WINDOW_SECONDS):
+        self.window = window
+        self._current = 0.0
+        self._previous = 0.0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._roll()
+            self._current = max(self._current, value)
+
+    def value(self) -> float:
+        with self._lock:
+            self._roll()
+            return max(self._current, self._previous)
+
+    def _roll(self):
+        # Two consecutive half-windows; the older one is dropped as time moves on.
+        elapsed = time.monotonic() - self._started
+        if elapsed >= self.window / 2:
+            self._previous = self._current if elapsed < self.window else 0.0
+            self._current = 0.0
+            self._started = time.monotonic()
+
+class LoadMonitor:
+    """Measures event-loop lag (a task that sleeps and checks how late it woke up) and
+    connection-pool wait (time spent in pool.connect()), and decides when to shed load."""
+
+    def __init__(self, loop_lag_threshold: float = LOAD_SHED_LOOP_LAG_SECONDS, pool_wait_threshold: float = LOAD_SHED_POOL_WAIT_SECONDS):
+        self.loop_lag_threshold = loop_lag_threshold
+        self.pool_wait_threshold = pool_wait_threshold
+        self.loop_lag = RecentMax()
+        self.pool_wait = RecentMax()
+        self._task: Optional[asyncio.Task] = None
+
+    def watch_pool(self, engine):
+        # Wraps the pool's connect(), which is where a checkout blocks once the pool is
+        # exhausted. The timing covers opening new connections too.
+        pool = engine.pool
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                self.pool_wait.observe(time.perf_counter() - started)
+
+        pool.connect = timed_connect
+        return engine
+
+    async def start(self):
+        self._task = asyncio.create_task(self._sample_loop_lag())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _sample_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_SAMPLE_INTERVAL_SECONDS
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL_SECONDS)
+            self.loop_lag.observe(max(0.0, loop.time() - expected))
+
+    def overload_reason(self) -> Optional[str]:
+        if self.loop_lag.value() > self.loop_lag_threshold:
+            return "loop_lag"
+        if self.pool_wait.value() > self.pool_wait_threshold:
+            return "pool_wait"
+        return None
+
+rate_limiter = RateLimiter()
+load_monitor = LoadMonitor()
+# (reason, route class) -> rejected requests; reasons are rate_limited, loop_lag, pool_wait.
+rejections: Counter = Counter()
+
+for _engine in {database.engine, database.read_engine, database.async_engine.sync_engine}:
+    load_monitor.watch_pool(_engine)
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load and enforces the rate limits (see the top of this file)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+        name = route_class(scope["method"], scope["path"])
+        if LOAD_SHED_ENABLED:
+            reason = load_monitor.overload_reason()
+            if reason is not None:
+                rejections[(reason, name)] += 1
+                response = JSONResponse({"detail": "Server is overloaded, try again shortly"}, status_code=503,
+                                        headers={"Retry-After": str(LOAD_SHED_RETRY_AFTER_SECONDS)})
+                return await response(scope, receive, send)
+        if RATE_LIMIT_ENABLED and name is not None:
+            # (client, route class) buckets the request takes a token from, in order.
+            if name in ("comment", "login"):
+                peek = BodyPeek(receive)
+                receive = peek.receive
+            if name == "comment":
+                name = await comment_class(peek)
+            if name == "login":
+                charges = [(address_key(scope), "auth"), (await login_key(scope, peek), "login")]
+            else:
+                charges = [(client_key(scope), name)]
+            for client, charged in charges:
+                wait = rate_limiter.acquire(client, charged)
+                if wait:
+                    rejections[("rate_limited", charged)] += 1
+                    response = JSONResponse({"detail": "Too many requests"}, status_code=429, headers={"Retry-After": str(math.ceil(wait))})
+                    return await response(scope, receive, send)
+        await self.app(scope, receive, send)
@@ -27,7 +27,20 @@ sys.path.insert(0, dirname(dirname(abspath(__file__))))
 
 from database import Base
 import models # Make sure models are imported
+
+# DATABASE_URL overrides sqlalchemy.url so migrations target the same database as the app.
+import os
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
 target_metadata = Base.metadata
+from search import SEARCH_TABLE_PREFIXES
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The FTS5 search tables are raw SQL (see search.py); keep autogenerate from dropping them.
+    if type_ == "table" and reflected and compare_to is None and name.startswith(SEARCH_TABLE_PREFIXES):
+        return False
+    return True
 # -------------------------------------------
 
 # other values from the config, defined by the needs of env.py,
@@ -46,6 +59,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -64,7 +78,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
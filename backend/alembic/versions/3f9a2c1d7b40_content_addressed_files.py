@@ -0,0 +1,34 @@
+"""Content-addressed file uploads
+
+Revision ID: 3f9a2c1d7b40
+Revises: c65eee8715be
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a2c1d7b40'
+down_revision: Union[str, Sequence[str], None] = 'c65eee8715be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('size', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_files_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_files_content_hash'))
+        batch_op.drop_column('size')
+        batch_op.drop_column('content_hash')
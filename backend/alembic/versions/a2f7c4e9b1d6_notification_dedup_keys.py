@@ -0,0 +1,38 @@
+"""Dedup keys on the notification log; outbox event ids are never reused
+
+Revision ID: a2f7c4e9b1d6
+Revises: b9d4e7a1c3f5
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2f7c4e9b1d6'
+down_revision: Union[str, Sequence[str], None] = 'b9d4e7a1c3f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('outbox_events', recreate='always', table_kwargs={'sqlite_autoincrement': True}):
+            pass
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.add_column(sa.Column('dedup_key', sa.String(), nullable=True))
+        batch_op.create_unique_constraint('uq_notifications_user_dedup_key', ['user_id', 'dedup_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.drop_constraint('uq_notifications_user_dedup_key', type_='unique')
+        batch_op.drop_column('dedup_key')
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('outbox_events', recreate='always', table_kwargs={'sqlite_autoincrement': False}):
+            pass
@@ -0,0 +1,69 @@
+"""Full-text search over tasks and comments
+
+Revision ID: a4e9c2f7d3b8
+Revises: f1b6c3d9e2a7
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e9c2f7d3b8'
+down_revision: Union[str, Sequence[str], None] = 'f1b6c3d9e2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite-only; other backends keep working without /search.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    # External-content indexes: text stays in tasks/comments, triggers keep the index in step.
+    op.execute(f"CREATE VIRTUAL TABLE tasks_fts USING fts5(title, description, content='tasks', content_rowid='id', prefix='2 3', tokenize='{TOKENIZER}')")
+    op.execute(
+        "CREATE TRIGGER tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+        "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+        "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END"
+    )
+    op.execute(f"CREATE VIRTUAL TABLE comments_fts USING fts5(content, content='comments', content_rowid='id', prefix='2 3', tokenize='{TOKENIZER}')")
+    op.execute(
+        "CREATE TRIGGER comments_fts_ai AFTER INSERT ON comments BEGIN "
+        "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END"
+    )
+    op.execute(
+        "CREATE TRIGGER comments_fts_ad AFTER DELETE ON comments BEGIN "
+        "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); END"
+    )
+    op.execute(
+        "CREATE TRIGGER comments_fts_au AFTER UPDATE OF content ON comments BEGIN "
+        "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+        "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END"
+    )
+    # Index the rows that already exist.
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('comments_fts_au', 'comments_fts_ad', 'comments_fts_ai', 'tasks_fts_au', 'tasks_fts_ad', 'tasks_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS comments_fts")
+    op.execute("DROP TABLE IF EXISTS tasks_fts")
@@ -0,0 +1,119 @@
+"""Archive tables for finished tasks, comments and files
+
+Revision ID: b9d4e7a1c3f5
+Revises: c8f2a5d7e1b4
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4e7a1c3f5'
+down_revision: Union[str, Sequence[str], None] = 'c8f2a5d7e1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Archived rows keep their ids, so the hot tables must never hand one out again.
+AUTOINCREMENT_TABLES = ('tasks', 'comments', 'files')
+
+# Rebuilding tasks and comments drops the full-text search triggers (see search.py).
+SEARCH_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN "
+    "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN "
+    "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF content ON comments BEGIN "
+    "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+
+def _rebuild_tables(autoincrement: bool) -> None:
+    for table in AUTOINCREMENT_TABLES:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+            pass
+    for statement in SEARCH_TRIGGERS:
+        op.execute(statement)
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('archived_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('deadline', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('dashboard_id', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('row_version', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['dashboard_id'], ['dashboards.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_tasks_dashboard_id'), 'archived_tasks', ['dashboard_id'], unique=False)
+    op.create_table('archived_task_workers',
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['archived_tasks.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('task_id', 'user_id')
+    )
+    op.create_index(op.f('ix_archived_task_workers_user_id'), 'archived_task_workers', ['user_id'], unique=False)
+    op.create_table('archived_comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('task_id', sa.Integer(), nullable=True),
+    sa.Column('author_id', sa.Integer(), nullable=True),
+    sa.Column('parent_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'APPROVED', 'REJECTED', name='commentstatus'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('row_version', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['parent_id'], ['archived_comments.id'], ),
+    sa.ForeignKeyConstraint(['task_id'], ['archived_tasks.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_comments_task_id'), 'archived_comments', ['task_id'], unique=False)
+    op.create_table('archived_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('file_path', sa.String(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('comment_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['comment_id'], ['archived_comments.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_files_comment_id'), 'archived_files', ['comment_id'], unique=False)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_tables(autoincrement=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        _rebuild_tables(autoincrement=False)
+    op.drop_index(op.f('ix_archived_files_comment_id'), table_name='archived_files')
+    op.drop_table('archived_files')
+    op.drop_index(op.f('ix_archived_comments_task_id'), table_name='archived_comments')
+    op.drop_table('archived_comments')
+    op.drop_index(op.f('ix_archived_task_workers_user_id'), table_name='archived_task_workers')
+    op.drop_table('archived_task_workers')
+    op.drop_index(op.f('ix_archived_tasks_dashboard_id'), table_name='archived_tasks')
+    op.drop_table('archived_tasks')
@@ -0,0 +1,30 @@
+"""Indexes on file paths for blob reference counts
+
+Revision ID: c4d7e2a9f1b3
+Revises: e3a8d6f2c9b4
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7e2a9f1b3'
+down_revision: Union[str, Sequence[str], None] = 'e3a8d6f2c9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_files_file_path'), 'files', ['file_path'], unique=False)
+    op.create_index(op.f('ix_archived_files_file_path'), 'archived_files', ['file_path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_archived_files_file_path'), table_name='archived_files')
+    op.drop_index(op.f('ix_files_file_path'), table_name='files')
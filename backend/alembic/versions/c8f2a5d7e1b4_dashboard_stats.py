@@ -0,0 +1,54 @@
+"""Incrementally maintained dashboard statistics
+
+Revision ID: c8f2a5d7e1b4
+Revises: e5b8d1f4a6c2
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2a5d7e1b4'
+down_revision: Union[str, Sequence[str], None] = 'e5b8d1f4a6c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same counters as dashboard_stats.rebuild, in SQL so the migration doesn't depend on app
+# code. Comment statuses are stored as enum names; the counters use the lower-case values.
+BACKFILL = [
+    "INSERT INTO dashboard_stats (dashboard_id, kind, key, count) "
+    "SELECT dashboard_id, 'task_status', COALESCE(status, 'Pending'), COUNT(*) FROM tasks "
+    "WHERE dashboard_id IS NOT NULL GROUP BY dashboard_id, COALESCE(status, 'Pending')",
+    "INSERT INTO dashboard_stats (dashboard_id, kind, key, count) "
+    "SELECT t.dashboard_id, 'worker_tasks', CAST(tw.user_id AS TEXT), COUNT(*) FROM task_workers tw JOIN tasks t ON t.id = tw.task_id "
+    "WHERE t.dashboard_id IS NOT NULL GROUP BY t.dashboard_id, tw.user_id",
+    "INSERT INTO dashboard_stats (dashboard_id, kind, key, count) "
+    "SELECT t.dashboard_id, 'worker_open_tasks', CAST(tw.user_id AS TEXT), COUNT(*) FROM task_workers tw JOIN tasks t ON t.id = tw.task_id "
+    "WHERE t.dashboard_id IS NOT NULL AND COALESCE(t.status, 'Pending') != 'Completed' GROUP BY t.dashboard_id, tw.user_id",
+    "INSERT INTO dashboard_stats (dashboard_id, kind, key, count) "
+    "SELECT t.dashboard_id, 'comment_status', LOWER(COALESCE(c.status, 'PENDING')), COUNT(*) FROM comments c JOIN tasks t ON t.id = c.task_id "
+    "WHERE t.dashboard_id IS NOT NULL GROUP BY t.dashboard_id, LOWER(COALESCE(c.status, 'PENDING'))",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dashboard_stats',
+    sa.Column('dashboard_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['dashboard_id'], ['dashboards.id'], ),
+    sa.PrimaryKeyConstraint('dashboard_id', 'kind', 'key')
+    )
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dashboard_stats')
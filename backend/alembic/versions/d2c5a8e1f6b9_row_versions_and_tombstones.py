@@ -0,0 +1,66 @@
+"""Row versions and tombstones for the sync feed
+
+Revision ID: d2c5a8e1f6b9
+Revises: b7e3f0a4c2d1
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c5a8e1f6b9'
+down_revision: Union[str, Sequence[str], None] = 'b7e3f0a4c2d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('dashboards', 'tasks', 'comments')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite can't ADD COLUMN with a CURRENT_TIMESTAMP default, so the tables are rebuilt.
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True))
+            batch_op.add_column(sa.Column('row_version', sa.Integer(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_row_version'), ['row_version'], unique=False)
+
+    op.create_table('change_counter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('dashboard_id', sa.Integer(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('row_version', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tombstones_id'), 'tombstones', ['id'], unique=False)
+    op.create_index(op.f('ix_tombstones_row_version'), 'tombstones', ['row_version'], unique=False)
+
+    # Existing rows become version 1 so a first sync (since=0) includes them.
+    for table in VERSIONED_TABLES:
+        op.execute(f"UPDATE {table} SET row_version = 1")
+    op.execute("INSERT INTO change_counter (id, version) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tombstones_row_version'), table_name='tombstones')
+    op.drop_index(op.f('ix_tombstones_id'), table_name='tombstones')
+    op.drop_table('tombstones')
+    op.drop_table('change_counter')
+    for table in VERSIONED_TABLES:
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_row_version'))
+            batch_op.drop_column('row_version')
+            batch_op.drop_column('updated_at')
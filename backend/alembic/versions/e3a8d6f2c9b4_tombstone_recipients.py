@@ -0,0 +1,30 @@
+"""Tombstone copies addressed to a dashboard's workers
+
+Revision ID: e3a8d6f2c9b4
+Revises: a2f7c4e9b1d6
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a8d6f2c9b4'
+down_revision: Union[str, Sequence[str], None] = 'a2f7c4e9b1d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('tombstones') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('tombstones') as batch_op:
+        batch_op.drop_column('user_id')
@@ -0,0 +1,32 @@
+"""Composite indexes for paged task listings
+
+Revision ID: e5b8d1f4a6c2
+Revises: a4e9c2f7d3b8
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d1f4a6c2'
+down_revision: Union[str, Sequence[str], None] = 'a4e9c2f7d3b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tasks_dashboard_status', 'tasks', ['dashboard_id', 'status'], unique=False)
+    op.create_index('ix_tasks_dashboard_deadline', 'tasks', ['dashboard_id', 'deadline'], unique=False)
+    op.create_index('ix_tasks_dashboard_title', 'tasks', ['dashboard_id', 'title'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_dashboard_title', table_name='tasks')
+    op.drop_index('ix_tasks_dashboard_deadline', table_name='tasks')
+    op.drop_index('ix_tasks_dashboard_status', table_name='tasks')
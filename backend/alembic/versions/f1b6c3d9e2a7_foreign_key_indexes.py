@@ -0,0 +1,39 @@
+"""Indexes on foreign keys and comment threads
+
+Revision ID: f1b6c3d9e2a7
+Revises: d2c5a8e1f6b9
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6c3d9e2a7'
+down_revision: Union[str, Sequence[str], None] = 'd2c5a8e1f6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Also serves plain task_id lookups, so comments.task_id needs no index of its own.
+    op.create_index('ix_comments_task_parent_created', 'comments', ['task_id', 'parent_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_comments_parent_id'), 'comments', ['parent_id'], unique=False)
+    op.create_index(op.f('ix_dashboards_owner_id'), 'dashboards', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_files_comment_id'), 'files', ['comment_id'], unique=False)
+    op.create_index(op.f('ix_task_workers_user_id'), 'task_workers', ['user_id'], unique=False)
+    op.create_index(op.f('ix_tasks_dashboard_id'), 'tasks', ['dashboard_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tasks_dashboard_id'), table_name='tasks')
+    op.drop_index(op.f('ix_task_workers_user_id'), table_name='task_workers')
+    op.drop_index(op.f('ix_files_comment_id'), table_name='files')
+    op.drop_index(op.f('ix_dashboards_owner_id'), table_name='dashboards')
+    op.drop_index(op.f('ix_comments_parent_id'), table_name='comments')
+    op.drop_index('ix_comments_task_parent_created', table_name='comments')
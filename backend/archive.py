@@ -0,0 +1,157 @@
+# backend/archive.py
+#
+# Archival tier. Tasks in a terminal status (ARCHIVE_STATUSES) that haven't changed, and
+# haven't had comment activity, for ARCHIVE_AFTER_DAYS are moved with their worker
+# assignments, comments and file records out of the hot tables into archived_tasks,
+# archived_task_workers, archived_comments and archived_files. Rows keep their ids and
+# columns. The hot tables and their indexes then only hold work people still open, so
+# listings, thread loads, the sync scans and the page cache stay small.
+#
+# Archived tasks are read-only: the task and comment read routes include them with
+# ?include_archived=true, and POST /tasks/{id}/restore moves one back.
+#
+# What archiving leaves as it is:
+#   - dashboard statistics: archived tasks still count (dashboard_stats.rebuild reads both tiers)
+#   - sync: no tombstones are written; clients keep the copy they have, which hasn't
+#     changed since. Restored rows get a new row_version so they sync again.
+#   - uploads: archived file records still reference their blobs (see file_storage)
+# Search covers the hot tables only; the FTS triggers drop archived rows and re-index
+# restored ones.
+#
+# Rows are moved with INSERT ... SELECT and DELETE statements, one transaction per batch of
+# ARCHIVE_BATCH_SIZE tasks, so the write lock is released between batches. Those skip the
+# session hooks, so the workers' cached visibility is invalidated here (see visibility.py).
+#
+# Run it from cron, or in-process every ARCHIVE_INTERVAL_SECONDS (0, the default, leaves
+# that off):
+#   python -m archive                 # archive everything that is due
+#   python -m archive --days 30       # with a different age threshold
+#   python -m archive --restore 42    # move task 42 back
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+import models, versioning, visibility
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+# Task statuses that are final; status is free text, so this is configurable.
+ARCHIVE_STATUSES = tuple(status.strip() for status in os.getenv("ARCHIVE_STATUSES", "Completed").split(",") if status.strip())
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+# (task, assignment, comment, file) tables of each tier, parents first.
+HOT = (models.Task, models.TaskWorkers, models.Comment, models.File)
+ARCHIVE = (models.ArchivedTask, models.ArchivedTaskWorkers, models.ArchivedComment, models.ArchivedFile)
+
+def _move(db: Session, task_ids: List[int], source, target, values: Optional[dict] = None):
+    # Copies the tasks and everything hanging off them from the `source` tier to `target`,
+    # then deletes them from `source`. `values` maps a target model to column overrides.
+    task, workers, comment, file = (model.__table__ for model in source)
+    scopes = (
+        task.c.id.in_(task_ids),
+        workers.c.task_id.in_(task_ids),
+        comment.c.task_id.in_(task_ids),
+        file.c.comment_id.in_(select(comment.c.id).where(comment.c.task_id.in_(task_ids))),
+    )
+    for source_table, target_model, scope in zip((task, workers, comment, file), target, scopes):
+        overrides = (values or {}).get(target_model, {})
+        names = [column.name for column in target_model.__table__.columns if column.name in source_table.c]
+        rows = select(*(overrides.get(name, source_table.c[name]) for name in names)).where(scope)
+        db.execute(insert(target_model.__table__).from_select(names, rows))
+    # Children first: the file scope reads the comments it is about to delete.
+    for source_table, scope in reversed(list(zip((task, workers, comment, file), scopes))):
+        db.execute(delete(source_table).where(scope))
+
+def _workers(db: Session, assignments, task_ids: Iterable[int]) -> set:
+    return set(db.scalars(select(assignments.user_id).where(assignments.task_id.in_(task_ids))))
+
+def due_task_ids(db: Session, cutoff: datetime, limit: int) -> List[int]:
+    # Terminal tasks last changed before `cutoff` whose comments are all older too.
+    Task, Comment = models.Task, models.Comment
+    recent_comments = select(Comment.id).where(Comment.task_id == Task.id, Comment.updated_at >= cutoff)
+    return db.scalars(
+        select(Task.id).where(Task.status.in_(ARCHIVE_STATUSES), Task.updated_at < cutoff, ~recent_comments.exists())
+        .order_by(Task.id).limit(limit)
+    ).all()
+
+def archive_tasks(db: Session, task_ids: List[int]):
+    # Moves the tasks to the archive in the caller's transaction.
+    if not task_ids:
+        return
+    workers = _workers(db, models.TaskWorkers, task_ids)
+    _move(db, task_ids, HOT, ARCHIVE)
+    # Their assignments no longer show the workers these tasks or, possibly, their dashboards.
+    visibility.mark_stale(db, workers)
+
+def restore_tasks(db: Session, task_ids: List[int]) -> List[int]:
+    """Moves archived tasks back in the caller's transaction; returns the ids that were archived."""
+    ArchivedTask = models.ArchivedTask
+    found = db.scalars(select(ArchivedTask.id).where(ArchivedTask.id.in_(task_ids))).all() if task_ids else []
+    if not found:
+        return []
+    workers = _workers(db, models.ArchivedTaskWorkers, found)
+    version = literal(versioning.next_version(db))
+    # A fresh updated_at keeps the next run from archiving them straight away.
+    _move(db, found, ARCHIVE, HOT, values={
+        models.Task: {"row_version": version, "updated_at": func.now()},
+        models.Comment: {"row_version": version},
+    })
+    visibility.mark_stale(db, workers)
+    return found
+
+def archive_due(db: Session, older_than_days: Optional[int] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Archives every task that is due, committing per batch; returns how many were moved."""
+    if older_than_days is None:
+        older_than_days = ARCHIVE_AFTER_DAYS
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        task_ids = due_task_ids(db, cutoff, batch_size)
+        archive_tasks(db, task_ids)
+        db.commit()
+        archived += len(task_ids)
+        if len(task_ids) < batch_size:
+            return archived
+
+def _run_once() -> int:
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        return archive_due(db)
+
+async def run_periodically(interval: float = ARCHIVE_INTERVAL_SECONDS):
+    # Started from the app's lifespan when ARCHIVE_INTERVAL_SECONDS is set. Every process
+    # may run it: batches are separate transactions and re-select what is still due.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await asyncio.to_thread(_run_once)
+            if archived:
+                logger.info("Archived %s tasks", archived)
+        except Exception:
+            logger.exception("Archival run failed")
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move finished tasks, with their comments and files, to the archive tables.")
+    parser.add_argument("--days", type=int, help=f"Archive tasks unchanged for this many days (default {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Tasks moved per transaction")
+    parser.add_argument("--restore", type=int, nargs="+", metavar="TASK_ID", help="Move these archived tasks back instead")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        if args.restore:
+            restored = restore_tasks(db, args.restore)
+            db.commit()
+            print(f"Restored {len(restored)} tasks")
+        else:
+            print(f"Archived {archive_due(db, args.days, args.batch_size)} tasks")
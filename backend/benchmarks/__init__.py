@@ -0,0 +1,4 @@
+# backend/benchmarks
+#
+# Standalone benchmark scripts. Run them from the backend directory, e.g.
+#   python -m benchmarks.async_db
@@ -0,0 +1,85 @@
+# backend/benchmarks/async_db.py
+#
+# Compares the old path (sync crud called directly from async code) with crud_async under
+# concurrent load. It reports throughput and the worst event-loop stall seen by a heartbeat
+# task, which is what WebSockets and other in-flight requests experience.
+#
+#   python -m benchmarks.async_db --users 2000 --concurrency 50 --requests 4000
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import crud, crud_async, models
+from database import Base
+
+def seed(url: str, users: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add_all([models.User(email=f"user{i}@bench.local", hashed_password="x", full_name=f"User {i}") for i in range(users)])
+        db.commit()
+    engine.dispose()
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def run(label: str, lookup, users: int, concurrency: int, requests: int):
+    per_worker = requests // concurrency
+
+    async def worker(offset: int):
+        for i in range(per_worker):
+            await lookup(f"user{(offset * per_worker + i) % users}@bench.local")
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await beat
+    total = per_worker * concurrency
+    print(f"{label:<12} {total / elapsed:>10.0f} req/s   max loop lag {worst_lag * 1000:>8.1f} ms")
+
+async def main(users: int, concurrency: int, requests: int):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    seed(f"sqlite:///{path}", users)
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    SyncSession = sessionmaker(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def sync_lookup(email):
+        # Before: what the async routes did, blocking the loop for the whole query.
+        with SyncSession() as db:
+            crud.get_user_by_email(db, email)
+
+    async def async_lookup(email):
+        async with AsyncSession() as db:
+            await crud_async.get_user_by_email(db, email)
+
+    print(f"{users} users, {concurrency} concurrent clients, {requests} lookups")
+    await run("sync crud", sync_lookup, users, concurrency, requests)
+    await run("crud_async", async_lookup, users, concurrency, requests)
+    engine.dispose()
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async CRUD under concurrent load.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.concurrency, args.requests))
@@ -0,0 +1,72 @@
+# backend/benchmarks/fanout.py
+#
+# Fan-out latency for one broadcast to many recipients, using in-memory fake sockets. A share
+# of the clients is slow; the rest should not be held up by them. The sequential baseline
+# awaits each send in turn, as ConnectionManager used to.
+#
+#   python -m benchmarks.fanout --recipients 1000 --slow 10 --slow-delay 0.5
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from connection_manager import ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self, delay: float, deliveries: list):
+        self.delay = delay
+        self.deliveries = deliveries
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.delay)
+        self.deliveries.append((self, time.perf_counter()))
+
+    async def close(self):
+        pass
+
+def report(label, started, deliveries, fast):
+    latencies = sorted((at - started) * 1000 for ws, at in deliveries if ws in fast)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<12} fast clients: {len(latencies):>5} delivered  p50 {statistics.median(latencies):>8.2f} ms  p99 {p99:>8.2f} ms  max {latencies[-1]:>8.2f} ms")
+
+async def main(recipients: int, slow: int, slow_delay: float, send_delay: float):
+    message = {"type": "new_comment", "payload": {"taskId": 1, "commentId": 1}}
+    user_ids = list(range(recipients))
+
+    deliveries = []
+    sockets = [FakeWebSocket(slow_delay if i < slow else send_delay, deliveries) for i in user_ids]
+    fast = set(sockets[slow:])
+    started = time.perf_counter()
+    for ws in sockets:
+        await ws.send_json(message)
+    report("sequential", started, deliveries, fast)
+
+    deliveries = []
+    sockets = [FakeWebSocket(slow_delay if i < slow else send_delay, deliveries) for i in user_ids]
+    fast = set(sockets[slow:])
+    manager = ConnectionManager()
+    for user_id, ws in zip(user_ids, sockets):
+        await manager.connect(ws, user_id)
+    started = time.perf_counter()
+    await manager.broadcast_to_users(message, user_ids)
+    enqueued = (time.perf_counter() - started) * 1000
+    while len(deliveries) < recipients - slow:
+        await asyncio.sleep(0.001)
+    report("queued", started, deliveries, fast)
+    print(f"{'':<12} broadcast_to_users returned after {enqueued:.2f} ms")
+    for user_id in user_ids:
+        manager.disconnect(user_id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebSocket fan-out latency.")
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=10)
+    parser.add_argument("--slow-delay", type=float, default=0.5)
+    parser.add_argument("--send-delay", type=float, default=0.0005)
+    args = parser.parse_args()
+    print(f"{args.recipients} recipients, {args.slow} slow ({args.slow_delay * 1000:g} ms per send)")
+    asyncio.run(main(args.recipients, args.slow, args.slow_delay, args.send_delay))
@@ -0,0 +1,222 @@
+# backend/benchmarks/load.py
+#
+# End-to-end load test. Seeds a fresh SQLite database (benchmarks.seed), starts the app
+# in-process with its lifespan, and drives each endpoint scenario with --concurrency
+# clients over httpx's ASGI transport, so the numbers cover routing, dependencies, SQL and
+# serialization without any network in the way. Per scenario it reports throughput,
+# p50/p95/p99 latency, SQL statements per request and error responses.
+#
+# --save writes the results (with the scale and settings they were measured at) as a JSON
+# baseline; --compare reads one back, prints the change per scenario and exits with status 1
+# if p95 latency grew by more than --tolerance or a scenario now issues more queries.
+#
+#   python -m benchmarks.load --requests 300 --concurrency 10 --save baseline.json
+#   python -m benchmarks.load --requests 300 --concurrency 10 --compare baseline.json
+#   python -m benchmarks.load --scenarios dashboards.list,comments.create --managers 20
+
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+import httpx
+
+# The app reads its database settings at import time, so point them at a fresh benchmark
+# database before any backend module is imported.
+BENCHMARK_DB = os.path.join(tempfile.mkdtemp(), "load.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{BENCHMARK_DB}"
+for name in ("ASYNC_DATABASE_URL", "DATABASE_READ_URL"):
+    os.environ.pop(name, None)
+# Each scenario is one user at full speed: without this every run measures the rate
+# limits and load shedding (admission.py). Set them to 1 to measure those instead.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOAD_SHED_ENABLED", "0")
+
+from benchmarks import seed as seeder
+
+_query_counter = contextvars.ContextVar("benchmark_query_counter", default=None)
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+# name -> (role, request builder). Builders get the seeded ids and a Random and return
+# (method, url, keyword arguments for httpx).
+SCENARIOS = {
+    "dashboards.list": ("manager", lambda ids, rng: ("GET", "/dashboards/", {})),
+    "dashboards.summary": ("ceo", lambda ids, rng: ("GET", "/dashboards/summary", {})),
+    "dashboards.stats": ("manager", lambda ids, rng: ("GET", f"/dashboards/{rng.choice(ids['dashboards'])}/stats", {})),
+    "tasks.dashboard": ("manager", lambda ids, rng: ("GET", f"/tasks/dashboard/{rng.choice(ids['dashboards'])}", {})),
+    "tasks.page": ("manager", lambda ids, rng: ("GET", f"/tasks/dashboard/{rng.choice(ids['dashboards'])}/page", {"params": {"sort": "-deadline", "expand": "workers"}})),
+    "comments.task": ("manager", lambda ids, rng: ("GET", f"/comments/task/{rng.choice(ids['tasks'])}", {})),
+    "comments.create": ("worker", lambda ids, rng: ("POST", "/comments/", {"data": {"content": "Benchmark comment", "task_id": str(rng.choice(ids['worker_tasks']))}})),
+    "search": ("ceo", lambda ids, rng: ("GET", "/search", {"params": {"q": rng.choice(("audit", "deploy", "review task", "comment 1"))}})),
+    "sync": ("worker", lambda ids, rng: ("GET", "/sync", {"params": {"since": 0}})),
+}
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/token", data={"username": email, "password": seeder.SEED_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def run_scenario(client, headers, build, ids, requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    plan = [build(ids, rng) for _ in range(warmup + requests)]
+    latencies, queries = [], []
+    errors = 0
+    position = 0
+
+    async def one(method, url, kwargs, record: bool):
+        nonlocal errors
+        counter = [0]
+        token = _query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, headers=headers, **kwargs)
+        finally:
+            _query_counter.reset(token)
+        if record:
+            latencies.append(time.perf_counter() - started)
+            queries.append(counter[0])
+            errors += response.status_code >= 400
+
+    for method, url, kwargs in plan[:warmup]:
+        await one(method, url, kwargs, record=False)
+
+    async def client_loop():
+        nonlocal position
+        while position < len(plan):
+            method, url, kwargs = plan[position]
+            position += 1
+            await one(method, url, kwargs, record=True)
+
+    position = warmup
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "queries_per_request": sum(queries) / len(queries) if queries else 0.0,
+        "errors": errors,
+    }
+
+async def run(names, scale, seed: int, requests: int, concurrency: int, warmup: int) -> dict:
+    from sqlalchemy import event
+
+    import database, models
+    import main as app_module
+
+    for engine in {database.engine, database.read_engine, database.async_engine.sync_engine}:
+        event.listen(engine, "before_cursor_execute", _count_query)
+
+    with database.SessionLocal() as db:
+        # Ids the scenarios pick from: everything owned by the first manager, whose
+        # dashboards the manager scenarios read, and the tasks assigned to the first worker,
+        # which the worker scenarios write to.
+        manager = db.query(models.User).filter(models.User.email == seeder.email(models.Role.MANAGER, 0)).one()
+        worker = db.query(models.User).filter(models.User.email == seeder.email(models.Role.WORKER, 0)).one()
+        dashboard_ids = [id for (id,) in db.query(models.Dashboard.id).filter(models.Dashboard.owner_id == manager.id)]
+        task_ids = [id for (id,) in db.query(models.Task.id).filter(models.Task.dashboard_id.in_(dashboard_ids))]
+        worker_task_ids = [id for (id,) in db.query(models.TaskWorkers.task_id).filter(models.TaskWorkers.user_id == worker.id).order_by(models.TaskWorkers.task_id)]
+    ids = {"dashboards": dashboard_ids, "tasks": task_ids, "worker_tasks": worker_task_ids}
+
+    app = app_module.app
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            headers = {role: await login(client, seeder.email(models.Role(role), 0)) for role in {SCENARIOS[name][0] for name in names}}
+            for name in names:
+                role, build = SCENARIOS[name]
+                results[name] = await run_scenario(client, headers[role], build, ids, requests, concurrency, warmup, seed)
+                print_result(name, results[name])
+    return results
+
+def print_header():
+    print(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'errors':>7}")
+
+def print_result(name: str, result: dict):
+    print(f"{name:<20} {result['throughput']:>9.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+          f"{result['queries_per_request']:>8.1f} {result['errors']:>7}")
+
+def compare(baseline: dict, current: dict, tolerance: float) -> int:
+    # Returns the number of regressed scenarios.
+    if baseline["settings"] != current["settings"]:
+        print(f"warning: baseline was measured with different settings: {baseline['settings']}")
+    print(f"\n{'scenario':<20} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'queries':>13}")
+    regressions = 0
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<20} {'(new)':>9}")
+            continue
+        change = (result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        slower = change > tolerance
+        more_queries = result["queries_per_request"] > base["queries_per_request"] + 0.05
+        regressions += slower or more_queries
+        flags = " ".join(flag for flag, hit in (("SLOWER", slower), ("MORE QUERIES", more_queries)) if hit)
+        print(f"{name:<20} {base['p95_ms']:>9.2f} {result['p95_ms']:>9.2f} {change:>+8.0%} "
+              f"{base['queries_per_request']:>6.1f} -> {result['queries_per_request']:<4.1f} {flags}")
+    return regressions
+
+def main(args) -> int:
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}; available: {', '.join(SCENARIOS)}")
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    save_path = os.path.abspath(args.save) if args.save else None
+
+    scale = seeder.scale_from_args(args)
+    counts = seeder.seed(os.environ["DATABASE_URL"], scale, seed=args.seed)
+    # main.py creates ./uploads and comment files land there; keep them out of the tree.
+    os.chdir(os.path.dirname(BENCHMARK_DB))
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent clients\n")
+    print_header()
+    results = asyncio.run(run(names, scale, args.seed, args.requests, args.concurrency, args.warmup))
+
+    current = {
+        "settings": {"scale": asdict(scale), "seed": args.seed, "requests": args.requests, "concurrency": args.concurrency},
+        "results": results,
+    }
+    if save_path:
+        with open(save_path, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nbaseline saved to {save_path}")
+    if baseline is not None and compare(baseline, current, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load test of the API endpoints.")
+    parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario before timing starts")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed p95 growth before --compare fails (0.3 = 30%%)")
+    seeder.add_scale_arguments(parser)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+# backend/benchmarks/login.py
+#
+# Login throughput with bcrypt on the event loop (the old path) versus the hashing process
+# pool, under concurrent logins. Like async_db.py it also reports the worst event-loop stall
+# seen by a heartbeat task, which is what every other request on the worker sees.
+#
+#   python -m benchmarks.login --concurrency 20 --logins 200 --rounds 12
+
+import argparse
+import asyncio
+import os
+import time
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005):
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def run(label: str, verify, hashed: str, concurrency: int, logins: int):
+    per_worker = logins // concurrency
+
+    async def worker():
+        for _ in range(per_worker):
+            valid, _ = await verify("correct horse", hashed)
+            assert valid
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_lag = await beat
+    total = per_worker * concurrency
+    print(f"{label:<12} {total / elapsed:>8.1f} logins/s   max loop lag {worst_lag * 1000:>8.1f} ms")
+
+async def main(concurrency: int, logins: int):
+    import security
+
+    hashed = security.get_password_hash("correct horse")
+
+    async def on_loop(plain, hashed_password):
+        # Before: the login route called bcrypt directly and blocked the loop.
+        return security.verify_and_update_password(plain, hashed_password)
+
+    print(f"bcrypt rounds {security.BCRYPT_ROUNDS}, {security.PASSWORD_HASH_WORKERS} hash workers, {concurrency} concurrent clients, {logins} logins")
+    await run("on loop", on_loop, hashed, concurrency, logins)
+    # Warm the pool up so process start-up isn't counted.
+    await security.verify_and_update_password_async("correct horse", hashed)
+    await run("hash pool", security.verify_and_update_password_async, hashed, concurrency, logins)
+    security.shutdown_hash_pool()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput: bcrypt on the event loop vs the hashing process pool.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=None, help="Overrides BCRYPT_ROUNDS")
+    parser.add_argument("--workers", type=int, default=None, help="Overrides PASSWORD_HASH_WORKERS")
+    args = parser.parse_args()
+    # security reads its settings at import time.
+    if args.rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    asyncio.run(main(args.concurrency, args.logins))
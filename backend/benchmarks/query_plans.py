@@ -0,0 +1,175 @@
+# backend/benchmarks/query_plans.py
+#
+# Query-plan regression check. Runs every function in crud.py against a small seeded
+# database as each role, captures the SQL it issues, and runs EXPLAIN QUERY PLAN on each
+# statement. Any full table scan that isn't listed in ALLOWED_SCANS fails the run (exit
+# status 1), so a dropped index or a new unindexed filter shows up before it reaches a
+# big database. tests/test_query_plans.py runs the same check under pytest.
+#
+#   python -m benchmarks.query_plans            # summary plus any offending plans
+#   python -m benchmarks.query_plans --verbose  # every statement with its plan
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import archive, crud, database, models, schemas, visibility
+import file_storage  # its delete hooks query too, as they do in the app
+
+# (scenario, table) pairs where reading the whole table is the point of the query.
+ALLOWED_SCANS = {
+    ("get_users", "users"): "unfiltered admin listing",
+    ("get_dashboards[ceo]", "dashboards"): "the CEO sees every dashboard",
+    ("get_dashboard_summaries[ceo]", "dashboards"): "the CEO pages through every dashboard in id order",
+    ("get_dashboard_summaries[ceo, after]", "dashboards"): "the CEO pages through every dashboard in id order",
+    ("archive.archive_due", "tasks"): "the periodic sweep; an index for it would be paid on every task write",
+}
+
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+def seed(db):
+    users = {role: models.User(email=f"{role.value}@example.com", hashed_password="x", full_name=role.value, role=role) for role in models.Role}
+    db.add_all(users.values())
+    db.flush()
+    for d in range(3):
+        dashboard = models.Dashboard(name=f"Dashboard {d}", owner_id=users[models.Role.MANAGER].id)
+        db.add(dashboard)
+        db.flush()
+        for t in range(4):
+            task = models.Task(title=f"Task {d}.{t}", dashboard_id=dashboard.id, deadline=datetime.utcnow() + timedelta(days=t - 2))
+            task.workers.append(users[models.Role.WORKER])
+            db.add(task)
+            db.flush()
+            root = models.Comment(content="root", task_id=task.id, author_id=users[models.Role.WORKER].id)
+            db.add(root)
+            db.flush()
+            reply = models.Comment(content="reply", task_id=task.id, parent_id=root.id, author_id=users[models.Role.MANAGER].id)
+            db.add(reply)
+            db.flush()
+            db.add(models.File(file_name="a.txt", file_path="a.txt", comment_id=reply.id))
+    db.commit()
+    return {role: user.id for role, user in users.items()}
+
+def scenarios(db, user_ids):
+    # (label, callable) pairs covering every function in crud.py and the archival job; reads
+    # first, then writes.
+    user = lambda role: db.get(models.User, user_ids[role])
+    dashboard_id = db.query(models.Dashboard.id).order_by(models.Dashboard.id).first()[0]
+    task_id = db.query(models.Task.id).filter(models.Task.dashboard_id == dashboard_id).order_by(models.Task.id).first()[0]
+    comment_id = db.query(models.Comment.id).filter(models.Comment.task_id == task_id).order_by(models.Comment.id).first()[0]
+
+    yield "get_user", lambda: crud.get_user(db, user_ids[models.Role.CEO])
+    yield "get_user_by_email", lambda: crud.get_user_by_email(db, "ceo@example.com")
+    yield "get_users", lambda: crud.get_users(db)
+    for role in models.Role:
+        yield f"get_dashboards[{role.value}]", lambda role=role: crud.get_dashboards(db, user(role))
+        yield f"get_dashboard_summaries[{role.value}]", lambda role=role: crud.get_dashboard_summaries(db, user(role), limit=2)
+        yield f"get_dashboard_summaries[{role.value}, after]", lambda role=role: crud.get_dashboard_summaries(db, user(role), after_id=dashboard_id, limit=2)
+        yield f"can_view_dashboard[{role.value}]", lambda role=role: crud.can_view_dashboard(db, user(role), dashboard_id)
+        yield f"can_view_task[{role.value}]", lambda role=role: crud.can_view_task(db, user(role), task_id)
+        yield f"get_tasks_for_dashboard[{role.value}]", lambda role=role: crud.get_tasks_for_dashboard(db, dashboard_id, user(role))
+        yield f"get_task_page[{role.value}]", lambda role=role: crud.get_task_page(db, dashboard_id, user(role), limit=2)
+        yield f"get_task_page[{role.value}, -deadline, after]", lambda role=role: crud.get_task_page(db, dashboard_id, user(role), sort="-deadline", cursor=crud.encode_task_cursor("-deadline", datetime.utcnow(), task_id), limit=2)
+        yield f"get_changes_since[{role.value}]", lambda role=role: crud.get_changes_since(db, user(role), since=0)
+        yield f"search_tasks_and_comments[{role.value}]", lambda role=role: crud.search_tasks_and_comments(db, user(role), "task root")
+    yield "get_task_page[filtered]", lambda: crud.get_task_page(db, dashboard_id, user(models.Role.CEO), status=["Pending"], deadline_from=datetime.utcnow() - timedelta(days=7), worker_id=user_ids[models.Role.WORKER], sort="title", limit=2)
+    yield "get_task_page[overdue]", lambda: crud.get_task_page(db, dashboard_id, user(models.Role.MANAGER), overdue=True, sort="status", limit=2)
+    yield "get_dashboard_stats", lambda: crud.get_dashboard_stats(db, dashboard_id)
+    yield "get_comments_for_task", lambda: crud.get_comments_for_task(db, task_id)
+    yield "get_comments_for_task[paged]", lambda: crud.get_comments_for_task(db, task_id, skip=1, limit=1, max_depth=1)
+
+    yield "create_user", lambda: crud.create_user(db, schemas.UserCreate(email="new@example.com", password="pw", full_name="New"), hashed_password="x")
+    yield "create_dashboard", lambda: crud.create_dashboard(db, schemas.DashboardCreate(name="New"), owner_id=user_ids[models.Role.MANAGER])
+    yield "create_task", lambda: crud.create_task(db, schemas.TaskCreate(title="New", dashboard_id=dashboard_id))
+    yield "update_task", lambda: crud.update_task(db, task_id, schemas.TaskUpdate(status="Completed"))
+    yield "assign_worker_to_task", lambda: crud.assign_worker_to_task(db, task_id, user_ids[models.Role.MANAGER])
+    yield "bulk_create_tasks", lambda: crud.bulk_create_tasks(db, [schemas.BulkTaskItem(title="Bulk", dashboard_id=dashboard_id, worker_ids=[user_ids[models.Role.WORKER]])], current_user=user(models.Role.MANAGER))
+    yield "bulk_assign_workers", lambda: crud.bulk_assign_workers(db, [schemas.BulkAssignment(task_id=task_id, user_id=user_ids[models.Role.CEO])], current_user=user(models.Role.MANAGER))
+    yield "create_comment", lambda: crud.create_comment(db, schemas.CommentCreate(content="New", task_id=task_id, parent_id=comment_id), author_id=user_ids[models.Role.CEO])
+    yield "create_file_record", lambda: crud.create_file_record(db, "b.txt", "b.txt", comment_id)
+    yield "update_comment_status", lambda: crud.update_comment_status(db, comment_id, schemas.CommentStatusUpdate(status=models.CommentStatus.APPROVED))
+    # The cutoff is in the future, so the task completed above is due.
+    yield "archive.archive_due", lambda: archive.archive_due(db, older_than_days=-1)
+    for role in models.Role:
+        yield f"can_view_archived_task[{role.value}]", lambda role=role: crud.can_view_archived_task(db, user(role), task_id)
+        yield f"get_archived_tasks_for_dashboard[{role.value}]", lambda role=role: crud.get_archived_tasks_for_dashboard(db, dashboard_id, user(role))
+    yield "get_archived_comments_for_task", lambda: crud.get_archived_comments_for_task(db, task_id)
+    yield "restore_task", lambda: crud.restore_task(db, task_id)
+    yield "delete_dashboard", lambda: crud.delete_dashboard(db, dashboard_id)
+
+def table_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    details = [row[-1] for row in rows]
+    scanned = [match.group(1) for match in map(SCAN.match, details) if match and " USING " not in match.string]
+    # CTEs and subqueries show up as scans of their own names; only real tables count.
+    return details, [table for table in scanned if table in database.Base.metadata.tables]
+
+def find_unexpected_scans(verbose: bool = False):
+    """Runs every scenario; returns the number of statements checked and a
+    (label, tables, statement, plan) entry for each one with an unexpected full table scan.
+    With `verbose`, every statement is printed with its plan as it is checked."""
+    directory = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'plans.db')}")
+    database.Base.metadata.create_all(bind=engine)
+    captured = []
+    # file_storage's delete hooks count references through database.engine and lock the
+    # uploads directory; point both at the scratch copy.
+    app_engine, working_directory = database.engine, os.getcwd()
+    database.engine = engine
+    os.chdir(directory)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith(("INSERT", "PRAGMA")):
+            captured.append((statement, parameters))
+
+    offending = []
+    checked = 0
+    try:
+        with sessionmaker(bind=engine)() as db:
+            user_ids = seed(db)
+            for label, run in scenarios(db, user_ids):
+                # Start every scenario cold, so the visibility lookups show up in its plans too.
+                visibility.visibility_cache.clear()
+                captured.clear()
+                run()
+                statements = list(captured)
+                with engine.connect() as connection:
+                    for statement, parameters in statements:
+                        checked += 1
+                        details, scans = table_scans(connection, statement, parameters)
+                        bad = [table for table in scans if (label, table) not in ALLOWED_SCANS]
+                        if bad:
+                            offending.append((label, bad, statement, details))
+                        if verbose:
+                            print(describe(label, bad, statement, details))
+    finally:
+        file_storage.wait_for_removals()
+        database.engine = app_engine
+        os.chdir(working_directory)
+    engine.dispose()
+    return checked, offending
+
+def describe(label, tables, statement, details) -> str:
+    lines = [f"{'FULL SCAN ' + ', '.join(tables) if tables else 'ok':<24} {label}", "    " + " ".join(statement.split())]
+    return "\n".join(lines + ["      " + detail for detail in details])
+
+def main(verbose: bool) -> int:
+    checked, offending = find_unexpected_scans(verbose)
+    if not verbose:
+        for entry in offending:
+            print(describe(*entry))
+    print(f"{checked} statements checked, {len(offending)} with unexpected full table scans")
+    return 1 if offending else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fails if any query in crud.py does an unexpected full table scan.")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and its plan")
+    args = parser.parse_args()
+    sys.exit(main(args.verbose))
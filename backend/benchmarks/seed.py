@@ -0,0 +1,125 @@
+# backend/benchmarks/seed.py
+#
+# Synthetic data generator. Fills a fresh database with users of every role, dashboards
+# owned by the managers, tasks with worker assignments, and comment trees (replies nested
+# under earlier comments of the same task) with file attachments. The same --seed always
+# produces the same data, so runs at the same scale are comparable.
+#
+# Rows are written through the model tables in batched executemany inserts with explicit
+# ids; row_version and the dashboard stats are filled in here since the session hooks only
+# see ORM flushes. Every user's password is SEED_PASSWORD.
+#
+#   python -m benchmarks.seed --db /tmp/bench.db --managers 10 --tasks-per-dashboard 200
+
+import argparse
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import dashboard_stats, models, search, security, versioning  # search: creates the FTS index with the schema
+from database import Base
+
+SEED_PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+STATUSES = ("Pending", "In Progress", "Completed")
+
+@dataclass
+class Scale:
+    ceos: int = 1
+    managers: int = 5
+    workers: int = 50
+    dashboards_per_manager: int = 4
+    tasks_per_dashboard: int = 50
+    workers_per_task: int = 2
+    comments_per_task: int = 6
+    # Share of comments that reply to an earlier comment on the same task.
+    reply_ratio: float = 0.5
+    # Share of comments with a file attached.
+    file_ratio: float = 0.2
+
+def email(role: models.Role, n: int) -> str:
+    return f"{role.value}{n}@bench.example.com"
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model.__table__), rows[start:start + BATCH_SIZE])
+
+def seed(url: str, scale: Scale, seed: int = 0) -> dict:
+    """Creates the schema at `url` and fills it; returns the number of rows per table."""
+    rng = random.Random(seed)
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    # One hash for everyone: bcrypt per user would dominate seeding time.
+    hashed_password = security.get_password_hash(SEED_PASSWORD)
+    start = datetime(2024, 1, 1, 9, 0, 0)
+
+    users = []
+    for role, count in ((models.Role.CEO, scale.ceos), (models.Role.MANAGER, scale.managers), (models.Role.WORKER, scale.workers)):
+        users += [{"id": len(users) + n + 1, "email": email(role, n), "hashed_password": hashed_password,
+                   "full_name": f"{role.value.title()} {n}", "role": role, "is_active": True} for n in range(count)]
+    manager_ids = [user["id"] for user in users if user["role"] == models.Role.MANAGER]
+    worker_ids = [user["id"] for user in users if user["role"] == models.Role.WORKER]
+    commenter_ids = manager_ids + worker_ids
+
+    dashboards, tasks, assignments, comments, files = [], [], [], [], []
+    for owner_id in manager_ids:
+        for _ in range(scale.dashboards_per_manager):
+            dashboard_id = len(dashboards) + 1
+            dashboards.append({"id": dashboard_id, "name": f"Dashboard {dashboard_id}", "description": f"Generated dashboard {dashboard_id}",
+                               "owner_id": owner_id, "created_at": start, "updated_at": start})
+            for _ in range(scale.tasks_per_dashboard):
+                task_id = len(tasks) + 1
+                tasks.append({"id": task_id, "title": f"Task {task_id} {rng.choice(('review', 'deploy', 'design', 'audit', 'migrate'))}",
+                              "description": f"Generated task {task_id} for dashboard {dashboard_id}",
+                              "deadline": start + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.8 else None,
+                              "status": rng.choice(STATUSES), "dashboard_id": dashboard_id, "updated_at": start})
+                for user_id in rng.sample(worker_ids, min(scale.workers_per_task, len(worker_ids))):
+                    assignments.append({"task_id": task_id, "user_id": user_id})
+                thread = []
+                for n in range(scale.comments_per_task):
+                    comment_id = len(comments) + 1
+                    parent_id = rng.choice(thread) if thread and rng.random() < scale.reply_ratio else None
+                    comments.append({"id": comment_id, "content": f"Comment {comment_id} on task {task_id}", "task_id": task_id,
+                                     "author_id": rng.choice(commenter_ids) if commenter_ids else None, "parent_id": parent_id,
+                                     "status": models.CommentStatus.PENDING, "created_at": start + timedelta(minutes=n),
+                                     "updated_at": start + timedelta(minutes=n)})
+                    thread.append(comment_id)
+                    if rng.random() < scale.file_ratio:
+                        files.append({"id": len(files) + 1, "file_name": f"file{len(files) + 1}.txt", "file_path": f"seed/file{len(files) + 1}.txt",
+                                      "size": rng.randint(100, 100000), "comment_id": comment_id})
+
+    with sessionmaker(bind=engine)() as db:
+        version = versioning.next_version(db)
+        for rows in (dashboards, tasks, comments):
+            for row in rows:
+                row["row_version"] = version
+        for model, rows in ((models.User, users), (models.Dashboard, dashboards), (models.Task, tasks),
+                            (models.TaskWorkers, assignments), (models.Comment, comments), (models.File, files)):
+            _insert(db, model, rows)
+        dashboard_stats.rebuild(db)
+        db.commit()
+    engine.dispose()
+    return {"users": len(users), "dashboards": len(dashboards), "tasks": len(tasks), "task_workers": len(assignments),
+            "comments": len(comments), "files": len(files)}
+
+def add_scale_arguments(parser: argparse.ArgumentParser):
+    defaults = Scale()
+    for name, value in asdict(defaults).items():
+        parser.add_argument("--" + name.replace("_", "-"), type=type(value), default=value)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed and scale give the same data")
+
+def scale_from_args(args) -> Scale:
+    return Scale(**{name: getattr(args, name) for name in asdict(Scale())})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a fresh SQLite database with synthetic data.")
+    parser.add_argument("--db", required=True, help="Path of the SQLite file to create")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts = seed(f"sqlite:///{args.db}", scale_from_args(args), seed=args.seed)
+    print(", ".join(f"{count} {table}" for table, count in counts.items()) + f" in {time.perf_counter() - started:.1f}s")
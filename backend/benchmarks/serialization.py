@@ -0,0 +1,79 @@
+# backend/benchmarks/serialization.py
+#
+# Serializes one generated dashboard with --tasks tasks (workers, comments and replies
+# attached) through both response paths and checks they produce the same bytes:
+#
+#   pydantic   response_model validation + jsonable_encoder + JSONResponse (the old path)
+#   compiled   serializers.render: precompiled serializers + orjson
+#
+#   python -m benchmarks.serialization --tasks 10000 --repeat 5
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import models, schemas, serializers
+
+def build_dashboard(tasks: int, workers: int, comments_per_task: int):
+    # Transient ORM objects; relationships are plain lists, so no database is involved.
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    owner = models.User(id=1, email="owner@example.com", full_name="Owner", role=models.Role.MANAGER, is_active=True)
+    people = [models.User(id=i + 2, email=f"worker{i}@example.com", full_name=f"Worker {i}", role=models.Role.WORKER, is_active=True) for i in range(workers)]
+    dashboard = models.Dashboard(id=1, name="Benchmark", description="Generated dashboard", owner=owner, tasks=[])
+    comment_id = 0
+    for t in range(tasks):
+        task = models.Task(id=t + 1, title=f"Task {t}", description="Lorem ipsum dolor sit amet", status="Pending",
+                           deadline=now + timedelta(days=t % 30), workers=people[t % workers:t % workers + 2], comments=[])
+        for c in range(comments_per_task):
+            comment_id += 1
+            comment = models.Comment(id=comment_id, content=f"Comment {c} on task {t}", created_at=now, author=people[c % workers],
+                                     status=models.CommentStatus.PENDING, replies=[], files=[])
+            if c % 2:
+                comment.files = [models.File(id=comment_id, file_name="report.pdf", file_path=f"{comment_id:064x}.pdf")]
+            comment_id += 1
+            comment.replies = [models.Comment(id=comment_id, content="Reply", created_at=now, author=owner, parent_id=comment.id,
+                                              status=models.CommentStatus.APPROVED, replies=[], files=[])]
+            task.comments.append(comment)
+        dashboard.tasks.append(task)
+    return dashboard
+
+def pydantic_path(dashboard) -> bytes:
+    if hasattr(schemas.Dashboard, "model_validate"):  # pydantic 2
+        model = schemas.Dashboard.model_validate(dashboard, from_attributes=True)
+    else:
+        model = schemas.Dashboard.from_orm(dashboard)
+    return JSONResponse(jsonable_encoder(model)).body
+
+def compiled_path(dashboard) -> bytes:
+    return serializers.render(schemas.Dashboard, dashboard).body
+
+def timed(label: str, render, dashboard, repeat: int) -> bytes:
+    body = render(dashboard)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(dashboard)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<10} {best * 1000:>9.1f} ms   {len(body) / 1024:>8.0f} KiB")
+    return body
+
+def main(tasks: int, workers: int, comments_per_task: int, repeat: int):
+    dashboard = build_dashboard(tasks, workers, comments_per_task)
+    print(f"1 dashboard, {tasks} tasks, {comments_per_task} comments per task (each with a reply), best of {repeat}")
+    expected = timed("pydantic", pydantic_path, dashboard, repeat)
+    actual = timed("compiled", compiled_path, dashboard, repeat)
+    if actual != expected:
+        raise SystemExit("Output differs between the two paths")
+    print("output identical")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response serialization: pydantic + json vs compiled serializers + orjson.")
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=2, help="Top-level comments per task")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.tasks, args.workers, args.comments, args.repeat)
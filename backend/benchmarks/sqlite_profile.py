@@ -0,0 +1,104 @@
+# backend/benchmarks/sqlite_profile.py
+#
+# Read throughput under a parallel write load, for the stock SQLite settings versus the
+# production profile from database.py (WAL, synchronous=NORMAL, busy_timeout, ...), with
+# and without the read-only pool.
+#
+#   python -m benchmarks.sqlite_profile --readers 8 --writers 2 --seconds 5
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import models
+from database import Base, SQLITE_PRAGMAS, build_engine
+
+DEFAULT_PRAGMAS = {}
+
+PROFILES = [
+    ("default", DEFAULT_PRAGMAS, False),
+    ("wal", SQLITE_PRAGMAS, False),
+    ("wal+read-pool", SQLITE_PRAGMAS, True),
+]
+
+def seed(engine, dashboards: int, tasks_per_dashboard: int):
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        owner = models.User(email="owner@bench.local", hashed_password="x", role=models.Role.MANAGER)
+        db.add(owner)
+        db.flush()
+        for d in range(dashboards):
+            dashboard = models.Dashboard(name=f"Dashboard {d}", owner_id=owner.id)
+            dashboard.tasks = [models.Task(title=f"Task {d}.{t}") for t in range(tasks_per_dashboard)]
+            db.add(dashboard)
+        db.commit()
+
+def run_profile(name, pragmas, split_reads, readers, writers, seconds, dashboards, tasks_per_dashboard):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite:///{path}"
+    if split_reads:
+        write_engine = build_engine(url, pool_size=1, max_overflow=0, pragmas=pragmas)
+        read_engine = build_engine(url, pool_size=readers, max_overflow=0, pragmas=pragmas, read_only=True)
+    else:
+        write_engine = read_engine = build_engine(url, pool_size=readers + writers, max_overflow=0, pragmas=pragmas)
+    seed(write_engine, dashboards, tasks_per_dashboard)
+    WriteSession = sessionmaker(bind=write_engine)
+    ReadSession = sessionmaker(bind=read_engine)
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def reader(n):
+        i = n
+        while time.perf_counter() < deadline:
+            try:
+                with ReadSession() as db:
+                    db.query(models.Task).filter(models.Task.dashboard_id == i % dashboards + 1).all()
+                bump("reads")
+            except OperationalError:
+                bump("errors")
+            i += 1
+
+    def writer(n):
+        i = 0
+        while time.perf_counter() < deadline:
+            try:
+                with WriteSession() as db:
+                    db.add(models.Task(title=f"Write {n}.{i}", dashboard_id=i % dashboards + 1))
+                    db.commit()
+                bump("writes")
+            except OperationalError:
+                bump("errors")
+            i += 1
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    write_engine.dispose()
+    read_engine.dispose()
+    print(f"{name:<14} {counts['reads'] / seconds:>9.0f} reads/s {counts['writes'] / seconds:>8.0f} writes/s {counts['errors']:>6} errors")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite read throughput under parallel writes.")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--dashboards", type=int, default=50)
+    parser.add_argument("--tasks-per-dashboard", type=int, default=40)
+    args = parser.parse_args()
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per profile")
+    for name, pragmas, split_reads in PROFILES:
+        run_profile(name, pragmas, split_reads, args.readers, args.writers, args.seconds, args.dashboards, args.tasks_per_dashboard)
@@ -0,0 +1,123 @@
+# backend/brokers.py
+#
+# Pub/sub backends behind ConnectionManager. The manager always delivers to the sockets it
+# holds itself; the broker carries (message, {user_id: seq}) pairs to the other API
+# processes, which hand them to their own managers through the `deliver` callback.
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_BROKER = os.getenv("NOTIFICATION_BROKER", "memory")
+BROKER_SQLITE_PATH = os.getenv("BROKER_SQLITE_PATH", "./notifications_broker.db")
+BROKER_POLL_INTERVAL_SECONDS = float(os.getenv("BROKER_POLL_INTERVAL_SECONDS", "0.1"))
+BROKER_RETENTION_SECONDS = float(os.getenv("BROKER_RETENTION_SECONDS", "60"))
+
+Deliver = Callable[[dict, Dict[int, int]], object]
+
+class InMemoryBroker:
+    """Single-process broker: there are no other processes to forward to."""
+
+    shared = False
+
+    async def start(self, deliver: Deliver):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, message: dict, seqs: Dict[int, int]):
+        pass
+
+class SQLiteBroker:
+    """Multi-process broker over a shared SQLite file, for running several workers on one host.
+
+    Published messages are appended to a log table; every process polls the log for rows
+    it did not write and delivers them to its own sockets. Old rows are pruned after the
+    retention window, so a process only sees messages published while it is running.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = BROKER_SQLITE_PATH, poll_interval: float = BROKER_POLL_INTERVAL_SECONDS, retention: float = BROKER_RETENTION_SECONDS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = uuid.uuid4().hex
+        self._deliver: Optional[Deliver] = None
+        self._db: Optional[aiosqlite.Connection] = None
+        self._last_id = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA busy_timeout=5000")
+        await self._db.execute(
+            "CREATE TABLE IF NOT EXISTS broker_messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL, recipients TEXT NOT NULL, "
+            "message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        await self._db.commit()
+        async with self._db.execute("SELECT COALESCE(MAX(id), 0) FROM broker_messages") as cursor:
+            self._last_id = (await cursor.fetchone())[0]
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def publish(self, message: dict, seqs: Dict[int, int]):
+        if self._db is None:
+            return
+        await self._db.execute(
+            "INSERT INTO broker_messages (origin, recipients, message, created_at) VALUES (?, ?, ?, ?)",
+            (self.origin, json.dumps(seqs), json.dumps(message), time.time()),
+        )
+        await self._db.commit()
+
+    async def poll(self):
+        async with self._db.execute(
+            "SELECT id, origin, recipients, message FROM broker_messages WHERE id > ? ORDER BY id", (self._last_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        for row_id, origin, recipients, message in rows:
+            self._last_id = row_id
+            if origin != self.origin:
+                # JSON object keys are strings; user ids are ints everywhere else.
+                seqs = {int(user_id): seq for user_id, seq in json.loads(recipients).items()}
+                self._deliver(json.loads(message), seqs)
+
+    async def _poll_loop(self):
+        last_prune = time.time()
+        while True:
+            try:
+                await self.poll()
+                if time.time() - last_prune > self.retention:
+                    await self._db.execute("DELETE FROM broker_messages WHERE created_at < ?", (time.time() - self.retention,))
+                    await self._db.commit()
+                    last_prune = time.time()
+            except Exception:
+                logger.exception("Notification broker poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+def create_broker(name: str = NOTIFICATION_BROKER):
+    if name == "memory":
+        return InMemoryBroker()
+    if name == "sqlite":
+        return SQLiteBroker()
+    raise ValueError(f"Unknown notification broker '{name}'")
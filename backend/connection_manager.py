@@ -1,31 +1,171 @@
-
 # backend/connection_manager.py
 # --- Final Version ---
 
+import asyncio
+import logging
+import os
 from fastapi import WebSocket
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Set
+
+from brokers import create_broker
+from notification_log import NotificationLog
+
+logger = logging.getLogger(__name__)
+
+# Messages buffered per connection before it counts as a slow consumer.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+# What to do with a slow consumer: "drop" the new message, or "disconnect" the socket.
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop")
+
+class Connection:
+    """One WebSocket with its own bounded send queue, drained by a dedicated writer task."""
+
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int, on_close: Callable[["Connection"], None]):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._on_close = on_close
+        self._writer: Optional[asyncio.Task] = None
+        self._held: Optional[List[dict]] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, message: dict) -> bool:
+        if self._held is not None:
+            self._held.append(message)
+            return True
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def hold(self):
+        # Buffers live messages while missed ones are being looked up for replay.
+        self._held = []
+
+    def resume(self, missed: Optional[List[dict]], last_seq: int):
+        """Queues the replayed messages, then the live ones that arrived meanwhile, in seq order.
+
+        `missed` is None when the log no longer covers the gap; the client then gets a single
+        resync_required message and should reload its state.
+        """
+        held, self._held = self._held or [], None
+        replayed_up_to = missed[-1]["seq"] if missed else -1
+        backlog = (missed or []) + [message for message in held if message.get("seq", 0) > replayed_up_to]
+        if missed is None or len(backlog) > self.queue.maxsize:
+            backlog = [{"type": "resync_required", "payload": {"seq": last_seq}}]
+        for message in backlog:
+            self.queue.put_nowait(message)
+
+    async def _write_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.websocket.send_json(message)
+            except Exception:
+                # Half-dead socket: stop writing and let the manager forget it.
+                logger.info("Dropping WebSocket for user %s after a failed send", self.user_id)
+                self._on_close(self)
+                return
+
+    def stop(self):
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def close(self):
+        self.stop()
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY, broker=None, log: Optional[NotificationLog] = None):
+        # A user may hold several connections, e.g. one per browser tab.
+        self.active_connections: Dict[int, Set[Connection]] = {}
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        # Forwards messages to managers in other worker processes (see brokers.py).
+        self.broker = broker if broker is not None else create_broker()
+        # Stamps every message with a per-user seq and keeps recent ones for replay.
+        self.log = log if log is not None else NotificationLog()
+
+    async def start(self):
+        if getattr(self.broker, "shared", True) and not self.log.persist:
+            # Each worker would number messages on its own and clients would mix them up.
+            raise RuntimeError("A shared notification broker needs NOTIFICATION_LOG_PERSIST=1")
+        await self.broker.start(self._deliver_remote)
 
-    async def connect(self, websocket: WebSocket, user_id: int):
+    async def stop(self):
+        await self.broker.stop()
+
+    async def connect(self, websocket: WebSocket, user_id: int, last_seq: Optional[int] = None) -> Connection:
+        # With last_seq, everything the user missed since that seq is replayed first.
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        connection = Connection(websocket, user_id, self.queue_size, on_close=self._discard)
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        if last_seq is not None:
+            connection.hold()
+            missed = await self.log.since(user_id, last_seq)
+            connection.resume(missed, self.log.last_seq(user_id))
+        connection.start()
+        return connection
+
+    def disconnect(self, user_id: int, connection: Optional[Connection] = None):
+        # Without a specific connection, every connection of the user is dropped.
+        connections = self.active_connections.get(user_id, set())
+        for conn in ([connection] if connection is not None else list(connections)):
+            self._discard(conn)
+            conn.stop()
+
+    async def send_personal_message(self, message: dict, user_id: int, dedup_key: Optional[str] = None):
+        return await self.broadcast_to_users(message, [user_id], dedup_key=dedup_key)
+
+    async def broadcast_to_users(self, message: dict, user_ids: List[int], dedup_key: Optional[str] = None):
+        # Offline users still get a seq, so they can catch up when they reconnect. Users who
+        # already got the message under `dedup_key` are skipped.
+        seqs = await self.log.append(message, user_ids, dedup_key=dedup_key)
+        if not seqs:
+            return 0
+        delivered = self._fan_out(message, seqs)
+        await self.broker.publish(message, seqs)
+        return delivered
+
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self.active_connections.values())
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    def _deliver_remote(self, message: dict, seqs: Dict[int, int]) -> int:
+        # A message sequenced by another worker, received through the broker.
+        for user_id, seq in seqs.items():
+            self.log.record(user_id, seq, message)
+        return self._fan_out(message, seqs)
 
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            websocket = self.active_connections[user_id]
-            await websocket.send_json(message)
+    def _fan_out(self, message: dict, seqs: Dict[int, int]) -> int:
+        # Only enqueues: each connection's writer sends concurrently, so a slow or dead client
+        # never delays the others. Returns the number of connections the message was queued for.
+        delivered = 0
+        for user_id, seq in seqs.items():
+            sequenced = {**message, "seq": seq}
+            for connection in list(self.active_connections.get(user_id, ())):
+                if connection.offer(sequenced):
+                    delivered += 1
+                elif self.slow_consumer_policy == "disconnect":
+                    logger.info("Disconnecting slow WebSocket consumer for user %s", user_id)
+                    self._discard(connection)
+                    asyncio.create_task(connection.close())
+                else:
+                    connection.dropped += 1
+        return delivered
 
-    async def broadcast_to_users(self, message: dict, user_ids: List[int]):
-        for user_id in user_ids:
-            if user_id in self.active_connections:
-                websocket = self.active_connections[user_id]
-                await websocket.send_json(message)
+    def _discard(self, connection: Connection):
+        connections = self.active_connections.get(connection.user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[connection.user_id]
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -1,24 +1,37 @@
 # backend/crud.py
 # --- Corrected Version ---
 
-from sqlalchemy.orm import Session, joinedload
-import models, schemas, security
-from typing import List
-import shutil
-from fastapi import UploadFile
+from sqlalchemy import false, func, insert, literal, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, joinedload, noload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+import archive, dashboard_stats, fieldsets, models, schemas, search, statements, versioning, visibility
+from statements import comment_thread_statement
+from jobs import add_outbox_event, TASKS_ASSIGNED
+from typing import List, Optional
+import base64
+import json
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Tasks in this status never count as overdue.
+TASK_DONE_STATUS = "Completed"
+
+# The hot reads below run pre-built statements from statements.py with bound parameters
+# instead of building a Query per call.
 
 # --- User CRUD ---
 def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    return db.scalars(statements.USER_BY_ID, {"user_id": user_id}).first()
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+    return db.scalars(statements.USER_BY_EMAIL, {"email": email}).first()
 
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = security.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    # The caller hashes the password (security.get_password_hash_async), off the event loop.
     db_user = models.User(email=user.email, hashed_password=hashed_password, full_name=user.full_name, role=user.role)
     db.add(db_user)
     db.commit()
@@ -26,19 +39,114 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 # --- Dashboard CRUD ---
-def get_dashboards(db: Session, current_user: models.User):
-    # FIX: Eagerly load the tasks associated with each dashboard using joinedload.
-    # This ensures that when the frontend fetches dashboards, the 'tasks' list is populated,
-    # allowing the UI to correctly display the task count.
-    if current_user.role == models.Role.CEO:
-        return db.query(models.Dashboard).options(joinedload(models.Dashboard.owner), joinedload(models.Dashboard.tasks)).all()
-    if current_user.role == models.Role.MANAGER:
-        return db.query(models.Dashboard).filter(models.Dashboard.owner_id == current_user.id).options(joinedload(models.Dashboard.owner), joinedload(models.Dashboard.tasks)).all()
-    if current_user.role == models.Role.WORKER:
-        assigned_task_ids = db.query(models.TaskWorkers.task_id).filter(models.TaskWorkers.user_id == current_user.id).subquery()
-        dashboard_ids = db.query(models.Task.dashboard_id).filter(models.Task.id.in_(assigned_task_ids)).distinct()
-        return db.query(models.Dashboard).filter(models.Dashboard.id.in_(dashboard_ids)).options(joinedload(models.Dashboard.owner), joinedload(models.Dashboard.tasks)).all()
-    return []
+def get_dashboards(db: Session, current_user: models.User, fieldset: Optional[fieldsets.FieldSet] = None):
+    # The fieldset decides which columns and relationships are loaded; by default that is
+    # the full Dashboard schema, with every relationship batch-loaded up front.
+    # Workers only get the tasks assigned to them within those dashboards.
+    fieldset = fieldset or fieldsets.full(schemas.Dashboard)
+    visible = visibility.for_user(db, current_user)
+    if visible.sees_nothing:
+        return []
+    if visible.dashboard_ids is None:
+        dashboards = db.scalars(statements.dashboards(fieldset, by_id=False)).all()
+    elif visible.task_ids is None and len(visible.dashboard_ids) <= visibility.IN_LIST_MAX:
+        dashboards = db.scalars(statements.dashboards(fieldset, by_id=True), {"dashboard_ids": list(visible.dashboard_ids)}).all()
+    else:
+        # The nested task filter is loader criteria, which can't take bound parameters.
+        criteria = {"tasks": visible.task_filter(models.Task.id)} if visible.task_ids is not None else None
+        statement = select(models.Dashboard).where(visible.dashboard_filter(models.Dashboard.id)).options(*fieldset.loader_options(criteria))
+        dashboards = db.scalars(statement).all()
+    if fieldset.expands("tasks", "comments", "replies"):
+        for dashboard in dashboards:
+            for task in dashboard.tasks:
+                link_replies(task.comments)
+    return dashboards
+
+def get_dashboard_summaries(db: Session, current_user: models.User, after_id: Optional[int] = None, limit: int = 50):
+    # Keyset-paginated listing that returns task aggregates instead of the full ORM graph.
+    # Visibility rules mirror get_dashboards; the counts come from the dashboard_stats counters.
+    visible = visibility.for_user(db, current_user)
+    if visible.sees_nothing:
+        return [], None
+    query = db.query(models.Dashboard).options(joinedload(models.Dashboard.owner))
+    if visible.dashboard_ids is not None:
+        query = query.filter(visible.dashboard_filter(models.Dashboard.id))
+    if after_id is not None:
+        query = query.filter(models.Dashboard.id > after_id)
+    # Fetch one extra row to know whether another page exists.
+    page = query.order_by(models.Dashboard.id.asc()).limit(limit + 1).all()
+    next_cursor = page[limit - 1].id if len(page) > limit else None
+    page = page[:limit]
+
+    summaries = {
+        d.id: {"id": d.id, "name": d.name, "description": d.description, "created_at": d.created_at, "owner": d.owner,
+               "task_count": 0, "overdue_count": 0, "status_counts": {}}
+        for d in page
+    }
+    if summaries:
+        counters = db.query(models.DashboardStat.dashboard_id, models.DashboardStat.key, models.DashboardStat.count) \
+            .filter(models.DashboardStat.dashboard_id.in_(list(summaries)), models.DashboardStat.kind == dashboard_stats.TASK_STATUS) \
+            .order_by(models.DashboardStat.dashboard_id, models.DashboardStat.key).all()
+        for dashboard_id, task_status, count in counters:
+            summary = summaries[dashboard_id]
+            summary["status_counts"][task_status] = count
+            summary["task_count"] += count
+        for dashboard_id, overdue_count in _overdue_counts(db, list(summaries)).items():
+            summaries[dashboard_id]["overdue_count"] = overdue_count
+    return list(summaries.values()), next_cursor
+
+def _overdue_counts(db: Session, dashboard_ids: List[int]):
+    # Overdue depends on the clock, so it isn't a stored counter; the range scan on
+    # ix_tasks_dashboard_deadline only touches tasks whose deadline has passed.
+    rows = db.query(models.Task.dashboard_id, func.count(models.Task.id)) \
+        .filter(models.Task.dashboard_id.in_(dashboard_ids), models.Task.deadline < datetime.utcnow(),
+                or_(models.Task.status != TASK_DONE_STATUS, models.Task.status.is_(None))) \
+        .group_by(models.Task.dashboard_id).all()
+    return dict(rows)
+
+def can_view_dashboard(db: Session, current_user: models.User, dashboard_id: int) -> bool:
+    # Checked against the cached visibility sets; only a user who sees every dashboard
+    # needs a lookup, to tell whether this one exists.
+    visible = visibility.for_user(db, current_user)
+    if visible.dashboard_ids is not None:
+        return dashboard_id in visible.dashboard_ids
+    return dashboard_exists(db, dashboard_id)
+
+def dashboard_exists(db: Session, dashboard_id: int) -> bool:
+    return db.get(models.Dashboard, dashboard_id) is not None
+
+def can_view_task(db: Session, current_user: models.User, task_id: int) -> bool:
+    visible = visibility.for_user(db, current_user)
+    if visible.task_ids is not None:
+        return task_id in visible.task_ids
+    task = db.execute(select(models.Task.dashboard_id).where(models.Task.id == task_id)).first()
+    return task is not None and visible.can_view_dashboard(task.dashboard_id)
+
+def get_dashboard_stats(db: Session, dashboard_id: int):
+    # Reads the maintained counters (see dashboard_stats.py) plus the overdue count.
+    stats = {"dashboard_id": dashboard_id, "task_count": 0, "status_counts": {}, "overdue_count": 0,
+             "comment_count": 0, "comment_status_counts": {}, "workers": []}
+    workers = defaultdict(lambda: {"task_count": 0, "open_task_count": 0})
+    counters = db.query(models.DashboardStat.kind, models.DashboardStat.key, models.DashboardStat.count) \
+        .filter(models.DashboardStat.dashboard_id == dashboard_id) \
+        .order_by(models.DashboardStat.kind, models.DashboardStat.key).all()
+    for kind, key, count in counters:
+        if kind == dashboard_stats.TASK_STATUS:
+            stats["status_counts"][key] = count
+            stats["task_count"] += count
+        elif kind == dashboard_stats.COMMENT_STATUS:
+            stats["comment_status_counts"][key] = count
+            stats["comment_count"] += count
+        elif kind == dashboard_stats.WORKER_TASKS:
+            workers[int(key)]["task_count"] = count
+        elif kind == dashboard_stats.WORKER_OPEN_TASKS:
+            workers[int(key)]["open_task_count"] = count
+    stats["overdue_count"] = _overdue_counts(db, [dashboard_id]).get(dashboard_id, 0)
+    if workers:
+        users = db.query(models.User).filter(models.User.id.in_(list(workers))).order_by(models.User.id).all()
+        # Busiest first.
+        stats["workers"] = sorted(({"user": user, **workers[user.id]} for user in users), key=lambda load: (-load["open_task_count"], -load["task_count"], load["user"].id))
+    return stats
 
 def create_dashboard(db: Session, dashboard: schemas.DashboardCreate, owner_id: int):
     db_dashboard = models.Dashboard(**dashboard.dict(), owner_id=owner_id)
@@ -55,11 +163,107 @@ def delete_dashboard(db: Session, dashboard_id: int):
     return db_dashboard
 
 # --- Task CRUD ---
-def get_tasks_for_dashboard(db: Session, dashboard_id: int, current_user: models.User):
-    query = db.query(models.Task).filter(models.Task.dashboard_id == dashboard_id).options(joinedload(models.Task.workers))
-    if current_user.role == models.Role.WORKER:
-        query = query.join(models.TaskWorkers).filter(models.TaskWorkers.user_id == current_user.id)
-    return query.all()
+def get_tasks_for_dashboard(db: Session, dashboard_id: int, current_user: models.User, fieldset: Optional[fieldsets.FieldSet] = None):
+    fieldset = fieldset or fieldsets.full(schemas.Task)
+    visible = visibility.for_user(db, current_user)
+    if not visible.can_view_dashboard(dashboard_id):
+        return []
+    if visible.task_ids is None:
+        tasks = db.scalars(statements.tasks_for_dashboard(fieldset, by_id=False), {"dashboard_id": dashboard_id}).all()
+    elif len(visible.task_ids) <= visibility.IN_LIST_MAX:
+        tasks = db.scalars(statements.tasks_for_dashboard(fieldset, by_id=True), {"dashboard_id": dashboard_id, "task_ids": list(visible.task_ids)}).all()
+    else:
+        statement = select(models.Task).where(models.Task.dashboard_id == dashboard_id, visible.task_filter(models.Task.id)) \
+            .options(*fieldset.loader_options()).order_by(models.Task.id)
+        tasks = db.scalars(statement).all()
+    if fieldset.expands("comments", "replies"):
+        for task in tasks:
+            link_replies(task.comments)
+    return tasks
+
+# Sort keys accepted by get_task_page; prefix with "-" for descending. Each is backed by
+# an ix_tasks_dashboard_* index (id order comes with every index on tasks).
+TASK_SORTS = ("id", "title", "status", "deadline")
+
+def encode_task_cursor(sort: str, value, task_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort, value, task_id]).encode()).decode()
+
+def decode_task_cursor(cursor: str, sort: str):
+    # Returns (value, task_id); raises ValueError for malformed cursors or a different sort.
+    try:
+        cursor_sort, value, task_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort or not isinstance(task_id, int):
+        raise ValueError("Cursor does not match the requested sort")
+    if value is not None and sort.lstrip("-") == "deadline":
+        value = datetime.fromisoformat(value)
+    return value, task_id
+
+def get_task_page(db: Session, dashboard_id: int, current_user: models.User, status: Optional[List[str]] = None,
+                  deadline_from: Optional[datetime] = None, deadline_to: Optional[datetime] = None, worker_id: Optional[int] = None,
+                  overdue: bool = False, sort: str = "id", cursor: Optional[str] = None, limit: int = 50,
+                  fieldset: Optional[fieldsets.FieldSet] = None):
+    # Keyset-paginated, filtered listing of one dashboard's tasks, ordered by `sort` with id
+    # as the tie-breaker. Tasks without a value for the sort column come last in either
+    # direction; they are read as a second segment so both halves walk an index in order.
+    # Returns (tasks, next_cursor).
+    descending = sort.startswith("-")
+    name = sort[1:] if descending else sort
+    if name not in TASK_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'; expected one of {', '.join(TASK_SORTS)}, optionally prefixed with '-'")
+    column = getattr(models.Task, name)
+    after = decode_task_cursor(cursor, sort) if cursor else None
+    fieldset = fieldset or fieldsets.full(schemas.Task)
+
+    query = db.query(models.Task, column).filter(models.Task.dashboard_id == dashboard_id).options(*fieldset.loader_options())
+    visible = visibility.for_user(db, current_user).task_filter(models.Task.id, models.Task.dashboard_id)
+    if visible is not None:
+        query = query.filter(visible)
+    if worker_id is not None:
+        query = query.filter(models.Task.id.in_(select(models.TaskWorkers.task_id).where(models.TaskWorkers.user_id == worker_id)))
+    if status:
+        # Rows written before the column default existed have no status; they read as Pending.
+        matches = models.Task.status.in_(status)
+        query = query.filter(or_(matches, models.Task.status.is_(None)) if "Pending" in status else matches)
+    if deadline_from is not None:
+        query = query.filter(models.Task.deadline >= deadline_from)
+    if deadline_to is not None:
+        query = query.filter(models.Task.deadline <= deadline_to)
+    if overdue:
+        query = query.filter(models.Task.deadline < datetime.utcnow(),
+                             or_(models.Task.status != TASK_DONE_STATUS, models.Task.status.is_(None)))
+
+    task_id = models.Task.id
+    rows = []
+    if after is None or after[0] is not None:
+        segment = query.filter(column.isnot(None))
+        if after is not None:
+            value, last_id = after
+            if column is task_id:
+                segment = segment.filter(task_id < last_id if descending else task_id > last_id)
+            # A row-value comparison lets SQLite seek straight to the cursor in the index.
+            elif descending:
+                segment = segment.filter(tuple_(column, task_id) < tuple_(value, last_id))
+            else:
+                segment = segment.filter(tuple_(column, task_id) > tuple_(value, last_id))
+        order = [column.desc(), task_id.desc()] if descending else [column.asc(), task_id.asc()]
+        # Fetch one extra row to know whether another page exists.
+        rows = segment.order_by(*order[:1] if column is task_id else order).limit(limit + 1).all()
+    if len(rows) <= limit and column is not task_id and column.nullable:
+        segment = query.filter(column.is_(None))
+        if after is not None and after[0] is None:
+            segment = segment.filter(task_id < after[1] if descending else task_id > after[1])
+        rows += segment.order_by(task_id.desc() if descending else task_id.asc()).limit(limit + 1 - len(rows)).all()
+
+    next_cursor = encode_task_cursor(sort, rows[limit - 1][1], rows[limit - 1][0].id) if len(rows) > limit else None
+    tasks = [task for task, _ in rows[:limit]]
+    if fieldset.expands("comments", "replies"):
+        for task in tasks:
+            link_replies(task.comments)
+    return tasks, next_cursor
 
 def create_task(db: Session, task: schemas.TaskCreate):
     db_task = models.Task(title=task.title, description=task.description, deadline=task.deadline, dashboard_id=task.dashboard_id)
@@ -87,9 +291,221 @@ def assign_worker_to_task(db: Session, task_id: int, user_id: int):
         db.refresh(db_task)
     return db_task
 
+# --- Bulk Task Operations ---
+# Set-based counterparts of create_task and assign_worker_to_task: each call is one
+# transaction with one INSERT per table, and reports a result per input item instead of
+# failing the whole batch. They write with Core statements, which skip the ORM flush, so
+# row versions, dashboard stats and cached visibility are updated here rather than by the
+# session hooks. Dashboards and tasks the caller can't see are reported as not found.
+
+def _insert_assignments(db: Session, pairs, current_user: models.User):
+    # Inserts (task_id, user_id) pairs, ignoring ones that already exist. Returns
+    # {pair: status} and queues one outbox event covering every new assignment.
+    task_ids = {task_id for task_id, _ in pairs}
+    user_ids = {user_id for _, user_id in pairs}
+    visible = visibility.for_user(db, current_user)
+    found_tasks = {task_id for task_id, dashboard_id in db.execute(select(models.Task.id, models.Task.dashboard_id).where(models.Task.id.in_(task_ids)))
+                   if visible.can_view_task(task_id, dashboard_id)} if task_ids else set()
+    found_users = set(db.scalars(select(models.User.id).where(models.User.id.in_(user_ids)))) if user_ids else set()
+    valid = [pair for pair in dict.fromkeys(pairs) if pair[0] in found_tasks and pair[1] in found_users]
+
+    inserted = set()
+    if valid:
+        statement = sqlite_insert(models.TaskWorkers).values([{"task_id": task_id, "user_id": user_id} for task_id, user_id in valid]) \
+            .on_conflict_do_nothing().returning(models.TaskWorkers.task_id, models.TaskWorkers.user_id)
+        inserted = {tuple(row) for row in db.execute(statement)}
+    if inserted:
+        new_workers = defaultdict(list)
+        for task_id, user_id in inserted:
+            new_workers[task_id].append(user_id)
+        deltas = Counter()
+        for task_id, dashboard_id, task_status in db.execute(select(models.Task.id, models.Task.dashboard_id, models.Task.status).where(models.Task.id.in_(new_workers))):
+            deltas.update(dashboard_stats.worker_keys(dashboard_id, task_status, new_workers[task_id]))
+        dashboard_stats.apply(db, deltas)
+        # A task's workers are part of its sync payload.
+        db.execute(
+            update(models.Task).where(models.Task.id.in_({task_id for task_id, _ in inserted}))
+            .values(row_version=versioning.next_version(db)).execution_options(synchronize_session=False)
+        )
+        visibility.mark_stale(db, {user_id for _, user_id in inserted})
+        add_outbox_event(db, TASKS_ASSIGNED, {"assignments": sorted(inserted), "assigned_by": current_user.id})
+
+    statuses = {}
+    for pair in pairs:
+        if pair[0] not in found_tasks:
+            statuses[pair] = "task_not_found"
+        elif pair[1] not in found_users:
+            statuses[pair] = "user_not_found"
+        else:
+            statuses[pair] = "assigned" if pair in inserted else "already_assigned"
+    return statuses
+
+def bulk_create_tasks(db: Session, items: List[schemas.BulkTaskItem], current_user: models.User):
+    dashboard_ids = {item.dashboard_id for item in items}
+    found_dashboards = {dashboard_id for dashboard_id in db.scalars(select(models.Dashboard.id).where(models.Dashboard.id.in_(dashboard_ids)))
+                        if visibility.for_user(db, current_user).can_view_dashboard(dashboard_id)} if dashboard_ids else set()
+    results = [{"index": index, "status": "dashboard_not_found"} for index in range(len(items))]
+    to_create = [index for index, item in enumerate(items) if item.dashboard_id in found_dashboards]
+
+    if to_create:
+        version = versioning.next_version(db)
+        rows = [{"title": items[index].title, "description": items[index].description, "deadline": items[index].deadline,
+                 "dashboard_id": items[index].dashboard_id, "row_version": version} for index in to_create]
+        task_ids = db.scalars(insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True), rows).all()
+        for index, task_id in zip(to_create, task_ids):
+            results[index].update(status="created", task_id=task_id)
+        deltas = Counter()
+        for row in rows:
+            deltas.update(dashboard_stats.task_keys(row["dashboard_id"], None, []))
+        dashboard_stats.apply(db, deltas)
+
+        pairs = [(results[index]["task_id"], user_id) for index in to_create for user_id in items[index].worker_ids]
+        statuses = _insert_assignments(db, pairs, current_user=current_user)
+        for index in to_create:
+            task_id = results[index]["task_id"]
+            worker_ids = list(dict.fromkeys(items[index].worker_ids))
+            results[index]["assigned"] = [user_id for user_id in worker_ids if statuses[(task_id, user_id)] == "assigned"]
+            results[index]["unknown_worker_ids"] = [user_id for user_id in worker_ids if statuses[(task_id, user_id)] == "user_not_found"]
+    db.commit()
+    return results
+
+def bulk_assign_workers(db: Session, assignments: List[schemas.BulkAssignment], current_user: models.User):
+    pairs = [(assignment.task_id, assignment.user_id) for assignment in assignments]
+    statuses = _insert_assignments(db, pairs, current_user=current_user)
+    db.commit()
+    # A pair repeated in the request is assigned once; its later occurrences report
+    # "already_assigned".
+    results, seen = [], set()
+    for index, pair in enumerate(pairs):
+        result_status = statuses[pair]
+        if result_status == "assigned" and pair in seen:
+            result_status = "already_assigned"
+        seen.add(pair)
+        results.append({"index": index, "task_id": pair[0], "user_id": pair[1], "status": result_status})
+    return results
+
+# --- Search ---
+def search_tasks_and_comments(db: Session, current_user: models.User, q: str, limit: int = 20, offset: int = 0):
+    # Ranked full-text hits over tasks and comments (see search.py), limited to the tasks
+    # the user can see (see visibility.py). Returns the hits and the offset of the next
+    # page, or None.
+    query = search.match_query(q)
+    visible = visibility.for_user(db, current_user)
+    if not query or visible.sees_nothing:
+        return [], None
+    Task, Comment = models.Task, models.Comment
+    task_hits = select(
+        literal("task").label("type"), Task.id.label("id"), Task.id.label("task_id"), Task.dashboard_id, Task.title,
+        search.snippet(search.tasks_fts).label("snippet"), search.rank(search.tasks_fts, 5.0, 1.0).label("rank"),
+    ).select_from(search.tasks_fts).join(Task, Task.id == search.tasks_fts.c.rowid).where(search.match(search.tasks_fts, query))
+    comment_hits = select(
+        literal("comment").label("type"), Comment.id.label("id"), Comment.task_id, Task.dashboard_id, Task.title,
+        search.snippet(search.comments_fts).label("snippet"), search.rank(search.comments_fts).label("rank"),
+    ).select_from(search.comments_fts).join(Comment, Comment.id == search.comments_fts.c.rowid).join(Task, Task.id == Comment.task_id) \
+        .where(search.match(search.comments_fts, query))
+
+    visible_tasks = visible.task_filter(Task.id, Task.dashboard_id)
+    if visible_tasks is not None:
+        task_hits = task_hits.where(visible_tasks)
+        comment_hits = comment_hits.where(visible_tasks)
+
+    hits = union_all(task_hits, comment_hits).subquery()
+    # Fetch one extra row to know whether another page exists.
+    rows = db.execute(select(hits).order_by(hits.c.rank, hits.c.type, hits.c.id).limit(limit + 1).offset(offset)).all()
+    next_offset = offset + limit if len(rows) > limit else None
+    items = [
+        {"type": row.type, "id": row.id, "task_id": row.task_id, "dashboard_id": row.dashboard_id,
+         "task_title": row.title, "snippet": search.highlight(row.snippet), "rank": row.rank}
+        for row in rows[:limit]
+    ]
+    return items, next_offset
+
+# --- Sync ---
+def get_changes_since(db: Session, current_user: models.User, since: int = 0, limit: int = 500):
+    # Rows created or updated after the `since` cursor, plus tombstones for deleted ones,
+    # limited to what the caller can see (see visibility.py), oldest first and about `limit`
+    # at a time. Rows written by one flush share a version and always come in the same
+    # batch, so a batch can run over `limit`. Returns the cursor to pass as `since` next
+    # time, the highest version in the batch, and whether more changes wait past it; the
+    # last batch's cursor is the current version, skipping changes the caller can't see.
+    Dashboard, Task, Comment, Tombstone = models.Dashboard, models.Task, models.Comment, models.Tombstone
+    latest = db.query(models.ChangeCounter.version).filter(models.ChangeCounter.id == 1).scalar() or 0
+    if current_user.role not in (models.Role.CEO, models.Role.MANAGER, models.Role.WORKER):
+        return {"cursor": latest, "has_more": False}
+
+    filters = {model: [] for model in (Dashboard, Task, Comment, Tombstone)}
+    visible = visibility.for_user(db, current_user)
+    if visible.dashboard_ids is not None:
+        filters[Dashboard].append(visible.dashboard_filter(Dashboard.id))
+        filters[Task].append(visible.task_filter(Task.id, Task.dashboard_id))
+        filters[Comment].append(visible.task_filter(Comment.task_id))
+    # Deleted rows are no longer in the visibility sets: managers get the tombstones of what
+    # they owned, workers those of tasks and comments in dashboards they still have tasks in,
+    # and of deleted dashboards the copies addressed to them (see versioning.py).
+    if current_user.role == models.Role.WORKER:
+        filters[Tombstone].append(
+            ((Tombstone.entity_type != "dashboard") & visible.dashboard_filter(Tombstone.dashboard_id)) | (Tombstone.user_id == current_user.id)
+        )
+    else:
+        filters[Tombstone].append(Tombstone.user_id.is_(None))
+        if current_user.role == models.Role.MANAGER:
+            filters[Tombstone].append(Tombstone.owner_id == current_user.id)
+
+    def changed(model, up_to: int) -> list:
+        return [model.row_version > since, model.row_version <= up_to, *filters[model]]
+
+    versions = union_all(*(select(model.row_version.label("row_version")).where(*changed(model, latest)) for model in filters)).subquery()
+    batch = db.scalars(select(versions.c.row_version).order_by(versions.c.row_version).limit(limit + 1)).all()
+    cursor = latest
+    if len(batch) > limit:
+        last = batch[limit - 1]
+        if batch[limit] > last or db.scalar(select(versions.c.row_version).where(versions.c.row_version > last).limit(1)) is not None:
+            cursor = last
+
+    return {
+        "cursor": cursor,
+        "has_more": cursor < latest,
+        "dashboards": db.query(Dashboard).filter(*changed(Dashboard, cursor)).order_by(Dashboard.row_version).all(),
+        "tasks": db.query(Task).filter(*changed(Task, cursor)).options(selectinload(Task.workers)).order_by(Task.row_version).all(),
+        "comments": db.query(Comment).filter(*changed(Comment, cursor)).options(selectinload(Comment.author), selectinload(Comment.files))
+            .order_by(Comment.row_version).all(),
+        "deleted": db.query(Tombstone).filter(*changed(Tombstone, cursor)).order_by(Tombstone.row_version).all(),
+    }
+
 # --- Comment and File CRUD ---
-def get_comments_for_task(db: Session, task_id: int):
-    return db.query(models.Comment).filter(models.Comment.task_id == task_id).options(joinedload(models.Comment.author), joinedload(models.Comment.files), joinedload(models.Comment.replies)).order_by(models.Comment.created_at.asc()).all()
+def link_replies(comments):
+    # Wires up `replies` in memory among already loaded comments (a whole thread, e.g. a
+    # task's `comments`), so serializing the tree never goes back to the database.
+    children = defaultdict(list)
+    for comment in comments:
+        if comment.parent_id is not None:
+            children[comment.parent_id].append(comment)
+    for comment in comments:
+        set_committed_value(comment, "replies", children.get(comment.id, []))
+
+def build_comment_tree(rows):
+    # Links (Comment, depth) rows into trees and returns the roots. Comments at max_depth
+    # are returned without their replies.
+    link_replies([comment for comment, _ in rows])
+    return [comment for comment, depth in rows if depth == 0]
+
+def get_comments_for_task(db: Session, task_id: int, skip: int = 0, limit: Optional[int] = None, max_depth: Optional[int] = None, fieldset: Optional[fieldsets.FieldSet] = None):
+    # Loads a task's comment thread in a fixed number of queries: one recursive CTE walks the
+    # paginated top-level comments down to max_depth, then the relationships in the fieldset
+    # (author and files by default) are batch-loaded.
+    Comment = models.Comment
+    fieldset = fieldset or fieldsets.full(schemas.Comment)
+    if not fieldset.expands("replies"):
+        max_depth = 0
+    if skip and limit is None:
+        # An offset without a limit has no portable bound form; build this one as is.
+        roots = select(Comment.id).where(Comment.task_id == task_id, Comment.parent_id.is_(None)) \
+            .order_by(Comment.created_at.asc(), Comment.id.asc()).offset(skip).subquery()
+        rows = db.execute(comment_thread_statement(roots, max_depth, options=fieldset.loader_options())).all()
+    else:
+        statement = statements.comment_thread(fieldset, paged=limit is not None, depth_limited=max_depth is not None)
+        rows = db.execute(statement, {"task_id": task_id, "skip": skip, "limit": limit, "max_depth": max_depth}).all()
+    return build_comment_tree(rows)
 
 def create_comment(db: Session, comment: schemas.CommentCreate, author_id: int):
     db_comment = models.Comment(**comment.dict(), author_id=author_id)
@@ -98,20 +514,13 @@ def create_comment(db: Session, comment: schemas.CommentCreate, author_id: int):
     db.refresh(db_comment)
     return db_comment
 
-def create_file_record(db: Session, file_name: str, file_path: str, comment_id: int):
-    db_file = models.File(file_name=file_name, file_path=file_path, comment_id=comment_id)
+def create_file_record(db: Session, file_name: str, file_path: str, comment_id: int, content_hash: Optional[str] = None, size: Optional[int] = None):
+    db_file = models.File(file_name=file_name, file_path=file_path, comment_id=comment_id, content_hash=content_hash, size=size)
     db.add(db_file)
     db.commit()
     db.refresh(db_file)
     return db_file
 
-def save_upload_file(upload_file: UploadFile, destination: str):
-    try:
-        with open(destination, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-    finally:
-        upload_file.file.close()
-
 def update_comment_status(db: Session, comment_id: int, status: schemas.CommentStatusUpdate):
     db_comment = db.query(models.Comment).filter(models.Comment.id == comment_id).first()
     if db_comment:
@@ -119,3 +528,75 @@ def update_comment_status(db: Session, comment_id: int, status: schemas.CommentS
         db.commit()
         db.refresh(db_comment)
     return db_comment
+
+# --- Archive ---
+# Read and restore access to the archival tier (see archive.py). Archived tasks are
+# visible to whoever could see them before: the CEO, the dashboard's manager, and the
+# workers they were assigned to.
+
+def _archived_task_filter(visible: visibility.Visibility):
+    # WHERE clause limiting archived tasks to `visible`'s user; None if unrestricted.
+    if visible.task_ids is None:
+        return visible.dashboard_filter(models.ArchivedTask.dashboard_id)
+    if visible.role != models.Role.WORKER:
+        return false()
+    assigned = select(models.ArchivedTaskWorkers.task_id).where(models.ArchivedTaskWorkers.user_id == visible.user_id)
+    return models.ArchivedTask.id.in_(assigned)
+
+def _archive_loader_options(model, fieldset: fieldsets.FieldSet) -> list:
+    # The relationships the fieldset expands, batch-loaded on the archive model of the same
+    # shape. Archived rows are read rarely, so columns aren't trimmed.
+    options = []
+    for name, child in fieldset.expand.items():
+        relationship = getattr(model, name)
+        if child is fieldset:
+            options.append(noload(relationship))
+        else:
+            options.append(selectinload(relationship).options(*_archive_loader_options(relationship.property.mapper.class_, child)))
+    return options
+
+def can_view_archived_task(db: Session, current_user: models.User, task_id: int) -> bool:
+    statement = select(models.ArchivedTask.id).where(models.ArchivedTask.id == task_id)
+    visible = _archived_task_filter(visibility.for_user(db, current_user))
+    if visible is not None:
+        statement = statement.where(visible)
+    return db.execute(statement).first() is not None
+
+def get_archived_tasks_for_dashboard(db: Session, dashboard_id: int, current_user: models.User, fieldset: Optional[fieldsets.FieldSet] = None):
+    fieldset = fieldset or fieldsets.full(schemas.Task)
+    statement = select(models.ArchivedTask).where(models.ArchivedTask.dashboard_id == dashboard_id) \
+        .options(*_archive_loader_options(models.ArchivedTask, fieldset)).order_by(models.ArchivedTask.id)
+    visible = _archived_task_filter(visibility.for_user(db, current_user))
+    if visible is not None:
+        statement = statement.where(visible)
+    tasks = db.scalars(statement).all()
+    if fieldset.expands("comments", "replies"):
+        for task in tasks:
+            link_replies(task.comments)
+    return tasks
+
+def get_archived_comments_for_task(db: Session, task_id: int, skip: int = 0, limit: Optional[int] = None, max_depth: Optional[int] = None, fieldset: Optional[fieldsets.FieldSet] = None):
+    # Same result as get_comments_for_task for an archived task. The whole thread is read
+    # and cut down in memory; archived threads are finished and rarely opened.
+    Comment = models.ArchivedComment
+    fieldset = fieldset or fieldsets.full(schemas.Comment)
+    if not fieldset.expands("replies"):
+        max_depth = 0
+    comments = db.scalars(select(Comment).where(Comment.task_id == task_id)
+                          .options(*_archive_loader_options(Comment, fieldset)).order_by(Comment.created_at.asc(), Comment.id.asc())).all()
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+    roots = children[None][skip:skip + limit if limit is not None else None]
+    depths, level, depth = {}, roots, 0
+    while level and (max_depth is None or depth <= max_depth):
+        depths.update((comment.id, depth) for comment in level)
+        level = [reply for comment in level for reply in children[comment.id]]
+        depth += 1
+    return build_comment_tree([(comment, depths[comment.id]) for comment in comments if comment.id in depths])
+
+def restore_task(db: Session, task_id: int):
+    if not archive.restore_tasks(db, [task_id]):
+        return None
+    db.commit()
+    return db.get(models.Task, task_id)
@@ -0,0 +1,96 @@
+# backend/crud_async.py
+#
+# Async counterparts of the functions in crud.py, for routes running on the event loop.
+# AsyncSession cannot lazy-load, so every function eager-loads what its callers serialize.
+
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+import models, schemas, statements, visibility
+from crud import comment_thread_statement, build_comment_tree
+from jobs import add_outbox_event, COMMENT_CREATED, COMMENT_STATUS_CHANGED
+
+# --- User CRUD ---
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(statements.USER_BY_EMAIL, {"email": email})
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    # The caller hashes the password (security.get_password_hash_async), off the event loop.
+    db_user = models.User(email=user.email, hashed_password=hashed_password, full_name=user.full_name, role=user.role)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def update_user_password_hash(db: AsyncSession, user: models.User, hashed_password: str):
+    user.hashed_password = hashed_password
+    await db.commit()
+    return user
+
+# --- Task CRUD ---
+async def get_task(db: AsyncSession, task_id: int):
+    # Loads the relations used to pick notification recipients.
+    result = await db.execute(
+        select(models.Task).where(models.Task.id == task_id)
+        .options(selectinload(models.Task.workers), joinedload(models.Task.dashboard))
+    )
+    return result.scalars().first()
+
+async def can_view_task(db: AsyncSession, current_user: models.User, task_id: int) -> bool:
+    visible = await visibility.visibility_cache.for_user_async(db, current_user)
+    if visible.task_ids is not None:
+        return task_id in visible.task_ids
+    task = (await db.execute(select(models.Task.dashboard_id).where(models.Task.id == task_id))).first()
+    return task is not None and visible.can_view_dashboard(task.dashboard_id)
+
+# --- Comment and File CRUD ---
+async def can_view_comment(db: AsyncSession, current_user: models.User, comment_id: int) -> bool:
+    # Whether the comment exists and belongs to a task the user can see.
+    visible = await visibility.visibility_cache.for_user_async(db, current_user)
+    comment = (await db.execute(
+        select(models.Comment.task_id, models.Task.dashboard_id).outerjoin(models.Task, models.Task.id == models.Comment.task_id)
+        .where(models.Comment.id == comment_id)
+    )).first()
+    return comment is not None and visible.can_view_task(comment.task_id, comment.dashboard_id)
+
+async def get_comment(db: AsyncSession, comment_id: int):
+    # Returns the comment with author, files, task and its full reply tree loaded.
+    roots = select(models.Comment.id).where(models.Comment.id == comment_id).subquery()
+    statement = comment_thread_statement(roots) \
+        .options(selectinload(models.Comment.task)) \
+        .execution_options(populate_existing=True)
+    result = await db.execute(statement)
+    comments = build_comment_tree(result.all())
+    return comments[0] if comments else None
+
+async def create_comment(db: AsyncSession, comment: schemas.CommentCreate, author_id: int, attachment: Optional[dict] = None):
+    # The comment, its optional File row and the "comment created" outbox event are
+    # committed together, so a notification can't be lost between commit and send.
+    db_comment = models.Comment(**comment.dict(), author_id=author_id)
+    db.add(db_comment)
+    await db.flush()
+    if attachment:
+        db.add(models.File(**attachment, comment_id=db_comment.id))
+    add_outbox_event(db, COMMENT_CREATED, {"comment_id": db_comment.id, "task_id": db_comment.task_id, "author_id": author_id})
+    await db.commit()
+    await db.refresh(db_comment)
+    return db_comment
+
+async def create_file_record(db: AsyncSession, file_name: str, file_path: str, comment_id: int, content_hash: Optional[str] = None, size: Optional[int] = None):
+    db_file = models.File(file_name=file_name, file_path=file_path, comment_id=comment_id, content_hash=content_hash, size=size)
+    db.add(db_file)
+    await db.commit()
+    await db.refresh(db_file)
+    return db_file
+
+async def update_comment_status(db: AsyncSession, comment_id: int, status: schemas.CommentStatusUpdate, reviewer_id: Optional[int] = None):
+    db_comment = await db.get(models.Comment, comment_id)
+    if db_comment:
+        db_comment.status = status.status
+        if reviewer_id is not None:
+            add_outbox_event(db, COMMENT_STATUS_CHANGED, {"comment_id": comment_id, "reviewer_id": reviewer_id, "status": status.status.value})
+        await db.commit()
+        db_comment = await get_comment(db, comment_id)
+    return db_comment
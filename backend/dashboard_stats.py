@@ -0,0 +1,186 @@
+# backend/dashboard_stats.py
+#
+# Keeps models.DashboardStat current. A before_flush hook turns every task, comment and
+# worker-assignment change in the session into counter deltas and applies them with one
+# upsert, so the counters commit (or roll back) with the writes that moved them; this
+# covers crud, crud_async and cascaded deletes alike. Core/bulk statements skip the flush
+# and call apply() themselves (see crud's bulk operations).
+#
+# Counters, keyed by (dashboard_id, kind, key):
+#   task_status        tasks per status
+#   comment_status     comments per CommentStatus value
+#   worker_tasks       tasks assigned to a worker (key = user id)
+#   worker_open_tasks  the same, excluding Completed tasks
+#
+# Overdue counts depend on the clock rather than on writes, so readers count those from
+# the (dashboard_id, deadline) index instead.
+#
+# Archiving a task (archive.py) leaves the counters as they are: archived tasks still count.
+#
+# If the counters drift (manual SQL, a bug), rebuild them from the source tables:
+#   python -m dashboard_stats                 # every dashboard
+#   python -m dashboard_stats --dashboard 7   # just one
+
+import argparse
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, event, func, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import models
+
+TASK_STATUS = "task_status"
+COMMENT_STATUS = "comment_status"
+WORKER_TASKS = "worker_tasks"
+WORKER_OPEN_TASKS = "worker_open_tasks"
+
+# Kept in step with crud.TASK_DONE_STATUS; crud imports this module, not the other way round.
+TASK_DONE_STATUS = "Completed"
+DEFAULT_TASK_STATUS = "Pending"
+
+# Rows per upsert statement; keeps rebuilds under SQLite's bound-parameter limit.
+UPSERT_BATCH_SIZE = 1000
+
+def worker_keys(dashboard_id: Optional[int], status: Optional[str], worker_ids: Iterable[int]) -> Counter:
+    # What a task's worker assignments contribute to its dashboard's counters.
+    keys = Counter()
+    if dashboard_id is None:
+        return keys
+    for user_id in worker_ids:
+        keys[(dashboard_id, WORKER_TASKS, str(user_id))] += 1
+        if (status or DEFAULT_TASK_STATUS) != TASK_DONE_STATUS:
+            keys[(dashboard_id, WORKER_OPEN_TASKS, str(user_id))] += 1
+    return keys
+
+def task_keys(dashboard_id: Optional[int], status: Optional[str], worker_ids: Iterable[int]) -> Counter:
+    # What one task, with its workers, contributes to its dashboard's counters.
+    keys = worker_keys(dashboard_id, status, worker_ids)
+    if dashboard_id is not None:
+        keys[(dashboard_id, TASK_STATUS, status or DEFAULT_TASK_STATUS)] += 1
+    return keys
+
+def comment_key(dashboard_id: int, status) -> tuple:
+    return (dashboard_id, COMMENT_STATUS, (status or models.CommentStatus.PENDING).value)
+
+def apply(session: Session, deltas: Counter):
+    # Adds the deltas to the counters and drops counters that reach zero.
+    rows = [{"dashboard_id": dashboard_id, "kind": kind, "key": key, "count": delta}
+            for (dashboard_id, kind, key), delta in deltas.items() if delta]
+    if not rows:
+        return
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        statement = sqlite_insert(models.DashboardStat).values(rows[start:start + UPSERT_BATCH_SIZE])
+        session.execute(statement.on_conflict_do_update(
+            index_elements=["dashboard_id", "kind", "key"],
+            set_={"count": models.DashboardStat.count + statement.excluded["count"]},
+        ))
+    shrunk = {row["dashboard_id"] for row in rows if row["count"] < 0}
+    if shrunk:
+        session.execute(delete(models.DashboardStat).where(models.DashboardStat.dashboard_id.in_(shrunk), models.DashboardStat.count <= 0))
+
+def _previous(session: Session, obj, column):
+    # The value `column` had before this flush. History only holds it if it was loaded;
+    # otherwise the row still has it until the flush runs.
+    history = inspect(obj).attrs[column.key].history
+    if history.deleted:
+        return history.deleted[0]
+    if not history.added:
+        return getattr(obj, column.key)
+    return session.execute(select(column).where(type(obj).id == obj.id)).scalar()
+
+def _changed(obj, *names) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+def task_workers(session: Session, task):
+    # (before, after) worker ids of a task in the session.
+    history = inspect(task).attrs.workers.history
+    if history.added or history.deleted or history.unchanged:
+        unchanged = [user.id for user in history.unchanged]
+        return unchanged + [user.id for user in history.deleted], unchanged + [user.id for user in history.added]
+    if task.id is None:
+        return [], []
+    workers = list(session.scalars(select(models.TaskWorkers.user_id).where(models.TaskWorkers.task_id == task.id)))
+    return workers, workers
+
+@event.listens_for(Session, "before_flush")
+def _track_dashboard_stats(session, flush_context, instances):
+    deltas = Counter()
+    deleted_dashboards = {obj.id for obj in session.deleted if isinstance(obj, models.Dashboard)}
+
+    for obj in session.new:
+        if isinstance(obj, models.Task):
+            deltas.update(task_keys(obj.dashboard_id, obj.status, [user.id for user in obj.workers]))
+    for obj in session.dirty:
+        if isinstance(obj, models.Task) and _changed(obj, "status", "dashboard_id", "workers"):
+            old_workers, new_workers = task_workers(session, obj)
+            deltas.update(task_keys(obj.dashboard_id, obj.status, new_workers))
+            deltas.subtract(task_keys(_previous(session, obj, models.Task.dashboard_id), _previous(session, obj, models.Task.status), old_workers))
+    for obj in session.deleted:
+        if isinstance(obj, models.Task) and obj.dashboard_id not in deleted_dashboards:
+            deltas.subtract(task_keys(_previous(session, obj, models.Task.dashboard_id), _previous(session, obj, models.Task.status),
+                                      task_workers(session, obj)[0]))
+
+    comments = [obj for obj in session.new | session.dirty | session.deleted if isinstance(obj, models.Comment)]
+    if comments:
+        task_ids = {comment.task_id for comment in comments if comment.task_id is not None}
+        dashboards = dict(session.execute(select(models.Task.id, models.Task.dashboard_id).where(models.Task.id.in_(task_ids))).all()) if task_ids else {}
+        for comment in comments:
+            if comment.task_id is None and comment.task is not None:
+                dashboard_id = comment.task.dashboard_id
+            else:
+                dashboard_id = dashboards.get(comment.task_id)
+            if dashboard_id is None or dashboard_id in deleted_dashboards:
+                continue
+            if comment in session.new:
+                deltas[comment_key(dashboard_id, comment.status)] += 1
+            elif comment in session.deleted:
+                deltas[comment_key(dashboard_id, _previous(session, comment, models.Comment.status))] -= 1
+            elif _changed(comment, "status"):
+                deltas[comment_key(dashboard_id, comment.status)] += 1
+                deltas[comment_key(dashboard_id, _previous(session, comment, models.Comment.status))] -= 1
+
+    apply(session, deltas)
+    if deleted_dashboards:
+        session.execute(delete(models.DashboardStat).where(models.DashboardStat.dashboard_id.in_(deleted_dashboards)))
+
+def rebuild(session: Session, dashboard_id: Optional[int] = None) -> int:
+    """Recomputes the counters from tasks, task_workers and comments, archived ones included
+    (see archive.py); returns the row count."""
+    counters = Counter()
+    tiers = ((models.Task, models.TaskWorkers, models.Comment), (models.ArchivedTask, models.ArchivedTaskWorkers, models.ArchivedComment))
+    for Task, TaskWorkers, Comment in tiers:
+        scope = (lambda query: query.where(Task.dashboard_id == dashboard_id)) if dashboard_id is not None else (lambda query: query)
+        status = func.coalesce(Task.status, DEFAULT_TASK_STATUS)
+        for d, task_status, count in session.execute(scope(select(Task.dashboard_id, status, func.count()).where(Task.dashboard_id.isnot(None)).group_by(Task.dashboard_id, status))):
+            counters[(d, TASK_STATUS, task_status)] += count
+        open_task = case((status != TASK_DONE_STATUS, 1), else_=0)
+        workers = select(Task.dashboard_id, TaskWorkers.user_id, func.count(), func.sum(open_task)).join(TaskWorkers, TaskWorkers.task_id == Task.id) \
+            .where(Task.dashboard_id.isnot(None)).group_by(Task.dashboard_id, TaskWorkers.user_id)
+        for d, user_id, count, open_count in session.execute(scope(workers)):
+            counters[(d, WORKER_TASKS, str(user_id))] += count
+            counters[(d, WORKER_OPEN_TASKS, str(user_id))] += open_count or 0
+        comments = select(Task.dashboard_id, Comment.status, func.count()).join(Comment, Comment.task_id == Task.id) \
+            .where(Task.dashboard_id.isnot(None)).group_by(Task.dashboard_id, Comment.status)
+        for d, comment_status, count in session.execute(scope(comments)):
+            counters[comment_key(d, comment_status)] += count
+
+    stale = delete(models.DashboardStat)
+    if dashboard_id is not None:
+        stale = stale.where(models.DashboardStat.dashboard_id == dashboard_id)
+    session.execute(stale)
+    apply(session, counters)
+    return sum(1 for count in counters.values() if count)
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard statistics counters from the source tables.")
+    parser.add_argument("--dashboard", type=int, help="Only rebuild this dashboard")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        rows = rebuild(db, args.dashboard)
+        db.commit()
+    print(f"Rebuilt {rows} dashboard stat rows")
@@ -1,23 +1,104 @@
-
 # backend/database.py
 # --- Final Version ---
 
-from sqlalchemy import create_engine
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# Define the SQLite database URL.
-# 'sqlite:///./task_dashboard.db' creates the file in the same directory.
-SQLALCHEMY_DATABASE_URL = "sqlite:///./task_dashboard.db"
+load_dotenv()
+
+# The database URL is read from the environment so other backends can be plugged in.
+# The default 'sqlite:///./task_dashboard.db' creates the file in the working directory.
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./task_dashboard.db")
+
+# Pragmas applied to every new SQLite connection. WAL lets readers run alongside the writer,
+# synchronous=NORMAL is durable under WAL, and busy_timeout makes writers wait for the lock
+# instead of failing with "database is locked". Set a variable to an empty string to skip it.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-64000"),  # negative values are KiB
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+}
+
+# Connection pool sizing for the primary (read/write) engine.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# A positive DB_READ_POOL_SIZE enables the read/write split for sync routes: their GET
+# handlers get sessions from a read-only pool of this size, and the primary engine shrinks to
+# a single writer connection. The async engine below is not split: async routes (comments,
+# login, sign-up) and the job queue write through its own pool, and wait for the sync writer
+# on busy_timeout like any other SQLite writer.
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "0"))
+READ_POOL_ENABLED = DB_READ_POOL_SIZE > 0
+
+def is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def apply_sqlite_pragmas(engine, pragmas=SQLITE_PRAGMAS, read_only=False):
+    # Registers a connect hook so every pooled connection gets the same settings.
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value not in (None, ""):
+                cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return engine
+
+def build_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT, pragmas=SQLITE_PRAGMAS, read_only=False):
+    kwargs = {}
+    if is_sqlite(url):
+        # The 'check_same_thread' argument is needed only for SQLite.
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if make_url(url).database not in (None, "", ":memory:"):
+        kwargs.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout)
+    engine = create_engine(url, **kwargs)
+    if is_sqlite(url):
+        apply_sqlite_pragmas(engine, pragmas, read_only=read_only)
+    return engine
 
 # Create the SQLAlchemy engine.
-# The 'check_same_thread' argument is needed only for SQLite.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+if READ_POOL_ENABLED:
+    # SQLite allows one writer at a time anyway; a single connection keeps sync writes queued
+    # in the pool rather than spinning on the database lock.
+    engine = build_engine(SQLALCHEMY_DATABASE_URL, pool_size=1, max_overflow=0)
+    read_engine = build_engine(os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URL), pool_size=DB_READ_POOL_SIZE, max_overflow=0, read_only=True)
+else:
+    engine = build_engine(SQLALCHEMY_DATABASE_URL)
+    read_engine = engine
 
 # Create a SessionLocal class. Each instance will be a database session.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engine and sessions over the same database, for `async def` routes. Its pool isn't
+# shrunk with the read pool enabled: the job queue holds a session while its handlers open
+# their own, which a single connection would deadlock.
+# Requests using AsyncSessionLocal never block the event loop on SQLite I/O.
+# Lazy loading is not available on async sessions, so async CRUD must eager-load what it returns.
+def async_url(url) -> str:
+    url = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
+    if url.drivername in drivers:
+        url = url.set(drivername=drivers[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+ASYNC_SQLALCHEMY_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", async_url(SQLALCHEMY_DATABASE_URL))
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+if is_sqlite(ASYNC_SQLALCHEMY_DATABASE_URL):
+    apply_sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # Create a Base class. Our ORM models will inherit from this class.
 Base = declarative_base()
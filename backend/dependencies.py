@@ -2,24 +2,50 @@
 # backend/dependencies.py
 # --- Final Version ---
 
-from fastapi import Depends, HTTPException, status
+import hmac
+import os
+
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Optional
 
-import crud, models, schemas, security
-from database import SessionLocal
+import crud_async, fieldsets, models, schemas, security
+from database import SessionLocal, ReadSessionLocal, AsyncSessionLocal, READ_POOL_ENABLED
+from principal_cache import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_db():
-    db = SessionLocal()
+# Bearer token a scraper must send to read /metrics; without one /metrics isn't served.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+def get_db(request: Request):
+    # With the read pool enabled, GET/HEAD handlers are served from read-only connections
+    # and only writes go through the single writer connection. Async routes write through
+    # the async engine's own pool (see database.py).
+    if READ_POOL_ENABLED and request.method in ("GET", "HEAD"):
+        db = ReadSessionLocal()
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db():
+    # Async counterpart of get_db; routes can switch over one at a time.
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # Verified tokens are cached as read-only principals, so repeat requests skip both the
+    # signature check and the user lookup. Entries never outlive the token's own expiry.
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,12 +60,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = await crud_async.get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(token, principal, token_expires_at=payload.get("exp"))
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_websocket_user(token: str) -> Optional[Principal]:
+    # Browsers can't set headers on a WebSocket handshake, so sockets pass the bearer token
+    # as a query parameter. The session is closed before the socket starts, so an open
+    # socket never holds a database connection.
+    try:
+        async with AsyncSessionLocal() as db:
+            return await get_current_user(token, db)
+    except HTTPException:
+        return None
+
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -62,4 +100,27 @@ def require_roles(required_roles: list[models.Role]):
                 detail=f"Access denied. Required roles: {', '.join(role.value for role in required_roles)}.",
             )
         return current_user
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+def require_metrics_token(request: Request):
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+def sparse_fieldset(schema):
+    # `fields=` and `expand=` for the read routes of `schema`; see fieldsets.py.
+    def fieldset_parser(
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, dotted for nested ones (e.g. name,tasks.title)"),
+        expand: Optional[str] = Query(None, description="Comma-separated relationships to embed (e.g. tasks.workers); empty for none"),
+    ):
+        try:
+            return fieldsets.parse(schema, fields, expand)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return fieldset_parser
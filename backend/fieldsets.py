@@ -0,0 +1,180 @@
+# backend/fieldsets.py
+#
+# Sparse fieldsets for the read routes. `fields=` and `expand=` are parsed into a FieldSet
+# tree that decides both what the response contains (serializers.render) and what gets
+# loaded (loader_options): requested columns via load_only, expanded relationships via
+# selectinload, everything else noload, so unrequested relationships are never queried.
+#
+#   expand    comma-separated relationship paths, e.g. `tasks.workers,tasks.comments.author`.
+#             Omitted: every relationship the schema embeds (the full response). Empty: none.
+#   fields    comma-separated scalar fields, dotted for nested ones, e.g. `name,tasks.title`.
+#             Omitted for a level: all of its scalar fields. `id` is always included.
+#
+# Self-referencing relationships (Comment.replies) reuse their parent's FieldSet, so a
+# thread has the same shape at every depth; crud wires those up in memory instead of
+# loading them level by level.
+#
+# Loader options and serializers depend only on a FieldSet's shape, so they are built once
+# per distinct shape (FieldSet.key()) and reused; most requests ask for the default one.
+
+import threading
+import typing
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Set
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, noload, selectinload
+
+import models, schemas
+from serializers import fieldset_serializer, schema_fields
+
+SCHEMA_MODELS = {
+    schemas.Dashboard: models.Dashboard,
+    schemas.Task: models.Task,
+    schemas.Comment: models.Comment,
+    schemas.User: models.User,
+    schemas.File: models.File,
+}
+
+# Distinct shapes whose loader options and serializers are kept; shapes come from query
+# parameters, so the number seen is unbounded.
+SHAPE_CACHE_SIZE = 256
+
+_shape_cache: "OrderedDict[tuple, object]" = OrderedDict()
+_shape_cache_lock = threading.Lock()
+
+def _cached(kind: str, fieldset: "FieldSet", build):
+    key = (kind, fieldset.key())
+    with _shape_cache_lock:
+        if key in _shape_cache:
+            _shape_cache.move_to_end(key)
+            return _shape_cache[key]
+    value = build()
+    with _shape_cache_lock:
+        _shape_cache[key] = value
+        while len(_shape_cache) > SHAPE_CACHE_SIZE:
+            _shape_cache.popitem(last=False)
+    return value
+
+def _nested_schema(annotation):
+    # The schema a field embeds (List[X], Optional[X] or X), or None for scalar fields.
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Union or origin in (list, typing.List):
+        for arg in args:
+            nested = _nested_schema(arg)
+            if nested is not None:
+                return nested
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+@lru_cache(maxsize=None)
+def relationships(schema) -> Dict[str, type]:
+    return {name: nested for name, annotation, _ in schema_fields(schema) if (nested := _nested_schema(annotation)) is not None}
+
+@lru_cache(maxsize=None)
+def scalar_fields(schema) -> tuple:
+    return tuple(name for name, annotation, _ in schema_fields(schema) if _nested_schema(annotation) is None)
+
+class FieldSet:
+    """The requested shape of one schema, plus the FieldSets of its expanded relationships."""
+
+    def __init__(self, schema, fields: Optional[Set[str]] = None, expand: Optional[Dict[str, "FieldSet"]] = None):
+        self.schema = schema
+        self.model = SCHEMA_MODELS[schema]
+        # None means every scalar field.
+        self.fields = fields
+        self.expand = expand if expand is not None else {}
+
+    def includes(self, name: str) -> bool:
+        return name in self.expand or (name not in relationships(self.schema) and (self.fields is None or name in self.fields))
+
+    def expands(self, *path: str) -> bool:
+        node = self
+        for name in path:
+            node = node.expand.get(name)
+            if node is None:
+                return False
+        return True
+
+    def key(self) -> tuple:
+        """Hashable description of the shape: equal for FieldSets that load and render alike.
+        Only valid once the FieldSet is fully built."""
+        return self._key({})
+
+    def _key(self, seen: dict) -> tuple:
+        if id(self) in seen:
+            # Self-referencing relationship: point back instead of recursing.
+            return seen[id(self)]
+        seen[id(self)] = ("parent", len(seen))
+        fields = frozenset(self.fields) if self.fields is not None else None
+        return (self.schema, fields, tuple(sorted((name, child._key(seen)) for name, child in self.expand.items())))
+
+    def serializer(self):
+        return _cached("serializer", self, lambda: fieldset_serializer(self))
+
+    def loader_options(self, criteria: Optional[dict] = None) -> list:
+        # `criteria` maps relationship names to extra WHERE clauses for their loaders, e.g.
+        # to leave out tasks the user can't see; options with criteria aren't cached.
+        if not criteria:
+            return _cached("loader_options", self, lambda: self._build_loader_options({}))
+        return self._build_loader_options(criteria)
+
+    def _build_loader_options(self, criteria: dict) -> list:
+        mapper = inspect(self.model)
+        # Keys are always loaded: relationship loading and tree building need them.
+        columns = [attr for attr in mapper.column_attrs if any(column.primary_key or column.foreign_keys for column in attr.columns)]
+        columns += [getattr(self.model, name) for name in scalar_fields(self.schema) if self.includes(name)]
+        options = [load_only(*columns)]
+        for name in relationships(self.schema):
+            relationship = getattr(self.model, name)
+            child = self.expand.get(name)
+            if child is None or child is self:
+                # Self-referencing trees are assembled in memory by crud.
+                options.append(noload(relationship))
+            else:
+                if name in criteria:
+                    relationship = relationship.and_(criteria[name])
+                options.append(selectinload(relationship).options(*child.loader_options()))
+        return options
+
+def full(schema) -> FieldSet:
+    """Every field and relationship of the schema: the shape the routes return by default."""
+    fieldset = FieldSet(schema)
+    for name, nested in relationships(schema).items():
+        fieldset.expand[name] = fieldset if nested is schema else full(nested)
+    return fieldset
+
+def parse(schema, fields: Optional[str] = None, expand: Optional[str] = None) -> FieldSet:
+    """Builds a FieldSet from the query parameters; raises ValueError for unknown names."""
+    if expand is None:
+        root = full(schema)
+    else:
+        root = FieldSet(schema)
+        for path in _split(expand):
+            node = root
+            for name in path.split("."):
+                nested = relationships(node.schema).get(name)
+                if nested is None:
+                    raise ValueError(f"Cannot expand '{path}': {node.schema.__name__} has no relationship '{name}'")
+                if name not in node.expand:
+                    node.expand[name] = node if nested is node.schema else FieldSet(nested)
+                node = node.expand[name]
+
+    for path in _split(fields or ""):
+        *parents, name = path.split(".")
+        node = root
+        for parent in parents:
+            if parent not in node.expand:
+                raise ValueError(f"Cannot select '{path}': '{parent}' is not expanded")
+            node = node.expand[parent]
+        if name not in scalar_fields(node.schema):
+            raise ValueError(f"Cannot select '{path}': {node.schema.__name__} has no field '{name}'")
+        node.fields = (node.fields or {"id"}) | {name}
+    return root
+
+def _split(value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
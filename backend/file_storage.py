@@ -0,0 +1,196 @@
+# backend/file_storage.py
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+from starlette.concurrency import run_in_threadpool
+
+import database, models
+
+try:
+    import fcntl
+except ImportError:  # Windows: blobs are only serialised within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIRECTORY = "./uploads"
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Placing and removing blobs. Identical uploads share a blob, so an upload that finds its
+# blob already there can race a request deleting that blob's last File row. Both sides take
+# the blob lock: removal re-checks the committed references under it, and an upload keeps
+# its temp file until its File row has committed, then puts the blob back if it was removed
+# in between (commit_upload). The lock is per process and, where fcntl exists, held on a
+# lock file so workers sharing the directory take turns too. It only covers a stat and a
+# rename or a reference count, so one lock serves every blob.
+_blob_lock = threading.Lock()
+
+@dataclass
+class StoredUpload:
+    file_name: str  # name under UPLOAD_DIRECTORY, stored as File.file_path
+    content_hash: str
+    size: int
+    temp_path: Optional[str] = None  # kept until commit_upload or discard_upload
+    directory: str = UPLOAD_DIRECTORY
+
+@contextmanager
+def _locked(directory: str):
+    # Blocks; only call it from a worker thread.
+    with _blob_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+def _place(temp_path: str, final_path: str, keep_temp: bool):
+    # Puts the blob in place from the temp file unless it is already there; the temp file
+    # is linked (or copied) when kept, moved otherwise.
+    with _locked(os.path.dirname(final_path)):
+        if not os.path.exists(final_path):
+            if not keep_temp:
+                os.replace(temp_path, final_path)
+                return
+            try:
+                os.link(temp_path, final_path)
+            except OSError:
+                shutil.copyfile(temp_path, final_path)
+    if not keep_temp:
+        os.remove(temp_path)
+
+def _remove_temp(temp_path: str):
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+async def store_upload(upload_file: UploadFile, directory: str = UPLOAD_DIRECTORY, max_bytes: Optional[int] = None) -> StoredUpload:
+    """Streams an upload to content-addressed storage without blocking the event loop.
+
+    The file is copied in chunks to a temp file while being hashed, and the blob is
+    linked in as `<sha256><ext>` unless identical content is already stored. The temp file
+    is kept until the caller has committed the File row and calls commit_upload, or
+    discard_upload if that failed; it is removed here if the upload is too large, fails,
+    or the request is cancelled.
+    """
+    if max_bytes is None:
+        max_bytes = MAX_UPLOAD_BYTES
+    if upload_file.size is not None and upload_file.size > max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"File exceeds the {max_bytes} byte limit")
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".upload-{uuid.uuid4()}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        buffer = await run_in_threadpool(open, temp_path, "wb")
+        try:
+            while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"File exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+        finally:
+            await run_in_threadpool(buffer.close)
+        file_extension = os.path.splitext(upload_file.filename or "")[1].lower()
+        file_name = f"{digest.hexdigest()}{file_extension}"
+        await run_in_threadpool(_place, temp_path, os.path.join(directory, file_name), True)
+        return StoredUpload(file_name=file_name, content_hash=digest.hexdigest(), size=size, temp_path=temp_path, directory=directory)
+    except BaseException:
+        # Shielded, so a cancelled request still cleans up.
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(_remove_temp, temp_path)
+        raise
+    finally:
+        await upload_file.close()
+
+async def commit_upload(stored: StoredUpload):
+    # Once the File row is committed: restores the blob if it was removed since
+    # store_upload, and drops the temp file.
+    if stored.temp_path:
+        await run_in_threadpool(_place, stored.temp_path, os.path.join(stored.directory, stored.file_name), False)
+        stored.temp_path = None
+
+async def discard_upload(stored: StoredUpload):
+    # When storing the File row failed: drops the temp file, and the blob unless a
+    # committed row uses it.
+    if stored.temp_path:
+        await run_in_threadpool(_discard, stored.temp_path, stored.directory, stored.file_name)
+        stored.temp_path = None
+
+def _discard(temp_path: str, directory: str, file_name: str):
+    final_path = os.path.join(directory, file_name)
+    with _locked(directory), database.engine.connect() as connection:
+        if _references(connection, file_name):
+            # The row may have committed after all; keep the blob it points at.
+            if not os.path.exists(final_path):
+                os.replace(temp_path, final_path)
+                return
+        elif os.path.exists(final_path):
+            os.remove(final_path)
+    _remove_temp(temp_path)
+
+def _references(connection, file_name: str) -> int:
+    # Archived comments keep their files (see archive.py), so their rows count too.
+    return sum(connection.execute(select(func.count()).select_from(model).where(model.file_path == file_name)).scalar()
+               for model in (models.File, models.ArchivedFile))
+
+def remove_unreferenced(file_names: Iterable[str], directory: str = UPLOAD_DIRECTORY):
+    """Removes the blobs no committed File or ArchivedFile row points at. Blocks; run it
+    in a worker thread."""
+    with _locked(directory), database.engine.connect() as connection:
+        for file_name in file_names:
+            path = os.path.join(directory, file_name)
+            if not _references(connection, file_name) and os.path.exists(path):
+                os.remove(path)
+
+# Stored blobs are reference-counted by the File rows pointing at them. When the last
+# row for a blob is deleted, the blob is removed once the transaction commits, if it is
+# still unreferenced then (see the blob lock above).
+@event.listens_for(models.File, "after_delete")
+@event.listens_for(models.ArchivedFile, "after_delete")
+def _track_released_upload(mapper, connection, target):
+    references = _references(connection, target.file_path)
+    session = object_session(target)
+    if not references and session is not None:
+        session.info.setdefault("released_uploads", set()).add(target.file_path)
+
+def _remove_released(file_names):
+    try:
+        remove_unreferenced(file_names)
+    except Exception:
+        logger.exception("Removing released uploads failed")
+
+# Released blobs are removed here, never on the committing thread: its session still holds
+# its connection while after_commit runs, and with the read pool enabled the writer pool has
+# no second one to lend (see database.py). Async sessions commit on the event loop, which
+# mustn't wait for the blob lock either.
+_removals = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-removal")
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_uploads(session):
+    file_names = session.info.pop("released_uploads", None)
+    if file_names:
+        _removals.submit(_remove_released, file_names)
+
+def wait_for_removals():
+    """Blocks until the blob removals queued so far have run."""
+    _removals.submit(lambda: None).result()
+
+@event.listens_for(Session, "after_rollback")
+def _keep_released_uploads(session):
+    session.info.pop("released_uploads", None)
@@ -0,0 +1,221 @@
+# backend/instrumentation.py
+#
+# Per-request instrumentation. InstrumentationMiddleware opens a RequestStats for every HTTP
+# request; engine hooks add each SQL statement's count and time to it, and serializers add
+# the time spent building and encoding response bodies. The totals go out in the
+# Server-Timing header (visible in the browser's network panel) and feed the per-route
+# metrics that /metrics exposes in the Prometheus text format, together with connection
+# pool, WebSocket, principal cache and visibility cache gauges, and the admission control
+# signals and rejections (see admission.py). Only scrapers holding METRICS_TOKEN can read
+# it (see dependencies.py).
+#
+# A statement that runs more than N_PLUS_ONE_THRESHOLD times within one request is logged
+# as a likely N+1 (a lazy load or a query inside a loop).
+
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+import admission, database
+from connection_manager import manager
+from principal_cache import principal_cache
+from visibility import visibility_cache
+
+logger = logging.getLogger(__name__)
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# Upper bounds (seconds) of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestStats:
+    """SQL and serialization totals for one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def server_timing(self, total_seconds: float) -> str:
+        return (f'db;dur={self.sql_seconds * 1000:.2f};desc="{self.queries} queries", '
+                f"serialize;dur={self.serialize_seconds * 1000:.2f}, total;dur={total_seconds * 1000:.2f}")
+
+# Set by the middleware. Sync routes run in the threadpool and async sessions in greenlets;
+# both inherit the request's context, so the hooks below see the same RequestStats.
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def record_serialization(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_instrumentation_started", None)
+    if stats is None or started is None:
+        return
+    stats.queries += 1
+    stats.sql_seconds += time.perf_counter() - started
+    stats.statements[statement] += 1
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+for _engine in {database.engine, database.read_engine, database.async_engine.sync_engine}:
+    instrument_engine(_engine)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class RouteMetrics:
+    """Per-route request metrics. Only touched from the event loop, so no locking."""
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.responses: Counter = Counter()
+        self.queries: Counter = Counter()
+        self.sql_seconds: Counter = Counter()
+        self.serialize_seconds: Counter = Counter()
+        self.n_plus_one: Counter = Counter()
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        self.latency[key].observe(seconds)
+        self.responses[(method, route, str(status))] += 1
+        self.queries[key] += stats.queries
+        self.sql_seconds[key] += stats.sql_seconds
+        self.serialize_seconds[key] += stats.serialize_seconds
+        repeated = [(statement, count) for statement, count in stats.statements.items() if count > N_PLUS_ONE_THRESHOLD]
+        if repeated:
+            self.n_plus_one[key] += 1
+            for statement, count in repeated:
+                logger.warning("Possible N+1 in %s %s: statement ran %d times: %s", method, route, count, " ".join(statement.split())[:300])
+
+route_metrics = RouteMetrics()
+
+def _route_label(scope) -> str:
+    # The route template, so /tasks/1 and /tasks/2 share a series; set by the router.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class InstrumentationMiddleware:
+    """ASGI middleware that times each HTTP request and adds its Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_metrics.record(scope["method"], _route_label(scope), status, time.perf_counter() - started, stats)
+
+# --- Prometheus text format ---
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _metric(lines: list, name: str, kind: str, help_text: str, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{_labels(**labels) if labels else ''} {value}")
+
+def _pool_stats():
+    engines = {"primary": database.engine}
+    if database.read_engine is not database.engine:
+        engines["read"] = database.read_engine
+    engines["async"] = database.async_engine.sync_engine
+    for name, engine in engines.items():
+        pool = engine.pool
+        # SingletonThreadPool/StaticPool (in-memory SQLite) don't keep these numbers.
+        for stat in ("size", "checkedout", "checkedin", "overflow"):
+            if hasattr(pool, stat):
+                # QueuePool counts overflow from -size up; only connections beyond size matter.
+                yield name, stat, max(0, getattr(pool, stat)()) if stat == "overflow" else getattr(pool, stat)()
+
+def render_metrics() -> str:
+    lines = []
+    histogram_samples = []
+    for (method, route), histogram in sorted(route_metrics.latency.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            histogram_samples.append(("_bucket", {"method": method, "route": route, "le": bound}, cumulative))
+        histogram_samples.append(("_bucket", {"method": method, "route": route, "le": "+Inf"}, histogram.count))
+        histogram_samples.append(("_sum", {"method": method, "route": route}, histogram.sum))
+        histogram_samples.append(("_count", {"method": method, "route": route}, histogram.count))
+    _metric(lines, "http_request_duration_seconds", "histogram", "Request latency by route.", histogram_samples)
+    _metric(lines, "http_responses_total", "counter", "Responses by route and status code.",
+            [("", {"method": m, "route": r, "status": s}, n) for (m, r, s), n in sorted(route_metrics.responses.items())])
+    for name, counter, help_text in (
+        ("db_queries_total", route_metrics.queries, "SQL statements executed, by route."),
+        ("db_query_seconds_total", route_metrics.sql_seconds, "Time spent in SQL statements, by route."),
+        ("serialization_seconds_total", route_metrics.serialize_seconds, "Time spent building and encoding response bodies, by route."),
+        ("n_plus_one_total", route_metrics.n_plus_one, f"Requests with a statement repeated more than {N_PLUS_ONE_THRESHOLD} times, by route."),
+    ):
+        _metric(lines, name, "counter", help_text, [("", {"method": m, "route": r}, value) for (m, r), value in sorted(counter.items())])
+
+    _metric(lines, "db_pool_connections", "gauge", "Connection pool state (size, checkedout, checkedin, overflow) per engine.",
+            [("", {"engine": engine, "state": stat}, value) for engine, stat, value in _pool_stats()])
+    _metric(lines, "websocket_connections", "gauge", "Open WebSocket connections.", [("", None, manager.connection_count())])
+    _metric(lines, "websocket_connected_users", "gauge", "Users with at least one open WebSocket.", [("", None, len(manager.active_connections))])
+    _metric(lines, "websocket_dropped_messages", "gauge", "Messages dropped for slow consumers on open connections.",
+            [("", None, sum(c.dropped for connections in manager.active_connections.values() for c in connections))])
+    cache = principal_cache.stats()
+    _metric(lines, "principal_cache_entries", "gauge", "Cached authenticated principals.", [("", None, cache["entries"])])
+    _metric(lines, "principal_cache_requests_total", "counter", "Principal cache lookups by result.",
+            [("", {"result": "hit"}, cache["hits"]), ("", {"result": "miss"}, cache["misses"])])
+    cache = visibility_cache.stats()
+    _metric(lines, "visibility_cache_entries", "gauge", "Cached per-user visibility sets.", [("", None, cache["entries"])])
+    _metric(lines, "visibility_cache_requests_total", "counter", "Visibility cache lookups by result.",
+            [("", {"result": "hit"}, cache["hits"]), ("", {"result": "miss"}, cache["misses"])])
+    _metric(lines, "event_loop_lag_seconds", "gauge", "Largest event loop lag over the load shedding window.", [("", None, admission.load_monitor.loop_lag.value())])
+    _metric(lines, "db_pool_wait_seconds", "gauge", "Longest connection pool checkout over the load shedding window.", [("", None, admission.load_monitor.pool_wait.value())])
+    _metric(lines, "admission_rejections_total", "counter", "Requests rejected by rate limits (429) or load shedding (503), by reason and route class.",
+            [("", {"reason": reason, "route_class": name or "none"}, count) for (reason, name), count in sorted(admission.rejections.items(), key=str)])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,167 @@
+# backend/jobs.py
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+import models
+from database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_SWEEP_INTERVAL_SECONDS = float(os.getenv("JOB_SWEEP_INTERVAL_SECONDS", "5"))
+
+# Event types
+COMMENT_CREATED = "comment_created"
+COMMENT_STATUS_CHANGED = "comment_status_changed"
+TASKS_ASSIGNED = "tasks_assigned"
+
+# Handlers get the event payload and id.
+Handler = Callable[[dict, int], Awaitable[None]]
+
+def add_outbox_event(db: Session, event_type: str, payload: dict) -> models.OutboxEvent:
+    """Records a side effect in the caller's transaction; it is submitted after commit."""
+    outbox_event = models.OutboxEvent(event_type=event_type, payload=payload)
+    db.add(outbox_event)
+    return outbox_event
+
+class JobQueue:
+    """In-process worker pool that delivers OutboxEvent rows.
+
+    Writes add an outbox row in their own transaction (add_outbox_event); it is submitted
+    once that transaction commits, so the response doesn't wait on side effects. A periodic
+    sweep re-submits anything still pending (queue overflow, retries after backoff, events
+    left over from a crash).
+
+    A failed event is retried in full, so handlers must be idempotent; notification
+    handlers pass the event id on as a dedup key (see NotificationLog.append).
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE, max_attempts: int = JOB_MAX_ATTEMPTS, sweep_interval: float = JOB_SWEEP_INTERVAL_SECONDS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self.handlers: Dict[str, Handler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Set[int] = set()
+        self._tasks: list[asyncio.Task] = []
+
+    def handler(self, event_type: str):
+        def register(func: Handler) -> Handler:
+            self.handlers[event_type] = func
+            return func
+        return register
+
+    def submit(self, event_id: int):
+        if self._queue is None or event_id in self._in_flight:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            # Sync routes commit from the threadpool; hand the id over to the loop.
+            self._loop.call_soon_threadsafe(self.submit, event_id)
+            return
+        try:
+            self._queue.put_nowait(event_id)
+            self._in_flight.add(event_id)
+        except asyncio.QueueFull:
+            # Still pending in the outbox; the next sweep picks it up.
+            pass
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+        self._in_flight.clear()
+
+    async def sweep(self):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.OutboxEvent.id)
+                .where(models.OutboxEvent.status == models.OutboxStatus.PENDING, models.OutboxEvent.available_at <= datetime.utcnow())
+                .order_by(models.OutboxEvent.id)
+                .limit(self.queue_size)
+            )
+            for event_id in result.scalars():
+                self.submit(event_id)
+
+    async def _sweeper(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Outbox sweep failed")
+            await asyncio.sleep(self.sweep_interval)
+
+    async def _worker(self):
+        while True:
+            event_id = await self._queue.get()
+            try:
+                await self._process(event_id)
+            except Exception:
+                logger.exception("Outbox event %s could not be processed", event_id)
+            finally:
+                self._in_flight.discard(event_id)
+                self._queue.task_done()
+
+    async def _process(self, event_id: int):
+        async with AsyncSessionLocal() as db:
+            outbox_event = await db.get(models.OutboxEvent, event_id)
+            if outbox_event is None or outbox_event.status != models.OutboxStatus.PENDING:
+                return
+            handler = self.handlers.get(outbox_event.event_type)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler for event type '{outbox_event.event_type}'")
+                await handler(outbox_event.payload, outbox_event.id)
+            except Exception as e:
+                outbox_event.attempts += 1
+                outbox_event.last_error = repr(e)
+                if outbox_event.attempts >= self.max_attempts:
+                    outbox_event.status = models.OutboxStatus.FAILED
+                    logger.error("Outbox event %s (%s) failed permanently: %r", outbox_event.id, outbox_event.event_type, e)
+                else:
+                    # Exponential backoff; the sweeper re-submits once it is due.
+                    outbox_event.available_at = datetime.utcnow() + timedelta(seconds=2 ** outbox_event.attempts)
+            else:
+                await db.delete(outbox_event)
+            await db.commit()
+
+job_queue = JobQueue()
+
+# Outbox rows are handed to the queue only once their transaction has committed.
+@event.listens_for(Session, "after_flush")
+def _collect_outbox_events(session, flush_context):
+    event_ids = [obj.id for obj in session.new if isinstance(obj, models.OutboxEvent)]
+    if event_ids:
+        session.info.setdefault("outbox_events", []).extend(event_ids)
+
+@event.listens_for(Session, "after_commit")
+def _submit_outbox_events(session):
+    for event_id in session.info.pop("outbox_events", ()):
+        job_queue.submit(event_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_outbox_events(session):
+    session.info.pop("outbox_events", None)
@@ -1,24 +1,65 @@
 # backend/main.py
 # --- Final Version ---
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
 import os
 
 import models
-from routers import auth, dashboards, tasks, comments
+from routers import auth, dashboards, tasks, comments, search, sync
 from connection_manager import manager
-from dependencies import get_db
+from serializers import FastJSONResponse
+from dependencies import get_db, get_websocket_user, require_metrics_token
+from jobs import job_queue
+from instrumentation import InstrumentationMiddleware, render_metrics
+import admission
+import archive
 import crud
+import file_storage
+import security
+import warmup
+import notifications  # registers the outbox event handlers
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay the one-time startup costs before taking traffic (see warmup.py).
+    if warmup.WARMUP_ENABLED:
+        await asyncio.to_thread(warmup.warm_up, app)
+        await warmup.warm_up_async()
+    # Start the background job queue; it also picks up outbox events left pending by a crash.
+    await manager.start()
+    await job_queue.start()
+    await admission.load_monitor.start()
+    # Periodic archival of finished tasks (see archive.py); off unless an interval is set.
+    archiver = asyncio.create_task(archive.run_periodically()) if archive.ARCHIVE_INTERVAL_SECONDS > 0 else None
+    yield
+    if archiver is not None:
+        archiver.cancel()
+        await asyncio.gather(archiver, return_exceptions=True)
+    await admission.load_monitor.stop()
+    await job_queue.stop()
+    await manager.stop()
+    await asyncio.to_thread(file_storage.wait_for_removals)
+    security.shutdown_hash_pool()
 
 app = FastAPI(
     title="Task Dashboard API",
     description="API for a collaborative task management dashboard.",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# Rate limits and load shedding (see admission.py); added first so it runs inside CORS
+# and rejections still carry the CORS headers.
+app.add_middleware(admission.AdmissionMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,7 +67,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the browser's network panel show the timing breakdown for cross-origin calls.
+    expose_headers=["Server-Timing"],
 )
+# Added last so it wraps everything else, CORS included.
+app.add_middleware(InstrumentationMiddleware)
 
 # Static files for uploads
 if not os.path.exists('uploads'):
@@ -38,23 +83,42 @@ app.include_router(auth.router)
 app.include_router(dashboards.router)
 app.include_router(tasks.router)
 app.include_router(comments.router)
+app.include_router(search.router)
+app.include_router(sync.router)
 
 # WebSocket Endpoint for real-time communication
 @app.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, token: str = "", last_seq: Optional[int] = None):
+    # `token` is the API's bearer token; a socket only carries, and replays, its own user's
+    # notifications.
+    principal = await get_websocket_user(token) if token else None
+    if principal is None or principal.id != user_id or not principal.is_active:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Reconnecting clients pass the last `seq` they received to get only what they missed.
+    connection = await manager.connect(websocket, user_id, last_seq=last_seq)
     try:
         while True:
             # Keep the connection alive, can be extended to receive messages
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
+    finally:
+        manager.disconnect(user_id, connection)
 
 @app.get("/", tags=["Root"])
 async def read_root():
     """A simple root endpoint to confirm the API is running."""
     return {"message": "Welcome to the Task Dashboard API! Version 1.0"}
 
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse, dependencies=[Depends(require_metrics_token)])
+async def read_metrics():
+    """Request, database pool, WebSocket and cache metrics in the Prometheus text format.
+
+    Scrapers authenticate with `Authorization: Bearer $METRICS_TOKEN`; without METRICS_TOKEN
+    set the endpoint answers 404."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # if __name__ == "__main__":
 #     import uvicorn
 #     uvicorn.run("main:app",
@@ -2,7 +2,7 @@
 # --- Final Version (FIXED) ---
 
 from sqlalchemy import (
-    Boolean, Column, Integer, String, DateTime, ForeignKey, Enum as SQLAlchemyEnum
+    Boolean, Column, Integer, String, DateTime, ForeignKey, Index, JSON, UniqueConstraint, Enum as SQLAlchemyEnum
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -34,21 +34,34 @@ class Dashboard(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
     description = Column(String)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    row_version = Column(Integer, index=True)
 
     owner = relationship("User", back_populates="dashboards")
     tasks = relationship("Task", back_populates="dashboard", cascade="all, delete-orphan")
+    archived_tasks = relationship("ArchivedTask", back_populates="dashboard", cascade="all, delete-orphan")
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Paged task listings filter by dashboard and filter or sort by one of these columns.
+    # AUTOINCREMENT: archived tasks keep their id (see archive.py), so ids are never reused.
+    __table_args__ = (
+        Index("ix_tasks_dashboard_status", "dashboard_id", "status"),
+        Index("ix_tasks_dashboard_deadline", "dashboard_id", "deadline"),
+        Index("ix_tasks_dashboard_title", "dashboard_id", "title"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
     description = Column(String)
     deadline = Column(DateTime)
     status = Column(String, default="Pending")
-    dashboard_id = Column(Integer, ForeignKey("dashboards.id"))
+    dashboard_id = Column(Integer, ForeignKey("dashboards.id"), index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    row_version = Column(Integer, index=True)
     
     dashboard = relationship("Dashboard", back_populates="tasks")
     workers = relationship("User", secondary="task_workers")
@@ -57,7 +70,8 @@ class Task(Base):
 class TaskWorkers(Base):
     __tablename__ = "task_workers"
     task_id = Column(Integer, ForeignKey("tasks.id"), primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    # The primary key leads with task_id; worker-scoped lookups need their own index.
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
 
 class CommentStatus(str, Enum):
     PENDING = "pending"
@@ -66,37 +80,170 @@ class CommentStatus(str, Enum):
 
 class Comment(Base):
     __tablename__ = "comments"
+    # Thread loading filters by task and parent and orders by creation time.
+    __table_args__ = (Index("ix_comments_task_parent_created", "task_id", "parent_id", "created_at"), {"sqlite_autoincrement": True})
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     task_id = Column(Integer, ForeignKey("tasks.id"))
     author_id = Column(Integer, ForeignKey("users.id"))
-    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)
     status = Column(SQLAlchemyEnum(CommentStatus), default=CommentStatus.PENDING)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    row_version = Column(Integer, index=True)
 
     task = relationship("Task", back_populates="comments")
     author = relationship("User", back_populates="comments")
     
-    # FIX: Added single_parent=True to the replies relationship to resolve the InvalidRequestError.
-    # This tells SQLAlchemy that a child comment (a reply) will only have one parent,
-    # making the 'delete-orphan' cascade safe to use.
+    # FIX: remote_side belongs on the many-to-one side. With it on `replies`, the collection
+    # resolved to the parent row instead of the children, so every reply list came back as None.
     replies = relationship(
         "Comment",
         back_populates="parent",
-        remote_side=[id],
         cascade="all, delete-orphan",
-        single_parent=True
     )
-    parent = relationship("Comment", back_populates="replies", remote_side=[parent_id])
+    parent = relationship("Comment", back_populates="replies", remote_side=[id])
     files = relationship("File", back_populates="comment", cascade="all, delete-orphan")
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     file_name = Column(String, nullable=False)
-    file_path = Column(String, nullable=False)
-    comment_id = Column(Integer, ForeignKey("comments.id"))
+    # Indexed for the reference count that decides when a shared blob can go (see file_storage.py).
+    file_path = Column(String, nullable=False, index=True)
+    # Uploads are content-addressed: rows with the same hash share one file on disk.
+    content_hash = Column(String(64), index=True)
+    size = Column(Integer)
+    comment_id = Column(Integer, ForeignKey("comments.id"), index=True)
 
     comment = relationship("Comment", back_populates="files")
+
+# --- Archive ---
+# Finished tasks, with their assignments, comments and files, moved out of the hot tables
+# by archive.py. Rows keep their ids and columns, so the read schemas serialize them as is.
+
+class ArchivedTask(Base):
+    __tablename__ = "archived_tasks"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False)
+    description = Column(String)
+    deadline = Column(DateTime)
+    status = Column(String)
+    dashboard_id = Column(Integer, ForeignKey("dashboards.id"), index=True)
+    updated_at = Column(DateTime(timezone=True))
+    row_version = Column(Integer)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    dashboard = relationship("Dashboard", back_populates="archived_tasks")
+    workers = relationship("User", secondary="archived_task_workers")
+    comments = relationship("ArchivedComment", back_populates="task", cascade="all, delete-orphan")
+
+class ArchivedTaskWorkers(Base):
+    __tablename__ = "archived_task_workers"
+    task_id = Column(Integer, ForeignKey("archived_tasks.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
+
+class ArchivedComment(Base):
+    __tablename__ = "archived_comments"
+
+    id = Column(Integer, primary_key=True)
+    content = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    task_id = Column(Integer, ForeignKey("archived_tasks.id"), index=True)
+    author_id = Column(Integer, ForeignKey("users.id"))
+    parent_id = Column(Integer, ForeignKey("archived_comments.id"), nullable=True)
+    status = Column(SQLAlchemyEnum(CommentStatus), default=CommentStatus.PENDING)
+    updated_at = Column(DateTime(timezone=True))
+    row_version = Column(Integer)
+
+    task = relationship("ArchivedTask", back_populates="comments")
+    author = relationship("User")
+    replies = relationship("ArchivedComment", back_populates="parent", cascade="all, delete-orphan")
+    parent = relationship("ArchivedComment", back_populates="replies", remote_side=[id])
+    files = relationship("ArchivedFile", back_populates="comment", cascade="all, delete-orphan")
+
+class ArchivedFile(Base):
+    __tablename__ = "archived_files"
+
+    id = Column(Integer, primary_key=True)
+    file_name = Column(String, nullable=False)
+    file_path = Column(String, nullable=False, index=True)
+    content_hash = Column(String(64))
+    size = Column(Integer)
+    comment_id = Column(Integer, ForeignKey("archived_comments.id"), index=True)
+
+    comment = relationship("ArchivedComment", back_populates="files")
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+class OutboxEvent(Base):
+    # Side effects (notifications) recorded in the same transaction as the write that
+    # caused them, then delivered by the background job queue. Rows are deleted once
+    # handled; rows that exhaust their retries stay behind as FAILED. Ids are never reused:
+    # notifications are deduplicated by them (see notifications.py).
+    __tablename__ = "outbox_events"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(SQLAlchemyEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class Notification(Base):
+    # Persisted per-user notification log (see notification_log.py); `seq` increases by one
+    # per message for each user and is what clients send back as `last_seq` on reconnect.
+    __tablename__ = "notifications"
+    __table_args__ = (
+        UniqueConstraint("user_id", "seq", name="uq_notifications_user_seq"),
+        UniqueConstraint("user_id", "dedup_key", name="uq_notifications_user_dedup_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    seq = Column(Integer, nullable=False)
+    message = Column(JSON, nullable=False)
+    # Identifies the message's origin (e.g. its outbox event) so a retry isn't sequenced twice.
+    dedup_key = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ChangeCounter(Base):
+    # Single-row counter behind `row_version`; each flush that writes a dashboard, task or
+    # comment takes the next value (see versioning.py). It is the cursor for GET /sync.
+    __tablename__ = "change_counter"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class DashboardStat(Base):
+    # Per-dashboard counters (tasks by status, comments by status, tasks per worker) kept
+    # current by dashboard_stats.py in the same flush as the writes they count.
+    __tablename__ = "dashboard_stats"
+
+    dashboard_id = Column(Integer, ForeignKey("dashboards.id"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class Tombstone(Base):
+    # Records deleted dashboards, tasks and comments so sync clients can drop them.
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    dashboard_id = Column(Integer)
+    owner_id = Column(Integer)
+    # Set on the copies of a dashboard's tombstone addressed to each of its workers.
+    user_id = Column(Integer)
+    row_version = Column(Integer, index=True, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,120 @@
+# backend/notification_log.py
+
+import os
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+import models
+from brokers import NOTIFICATION_BROKER
+from database import AsyncSessionLocal
+
+NOTIFICATION_LOG_SIZE = int(os.getenv("NOTIFICATION_LOG_SIZE", "200"))
+# Seqs must be shared by every worker once messages cross processes, so persisting is the
+# default with a shared broker (ConnectionManager.start refuses to run without it).
+NOTIFICATION_LOG_PERSIST = os.getenv("NOTIFICATION_LOG_PERSIST", "0" if NOTIFICATION_BROKER == "memory" else "1") == "1"
+
+class NotificationLog:
+    """Per-user sequence numbers and a bounded ring buffer of recent notifications.
+
+    Every message sent to a user is stamped with the next `seq` for that user. A client
+    reconnecting with the last seq it saw gets only what it missed, or a resync marker if
+    that range has already fallen out of the buffer.
+
+    With `persist=True` sequence numbers are allocated in the `notifications` table, so
+    they stay consistent across restarts and across worker processes; the in-memory
+    buffer is then only a cache in front of it. Without it seqs start over at 1 when the
+    process restarts; a client reconnecting with a seq from before is told to resync.
+    """
+
+    def __init__(self, capacity: int = NOTIFICATION_LOG_SIZE, persist: bool = NOTIFICATION_LOG_PERSIST):
+        self.capacity = capacity
+        self.persist = persist
+        self._buffers: Dict[int, Deque[dict]] = {}
+        self._last_seq: Dict[int, int] = {}
+        # Recent dedup keys per user; the table keeps them when persisting.
+        self._keys: Dict[int, "OrderedDict[str, None]"] = {}
+
+    async def append(self, message: dict, user_ids: List[int], dedup_key: Optional[str] = None) -> Dict[int, int]:
+        """Allocates a seq for each recipient and records the message; returns {user_id: seq}.
+
+        Recipients that already have a message under `dedup_key` are left out, so a retried
+        send only reaches the users an earlier attempt didn't.
+        """
+        seqs = {}
+        for user_id in dict.fromkeys(user_ids):
+            if self.persist:
+                seq = await self._persist(user_id, message, dedup_key)
+            elif dedup_key is not None and dedup_key in self._keys.get(user_id, ()):
+                seq = None
+            else:
+                seq = self._last_seq.get(user_id, 0) + 1
+            if seq is None:
+                continue
+            seqs[user_id] = seq
+            self.record(user_id, seq, message)
+            if dedup_key is not None and not self.persist:
+                keys = self._keys.setdefault(user_id, OrderedDict())
+                keys[dedup_key] = None
+                if len(keys) > self.capacity:
+                    keys.popitem(last=False)
+        return seqs
+
+    def record(self, user_id: int, seq: int, message: dict):
+        # Also used for messages sequenced by another worker and delivered through the broker.
+        buffer = self._buffers.setdefault(user_id, deque(maxlen=self.capacity))
+        buffer.append({**message, "seq": seq})
+        self._last_seq[user_id] = max(seq, self._last_seq.get(user_id, 0))
+
+    def last_seq(self, user_id: int) -> int:
+        return self._last_seq.get(user_id, 0)
+
+    async def since(self, user_id: int, last_seq: int) -> Optional[List[dict]]:
+        """Messages with seq > last_seq in order, or None if some of them are no longer kept
+        or last_seq wasn't issued by this log (e.g. it is from before a restart)."""
+        buffer = self._buffers.get(user_id, ())
+        if buffer and buffer[0]["seq"] <= last_seq + 1 and last_seq <= self.last_seq(user_id):
+            return [message for message in buffer if message["seq"] > last_seq]
+        if self.persist:
+            return await self._load_since(user_id, last_seq)
+        if not buffer and last_seq == self.last_seq(user_id):
+            return []
+        return None
+
+    async def _persist(self, user_id: int, message: dict, dedup_key: Optional[str] = None) -> Optional[int]:
+        # (user_id, seq) is unique; a concurrent writer in another process makes the insert
+        # fail and we retry with the next number. (user_id, dedup_key) is unique too; None
+        # means the user already has this message.
+        async with AsyncSessionLocal() as db:
+            for _ in range(5):
+                if dedup_key is not None:
+                    seen = select(models.Notification.id).where(models.Notification.user_id == user_id, models.Notification.dedup_key == dedup_key)
+                    if (await db.execute(seen)).first() is not None:
+                        return None
+                last_seq = (await db.execute(select(func.max(models.Notification.seq)).where(models.Notification.user_id == user_id))).scalar() or 0
+                db.add(models.Notification(user_id=user_id, seq=last_seq + 1, message=message, dedup_key=dedup_key))
+                try:
+                    await db.execute(delete(models.Notification).where(models.Notification.user_id == user_id, models.Notification.seq <= last_seq + 1 - self.capacity))
+                    await db.commit()
+                    return last_seq + 1
+                except IntegrityError:
+                    await db.rollback()
+            raise RuntimeError(f"Could not allocate a notification seq for user {user_id}")
+
+    async def _load_since(self, user_id: int, last_seq: int) -> Optional[List[dict]]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Notification.seq, models.Notification.message)
+                .where(models.Notification.user_id == user_id, models.Notification.seq > last_seq)
+                .order_by(models.Notification.seq)
+            )
+            rows = result.all()
+            if rows and rows[0].seq > last_seq + 1:
+                return None
+            if not rows:
+                last = (await db.execute(select(func.max(models.Notification.seq)).where(models.Notification.user_id == user_id))).scalar() or 0
+                if last != last_seq:
+                    return None
+        return [{**message, "seq": seq} for seq, message in rows]
@@ -0,0 +1,62 @@
+# backend/notifications.py
+#
+# Outbox handlers that turn committed comment events into WebSocket notifications.
+
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+import crud_async, models
+from connection_manager import manager
+from database import AsyncSessionLocal
+from jobs import job_queue, COMMENT_CREATED, COMMENT_STATUS_CHANGED, TASKS_ASSIGNED
+
+def _dedup_key(event_id: int) -> str:
+    # A retried event skips the recipients its earlier attempts already reached.
+    return f"outbox:{event_id}"
+
+@job_queue.handler(COMMENT_CREATED)
+async def notify_comment_created(payload: dict, event_id: int):
+    async with AsyncSessionLocal() as db:
+        task = await crud_async.get_task(db, payload["task_id"])
+        author = await db.get(models.User, payload["author_id"])
+    if task is None:
+        return
+    user_ids_to_notify = [worker.id for worker in task.workers]
+    if task.dashboard and task.dashboard.owner_id not in user_ids_to_notify:
+        user_ids_to_notify.append(task.dashboard.owner_id)
+    user_ids_to_notify = [uid for uid in user_ids_to_notify if uid != payload["author_id"]]
+
+    message = {"type": "new_comment", "payload": {"taskId": task.id, "commentId": payload["comment_id"], "authorName": author.full_name if author else None, "taskTitle": task.title}}
+    await manager.broadcast_to_users(message, user_ids_to_notify, dedup_key=_dedup_key(event_id))
+
+@job_queue.handler(COMMENT_STATUS_CHANGED)
+async def notify_comment_status_changed(payload: dict, event_id: int):
+    async with AsyncSessionLocal() as db:
+        comment = await db.get(models.Comment, payload["comment_id"], options=[selectinload(models.Comment.task)])
+        reviewer = await db.get(models.User, payload["reviewer_id"])
+    if comment is None or comment.author_id == payload["reviewer_id"]:
+        return
+    message = {"type": "comment_status_update", "payload": {"taskId": comment.task_id, "commentId": comment.id, "status": payload["status"], "reviewerName": reviewer.full_name if reviewer else None, "taskTitle": comment.task.title if comment.task else None}}
+    await manager.send_personal_message(message, comment.author_id, dedup_key=_dedup_key(event_id))
+
+@job_queue.handler(TASKS_ASSIGNED)
+async def notify_tasks_assigned(payload: dict, event_id: int):
+    # One message per worker for the whole batch, however many tasks it covered.
+    task_ids_by_user = defaultdict(list)
+    for task_id, user_id in payload["assignments"]:
+        if user_id != payload["assigned_by"]:
+            task_ids_by_user[user_id].append(task_id)
+    if not task_ids_by_user:
+        return
+    async with AsyncSessionLocal() as db:
+        task_ids = {task_id for task_ids in task_ids_by_user.values() for task_id in task_ids}
+        result = await db.execute(select(models.Task.id, models.Task.title, models.Task.dashboard_id).where(models.Task.id.in_(task_ids)))
+        tasks = {row.id: row for row in result}
+        assigner = await db.get(models.User, payload["assigned_by"])
+    for user_id, task_ids in task_ids_by_user.items():
+        assigned = [{"taskId": tasks[task_id].id, "taskTitle": tasks[task_id].title, "dashboardId": tasks[task_id].dashboard_id} for task_id in task_ids if task_id in tasks]
+        if assigned:
+            message = {"type": "tasks_assigned", "payload": {"tasks": assigned, "count": len(assigned), "assignedByName": assigner.full_name if assigner else None}}
+            await manager.send_personal_message(message, user_id, dedup_key=_dedup_key(event_id))
@@ -0,0 +1,130 @@
+# backend/principal_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+import models
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached, read-only snapshot of the authenticated user.
+
+    Exposes the same attributes routes read from models.User, so it can be returned
+    from get_current_user and serialized with schemas.User.
+    """
+    id: int
+    email: str
+    full_name: Optional[str]
+    role: models.Role
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(id=user.id, email=user.email, full_name=user.full_name, role=user.role, is_active=user.is_active)
+
+class PrincipalCache:
+    """Bounded LRU of token -> Principal with a TTL capped by the token's own expiry."""
+
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[Principal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def peek(self, token: str) -> Optional[Principal]:
+        # Like get(), but leaves the LRU order and the hit/miss counts alone; for callers
+        # that only need to know who a token belongs to (admission.py).
+        with self._lock:
+            entry = self._entries.get(token)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def put(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.id]
+
+principal_cache = PrincipalCache()
+
+# Drop cached principals once a change to a user's role or active flag is committed.
+# Invalidating at flush time alone would let a concurrent request re-cache the old row
+# before the commit lands.
+_PRINCIPAL_FIELDS = ("role", "is_active", "email", "full_name")
+
+@event.listens_for(models.User, "after_update")
+def _track_principal_change(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _PRINCIPAL_FIELDS):
+        session = state.session
+        if session is not None:
+            session.info.setdefault("stale_principals", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_principals(session):
+    for user_id in session.info.pop("stale_principals", ()):
+        principal_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_principals(session):
+    session.info.pop("stale_principals", None)
@@ -1,15 +1,14 @@
 # backend/routers/comments.py
 # --- Corrected Version ---
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
-import uuid
 
-import crud, schemas, models
-from dependencies import get_db, get_current_active_user, require_roles
-from connection_manager import manager
+import crud, crud_async, fieldsets, file_storage, schemas, models, serializers
+from dependencies import get_db, get_async_db, get_current_active_user, require_roles, sparse_fieldset
 
 router = APIRouter(
     prefix="/comments",
@@ -17,54 +16,50 @@ router = APIRouter(
     dependencies=[Depends(get_current_active_user)]
 )
 
-UPLOAD_DIRECTORY = "./uploads"
-
 @router.get("/task/{task_id}", response_model=List[schemas.Comment])
-def read_comments_for_task(task_id: int, db: Session = Depends(get_db)):
-    comments = db.query(models.Comment).filter(models.Comment.task_id == task_id, models.Comment.parent_id == None).order_by(models.Comment.created_at.asc()).all()
-    return comments
+def read_comments_for_task(task_id: int, skip: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1), max_depth: Optional[int] = Query(None, ge=0), include_archived: bool = Query(False, description="Also look the task up in the archive"), fieldset: fieldsets.FieldSet = Depends(sparse_fieldset(schemas.Comment)), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # skip/limit page over top-level comments; max_depth=0 returns them without replies.
+    if crud.can_view_task(db=db, current_user=current_user, task_id=task_id):
+        comments = crud.get_comments_for_task(db=db, task_id=task_id, skip=skip, limit=limit, max_depth=max_depth, fieldset=fieldset)
+    elif include_archived and crud.can_view_archived_task(db=db, current_user=current_user, task_id=task_id):
+        comments = crud.get_archived_comments_for_task(db=db, task_id=task_id, skip=skip, limit=limit, max_depth=max_depth, fieldset=fieldset)
+    else:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return serializers.render(schemas.Comment, comments, many=True, fieldset=fieldset)
 
 @router.post("/", response_model=schemas.Comment, status_code=status.HTTP_201_CREATED)
-async def create_comment_with_file(content: str = Form(...), task_id: int = Form(...), parent_id: Optional[int] = Form(None), file: Optional[UploadFile] = File(None), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def create_comment_with_file(content: str = Form(...), task_id: int = Form(...), parent_id: Optional[int] = Form(None), file: Optional[UploadFile] = File(None), db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_active_user)):
+    if not await crud_async.can_view_task(db, current_user, task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
     comment_schema = schemas.CommentCreate(content=content, task_id=task_id, parent_id=parent_id)
-    db_comment = crud.create_comment(db=db, comment=comment_schema, author_id=current_user.id)
-
-    if file:
-        if not os.path.exists(UPLOAD_DIRECTORY):
-            os.makedirs(UPLOAD_DIRECTORY)
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path_on_disk = os.path.join(UPLOAD_DIRECTORY, unique_filename)
-        try:
-            crud.save_upload_file(upload_file=file, destination=file_path_on_disk)
-            # FIX: Store only the unique filename in the database, not the full disk path.
-            # The frontend will construct the full URL to access the file.
-            crud.create_file_record(db=db, file_name=file.filename, file_path=unique_filename, comment_id=db_comment.id)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
-
-    db.refresh(db_comment)
-
-    task = db.query(models.Task).filter(models.Task.id == task_id).first()
-    if task:
-        user_ids_to_notify = [worker.id for worker in task.workers]
-        if task.dashboard and task.dashboard.owner_id not in user_ids_to_notify:
-            user_ids_to_notify.append(task.dashboard.owner_id)
-        user_ids_to_notify = [uid for uid in user_ids_to_notify if uid != current_user.id]
 
-        message = {"type": "new_comment", "payload": {"taskId": task_id, "commentId": db_comment.id, "authorName": current_user.full_name, "taskTitle": task.title}}
-        await manager.broadcast_to_users(message, user_ids_to_notify)
+    # Store the upload before touching the database, so an oversized or aborted upload
+    # leaves neither a comment nor a partial file behind.
+    stored = await file_storage.store_upload(file) if file else None
+    # Store only the content-addressed file name; the frontend builds the URL from it.
+    attachment = {"file_name": file.filename, "file_path": stored.file_name, "content_hash": stored.content_hash, "size": stored.size} if stored else None
+    created = False
+    try:
+        db_comment = await crud_async.create_comment(db=db, comment=comment_schema, author_id=current_user.id, attachment=attachment)
+        created = True
+    finally:
+        if stored:
+            # Shielded, so a cancelled request (e.g. the client went away) still cleans up.
+            with anyio.CancelScope(shield=True):
+                if created:
+                    await file_storage.commit_upload(stored)
+                else:
+                    await db.rollback()
+                    await file_storage.discard_upload(stored)
 
-    return db_comment
+    # Notifications are delivered by the job queue from the committed outbox event.
+    return serializers.render(schemas.Comment, await crud_async.get_comment(db, db_comment.id), status_code=status.HTTP_201_CREATED)
 
 @router.put("/{comment_id}/status", response_model=schemas.Comment)
-async def update_comment_status(comment_id: int, status_update: schemas.CommentStatusUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
-    db_comment = crud.update_comment_status(db=db, comment_id=comment_id, status=status_update)
+async def update_comment_status(comment_id: int, status_update: schemas.CommentStatusUpdate, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    if not await crud_async.can_view_comment(db, current_user, comment_id):
+        raise HTTPException(status_code=404, detail="Comment not found")
+    db_comment = await crud_async.update_comment_status(db=db, comment_id=comment_id, status=status_update, reviewer_id=current_user.id)
     if db_comment is None:
         raise HTTPException(status_code=404, detail="Comment not found")
-
-    if db_comment.author_id != current_user.id:
-        message = {"type": "comment_status_update", "payload": {"taskId": db_comment.task_id, "commentId": comment_id, "status": db_comment.status.value, "reviewerName": current_user.full_name, "taskTitle": db_comment.task.title}}
-        await manager.send_personal_message(message, db_comment.author_id)
-
-    return db_comment
+    return serializers.render(schemas.Comment, db_comment)
@@ -2,12 +2,12 @@
 # backend/routers/dashboards.py
 # --- Final Version ---
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-import crud, schemas, models
-from dependencies import get_db, get_current_active_user, require_roles, require_role
+import crud, fieldsets, schemas, models, serializers
+from dependencies import get_db, get_current_active_user, require_roles, require_role, sparse_fieldset
 
 router = APIRouter(
     prefix="/dashboards",
@@ -16,12 +16,28 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.Dashboard])
-def read_dashboards(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    return crud.get_dashboards(db=db, current_user=current_user)
+def read_dashboards(fieldset: fieldsets.FieldSet = Depends(sparse_fieldset(schemas.Dashboard)), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # e.g. ?expand=owner&fields=name returns names and owners only, without touching tasks.
+    dashboards = crud.get_dashboards(db=db, current_user=current_user, fieldset=fieldset)
+    return serializers.render(schemas.Dashboard, dashboards, many=True, fieldset=fieldset)
+
+@router.get("/summary", response_model=schemas.DashboardSummaryPage)
+def read_dashboard_summaries(after: Optional[int] = None, limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # Lightweight listing for the dashboard grid: task counts only, paginated by dashboard id.
+    # Pass the returned next_cursor as `after` to fetch the following page.
+    items, next_cursor = crud.get_dashboard_summaries(db=db, current_user=current_user, after_id=after, limit=limit)
+    return serializers.render(schemas.DashboardSummaryPage, {"items": items, "next_cursor": next_cursor})
+
+@router.get("/{dashboard_id}/stats", response_model=schemas.DashboardStats)
+def read_dashboard_stats(dashboard_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # Served from the dashboard_stats counters, so the cost doesn't grow with the dashboard.
+    if not crud.can_view_dashboard(db=db, current_user=current_user, dashboard_id=dashboard_id):
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return serializers.render(schemas.DashboardStats, crud.get_dashboard_stats(db=db, dashboard_id=dashboard_id))
 
 @router.post("/", response_model=schemas.Dashboard, status_code=status.HTTP_201_CREATED)
 def create_dashboard(dashboard: schemas.DashboardCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
-    return crud.create_dashboard(db=db, dashboard=dashboard, owner_id=current_user.id)
+    return serializers.render(schemas.Dashboard, crud.create_dashboard(db=db, dashboard=dashboard, owner_id=current_user.id), status_code=status.HTTP_201_CREATED)
 
 @router.delete("/{dashboard_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_dashboard(dashboard_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_role(models.Role.CEO))):
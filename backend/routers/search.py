@@ -0,0 +1,19 @@
+# backend/routers/search.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+import crud, schemas, models, serializers
+from dependencies import get_db, get_current_active_user
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+@router.get("", response_model=schemas.SearchPage)
+def search(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # Best matches first; pass the returned next_offset as `offset` for the following page.
+    items, next_offset = crud.search_tasks_and_comments(db=db, current_user=current_user, q=q, limit=limit, offset=offset)
+    return serializers.render(schemas.SearchPage, {"items": items, "next_offset": next_offset})
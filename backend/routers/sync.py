@@ -0,0 +1,19 @@
+# backend/routers/sync.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+import crud, schemas, models, serializers
+from dependencies import get_db, get_current_active_user
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"],
+    dependencies=[Depends(get_current_active_user)]
+)
+
+@router.get("", response_model=schemas.SyncResponse)
+def read_changes(since: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=2000), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # Poll with the returned cursor as `since`, straight away while has_more is set; starting
+    # from since=0 pages through everything visible.
+    return serializers.render(schemas.SyncResponse, crud.get_changes_since(db=db, current_user=current_user, since=since, limit=limit))
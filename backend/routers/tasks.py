@@ -2,12 +2,16 @@
 # backend/routers/tasks.py
 # --- Final Version ---
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-import crud, schemas, models
-from dependencies import get_db, get_current_active_user, require_roles
+import crud, fieldsets, schemas, models, serializers
+from dependencies import get_db, get_current_active_user, require_roles, sparse_fieldset
+
+# Upper bound on items per bulk request, so one request can't hold the write lock for long.
+BULK_MAX_ITEMS = 1000
 
 router = APIRouter(
     prefix="/tasks",
@@ -16,23 +20,95 @@ router = APIRouter(
 )
 
 @router.get("/dashboard/{dashboard_id}", response_model=List[schemas.Task])
-def read_tasks_for_dashboard(dashboard_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    return crud.get_tasks_for_dashboard(db=db, dashboard_id=dashboard_id, current_user=current_user)
+def read_tasks_for_dashboard(dashboard_id: int, include_archived: bool = Query(False, description="Also return archived tasks"), fieldset: fieldsets.FieldSet = Depends(sparse_fieldset(schemas.Task)), db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+    # 404 only for a dashboard that doesn't exist; one the caller has no visible tasks in
+    # lists none, with or without include_archived. Archived tasks are merged in id order, so
+    # a worker whose tasks here are all archived still gets those.
+    if not crud.can_view_dashboard(db=db, current_user=current_user, dashboard_id=dashboard_id) and not crud.dashboard_exists(db=db, dashboard_id=dashboard_id):
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    tasks = crud.get_tasks_for_dashboard(db=db, dashboard_id=dashboard_id, current_user=current_user, fieldset=fieldset)
+    if include_archived:
+        archived = crud.get_archived_tasks_for_dashboard(db=db, dashboard_id=dashboard_id, current_user=current_user, fieldset=fieldset)
+        tasks = sorted([*tasks, *archived], key=lambda task: task.id)
+    return serializers.render(schemas.Task, tasks, many=True, fieldset=fieldset)
+
+@router.get("/dashboard/{dashboard_id}/page", response_model=schemas.TaskPage)
+def read_task_page(
+    dashboard_id: int,
+    task_status: Optional[List[str]] = Query(None, alias="status", description="Only tasks with one of these statuses (repeatable)"),
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    worker_id: Optional[int] = Query(None, description="Only tasks assigned to this user"),
+    overdue: bool = Query(False, description="Only tasks past their deadline that are not Completed"),
+    sort: str = Query("id", description=f"One of {', '.join(crud.TASK_SORTS)}; prefix with '-' for descending"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    fieldset: fieldsets.FieldSet = Depends(sparse_fieldset(schemas.Task)),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    # Paginated, filtered alternative to read_tasks_for_dashboard for large dashboards.
+    # Pass the returned next_cursor as `cursor`, with the same filters and sort, for the next page.
+    if not crud.can_view_dashboard(db=db, current_user=current_user, dashboard_id=dashboard_id):
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    try:
+        tasks, next_cursor = crud.get_task_page(
+            db=db, dashboard_id=dashboard_id, current_user=current_user, status=task_status,
+            deadline_from=deadline_from, deadline_to=deadline_to, worker_id=worker_id, overdue=overdue,
+            sort=sort, cursor=cursor, limit=limit, fieldset=fieldset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return serializers.render_page(schemas.Task, tasks, fieldset=fieldset, next_cursor=next_cursor)
 
 @router.post("/", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
 def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
-    return crud.create_task(db=db, task=task)
+    if not crud.can_view_dashboard(db=db, current_user=current_user, dashboard_id=task.dashboard_id):
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return serializers.render(schemas.Task, crud.create_task(db=db, task=task), status_code=status.HTTP_201_CREATED)
 
 @router.put("/{task_id}", response_model=schemas.Task)
 def update_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    if not crud.can_view_task(db=db, current_user=current_user, task_id=task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
     db_task = crud.update_task(db=db, task_id=task_id, task_update=task_update)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return db_task
+    return serializers.render(schemas.Task, db_task)
 
 @router.post("/{task_id}/assign/{user_id}", response_model=schemas.Task)
 def assign_worker_to_task(task_id: int, user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    if not crud.can_view_task(db=db, current_user=current_user, task_id=task_id):
+        raise HTTPException(status_code=404, detail="Task or User not found")
     db_task = crud.assign_worker_to_task(db=db, task_id=task_id, user_id=user_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task or User not found")
-    return db_task
\ No newline at end of file
+    return serializers.render(schemas.Task, db_task)
+
+@router.post("/{task_id}/restore", response_model=schemas.Task)
+def restore_task(task_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    # Moves an archived task, with its comments and files, back to the active tables.
+    if not crud.can_view_archived_task(db=db, current_user=current_user, task_id=task_id):
+        raise HTTPException(status_code=404, detail="Archived task not found")
+    db_task = crud.restore_task(db=db, task_id=task_id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Archived task not found")
+    return serializers.render(schemas.Task, db_task)
+
+@router.post("/bulk", response_model=List[schemas.BulkTaskResult])
+def bulk_create_tasks(payload: schemas.BulkTaskCreate, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    # Creates every task (and assigns its worker_ids) in one transaction. Items for an
+    # unknown or another manager's dashboard are skipped and reported; the rest are still created.
+    if len(payload.tasks) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} tasks per request")
+    results = crud.bulk_create_tasks(db=db, items=payload.tasks, current_user=current_user)
+    return serializers.render(schemas.BulkTaskResult, results, many=True)
+
+@router.post("/bulk/assign", response_model=List[schemas.BulkAssignmentResult])
+def bulk_assign_workers(payload: schemas.BulkAssign, db: Session = Depends(get_db), current_user: models.User = Depends(require_roles([models.Role.CEO, models.Role.MANAGER]))):
+    # Existing assignments, and repeats of a pair within the request, are left alone and
+    # reported as "already_assigned".
+    if len(payload.assignments) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} assignments per request")
+    results = crud.bulk_assign_workers(db=db, assignments=payload.assignments, current_user=current_user)
+    return serializers.render(schemas.BulkAssignmentResult, results, many=True)
@@ -2,7 +2,7 @@
 # --- Final Version ---
 
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional
 from models import Role, CommentStatus
 from datetime import datetime
 
@@ -91,6 +91,38 @@ class Task(TaskBase):
     class Config:
         orm_mode = True
 
+class TaskPage(BaseModel):
+    items: List[Task] = []
+    # Opaque; pass back as `cursor` with the same sort to fetch the following page.
+    next_cursor: Optional[str] = None
+
+# --- Bulk Task Schemas ---
+class BulkTaskItem(TaskCreate):
+    worker_ids: List[int] = []
+
+class BulkTaskCreate(BaseModel):
+    tasks: List[BulkTaskItem]
+
+class BulkTaskResult(BaseModel):
+    index: int
+    status: str  # "created" or "dashboard_not_found"
+    task_id: Optional[int] = None
+    assigned: List[int] = []
+    unknown_worker_ids: List[int] = []
+
+class BulkAssignment(BaseModel):
+    task_id: int
+    user_id: int
+
+class BulkAssign(BaseModel):
+    assignments: List[BulkAssignment]
+
+class BulkAssignmentResult(BaseModel):
+    index: int
+    task_id: int
+    user_id: int
+    status: str  # "assigned", "already_assigned", "task_not_found" or "user_not_found"
+
 # --- Dashboard Schemas ---
 class DashboardBase(BaseModel):
     name: str
@@ -105,4 +137,96 @@ class Dashboard(DashboardBase):
     tasks: List[Task] = []
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class DashboardSummary(DashboardBase):
+    id: int
+    owner: User
+    created_at: Optional[datetime] = None
+    task_count: int = 0
+    overdue_count: int = 0
+    status_counts: Dict[str, int] = {}
+
+    class Config:
+        orm_mode = True
+
+class DashboardSummaryPage(BaseModel):
+    items: List[DashboardSummary] = []
+    next_cursor: Optional[int] = None
+
+class WorkerLoad(BaseModel):
+    user: User
+    task_count: int = 0
+    open_task_count: int = 0
+
+class DashboardStats(BaseModel):
+    dashboard_id: int
+    task_count: int = 0
+    status_counts: Dict[str, int] = {}
+    overdue_count: int = 0
+    comment_count: int = 0
+    comment_status_counts: Dict[str, int] = {}
+    workers: List[WorkerLoad] = []
+
+# --- Search Schemas ---
+class SearchHit(BaseModel):
+    type: str  # "task" or "comment"
+    id: int
+    task_id: int
+    dashboard_id: Optional[int] = None
+    task_title: str
+    snippet: str  # HTML-escaped, matches wrapped in <mark>
+    rank: float
+
+class SearchPage(BaseModel):
+    items: List[SearchHit] = []
+    next_offset: Optional[int] = None
+
+# --- Sync Schemas ---
+# Flat rows for the incremental change feed; clients stitch them together by id.
+class SyncDashboard(DashboardBase):
+    id: int
+    owner_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class SyncTask(TaskBase):
+    id: int
+    status: str
+    dashboard_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+    workers: List[User] = []
+
+    class Config:
+        orm_mode = True
+
+class SyncComment(CommentBase):
+    id: int
+    task_id: Optional[int] = None
+    parent_id: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    author: User
+    status: CommentStatus
+    files: List[File] = []
+
+    class Config:
+        orm_mode = True
+
+class Tombstone(BaseModel):
+    entity_type: str
+    entity_id: int
+
+    class Config:
+        orm_mode = True
+
+class SyncResponse(BaseModel):
+    cursor: int
+    has_more: bool = False
+    dashboards: List[SyncDashboard] = []
+    tasks: List[SyncTask] = []
+    comments: List[SyncComment] = []
+    deleted: List[Tombstone] = []
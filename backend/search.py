@@ -0,0 +1,88 @@
+# backend/search.py
+#
+# Full-text search over task titles/descriptions and comment bodies, backed by SQLite FTS5.
+# tasks_fts and comments_fts are external-content indexes: they store only the index and
+# read text from tasks/comments, and triggers keep them in step with every insert, update
+# and delete. They are created by the a4e9c2f7d3b8 migration; the after_create hook below
+# does the same for databases built with metadata.create_all (benchmarks, scratch DBs).
+#
+# Rebuilding tasks or comments (e.g. a batch migration with recreate) drops the triggers;
+# such a migration must recreate them and run rebuild_search_index.
+
+import html
+import re
+
+from sqlalchemy import column, event, func, literal_column, table
+
+from database import Base
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(title, description, content='tasks', content_rowid='id', prefix='2 3', tokenize='{TOKENIZER}')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(content, content='comments', content_rowid='id', prefix='2 3', tokenize='{TOKENIZER}')",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN "
+    "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN "
+    "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF content ON comments BEGIN "
+    "INSERT INTO comments_fts(comments_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO comments_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+# Tables FTS5 creates for its own storage; alembic's autogenerate ignores them.
+SEARCH_TABLE_PREFIXES = ("tasks_fts", "comments_fts")
+
+tasks_fts = table("tasks_fts", column("rowid"), column("title"), column("description"))
+comments_fts = table("comments_fts", column("rowid"), column("content"))
+
+# Control characters mark the matches in snippets, so the text can be HTML-escaped first.
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+def rebuild_search_index(connection):
+    # Re-reads every row of the content tables; needed after a bulk load without triggers.
+    connection.exec_driver_sql("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+    connection.exec_driver_sql("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    rebuild_search_index(connection)
+
+def match_query(q: str) -> str:
+    """Turns user input into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in the input are matched as text
+    instead of raising syntax errors.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return ""
+    quoted = ['"' + word.replace('"', '""') + '"' for word in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def match(fts_table, query: str):
+    return literal_column(fts_table.name).op("MATCH")(query)
+
+def rank(fts_table, *weights: float):
+    # bm25: lower is better.
+    return func.bm25(literal_column(fts_table.name), *weights)
+
+def snippet(fts_table, tokens: int = 12):
+    # Column -1 lets FTS5 pick the column with the best match.
+    return func.snippet(literal_column(fts_table.name), -1, _MARK_START, _MARK_END, "…", tokens)
+
+def highlight(raw_snippet: str) -> str:
+    # HTML-safe snippet with the matched terms wrapped in <mark>.
+    return html.escape(raw_snippet or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
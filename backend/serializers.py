@@ -0,0 +1,150 @@
+# backend/serializers.py
+#
+# Fast response path for the large nested read models (Dashboard -> Task -> Comment ->
+# replies). Validating these ORM graphs through pydantic on every request and then
+# encoding with the stdlib json module dominates response time on big dashboards.
+#
+# serializer_for() compiles a schema once into a plain function that copies the declared
+# fields off an ORM object (or dict) into JSON-ready dicts, and FastJSONResponse encodes
+# the result with orjson. Routes keep their response_model for the OpenAPI docs and return
+# render(...) instead, which FastAPI passes through untouched. The output is the same
+# JSON the response_model produced; values are not re-validated on the way out (they were
+# validated when they were written).
+
+import enum
+import json
+import time
+import typing
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from instrumentation import record_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_MISSING = object()
+
+Serializer = Callable[[Any], Any]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson; falls back to the stdlib encoder if it isn't installed."""
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        if orjson is not None:
+            body = orjson.dumps(content)
+        else:
+            body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_json_default).encode("utf-8")
+        record_serialization(time.perf_counter() - started)
+        return body
+
+_serializers: Dict[type, Serializer] = {}
+
+def schema_fields(schema):
+    # (name, annotation, default) for each declared field, in declaration order.
+    if hasattr(schema, "model_fields"):  # pydantic 2
+        return [(name, field.annotation, _MISSING if field.is_required() else field.default) for name, field in schema.model_fields.items()]
+    return [(name, field.outer_type_, _MISSING if field.required else field.default) for name, field in schema.__fields__.items()]
+
+def _enum_value(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+def _converter(annotation, nested: Callable[[type], Serializer]) -> typing.Optional[Serializer]:
+    # None means the value is passed through as is (ints, strings, bools, datetimes).
+    # `nested` supplies the serializer for embedded schemas.
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Union:
+        # Optional[X]: None is handled by the caller.
+        inner = [arg for arg in args if arg is not type(None)]
+        return _converter(inner[0], nested) if len(inner) == 1 else None
+    if origin in (list, List):
+        item = _converter(args[0], nested) if args else None
+        if item is None:
+            return list
+        return lambda values: [item(value) for value in values]
+    if origin in (dict, Dict):
+        value_converter = _converter(args[1], nested) if args else None
+        if value_converter is None:
+            return dict
+        return lambda values: {key: value_converter(value) for key, value in values.items()}
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return nested(annotation)
+        if issubclass(annotation, enum.Enum):
+            return _enum_value
+    return None
+
+def _new_serializer(schema):
+    # Returns the serializer and its (still empty) field list; callers fill the list in
+    # after registering the function, so self-referencing schemas resolve to it.
+    fields = []
+
+    def serialize(obj):
+        if isinstance(obj, dict):
+            get = obj.get
+        else:
+            get = lambda name, default: getattr(obj, name, default)
+        result = {}
+        for name, default, convert in fields:
+            value = get(name, default)
+            if value is _MISSING:
+                raise AttributeError(f"{type(obj).__name__} has no field '{name}' required by {schema.__name__}")
+            result[name] = value if value is None or convert is None else convert(value)
+        return result
+
+    return serialize, fields
+
+def serializer_for(schema) -> Serializer:
+    """Returns the compiled serializer for a pydantic schema, building it on first use."""
+    serialize = _serializers.get(schema)
+    if serialize is None:
+        serialize, fields = _new_serializer(schema)
+        # Comment.replies refers back to this same function.
+        _serializers[schema] = serialize
+        fields.extend((name, default, _converter(annotation, serializer_for)) for name, annotation, default in schema_fields(schema))
+    return serialize
+
+def fieldset_serializer(fieldset, _compiled: Optional[dict] = None) -> Serializer:
+    """Serializer limited to a fieldsets.FieldSet; nested FieldSets shared within the tree
+    share a serializer. FieldSet.serializer() caches the result per shape."""
+    compiled = {} if _compiled is None else _compiled
+    serialize = compiled.get(id(fieldset))
+    if serialize is None:
+        serialize, fields = _new_serializer(fieldset.schema)
+        compiled[id(fieldset)] = serialize
+        for name, annotation, default in schema_fields(fieldset.schema):
+            if name in fieldset.expand:
+                child = fieldset.expand[name]
+                fields.append((name, default, _converter(annotation, lambda _schema, child=child: fieldset_serializer(child, compiled))))
+            elif fieldset.includes(name):
+                fields.append((name, default, _converter(annotation, serializer_for)))
+    return serialize
+
+def render(schema, content, status_code: int = 200, many: bool = False, fieldset=None) -> FastJSONResponse:
+    started = time.perf_counter()
+    serialize = fieldset.serializer() if fieldset is not None else serializer_for(schema)
+    body = [serialize(item) for item in content] if many else serialize(content)
+    # Encoding is timed by FastJSONResponse itself.
+    record_serialization(time.perf_counter() - started)
+    return FastJSONResponse(body, status_code=status_code)
+
+def render_page(schema, items, fieldset=None, **page) -> FastJSONResponse:
+    # {"items": [...], **page} for paginated routes whose items honour a FieldSet.
+    started = time.perf_counter()
+    serialize = fieldset.serializer() if fieldset is not None else serializer_for(schema)
+    body = {"items": [serialize(item) for item in items], **page}
+    record_serialization(time.perf_counter() - started)
+    return FastJSONResponse(body)
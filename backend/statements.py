@@ -0,0 +1,95 @@
+# backend/statements.py
+#
+# Pre-built statements for the hot read paths. Each one is built once, with bindparam
+# placeholders for the per-request values, and executed with a parameter dict; a request
+# then skips rebuilding the Query chain and the statement's cache key, and goes straight
+# to the engine's compiled-statement cache. Statements that depend on a FieldSet are
+# built once per shape and kept in a bounded registry.
+#
+# Variants that don't fit a fixed statement (worker-filtered nested tasks, the filter
+# combinations of get_task_page, id sets too large to bind) stay as ad-hoc queries in crud.
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import bindparam, literal, select
+from sqlalchemy.orm import selectinload
+
+import fieldsets, models, schemas
+
+# Statements kept per (name, variant, FieldSet shape).
+REGISTRY_SIZE = 256
+
+USER_BY_ID = select(models.User).where(models.User.id == bindparam("user_id"))
+USER_BY_EMAIL = select(models.User).where(models.User.email == bindparam("email"))
+
+_registry: "OrderedDict[tuple, object]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+def _registered(key: tuple, build):
+    with _registry_lock:
+        if key in _registry:
+            _registry.move_to_end(key)
+            return _registry[key]
+    statement = build()
+    with _registry_lock:
+        _registry[key] = statement
+        while len(_registry) > REGISTRY_SIZE:
+            _registry.popitem(last=False)
+    return statement
+
+def dashboards(fieldset: fieldsets.FieldSet, by_id: bool):
+    # Every dashboard, or (by_id) those in the expanding "dashboard_ids" parameter.
+    def build():
+        statement = select(models.Dashboard).options(*fieldset.loader_options())
+        if by_id:
+            statement = statement.where(models.Dashboard.id.in_(bindparam("dashboard_ids", expanding=True)))
+        return statement
+    return _registered(("dashboards", by_id, fieldset.key()), build)
+
+def tasks_for_dashboard(fieldset: fieldsets.FieldSet, by_id: bool):
+    # The "dashboard_id" dashboard's tasks in id order, or (by_id) those of them in "task_ids".
+    def build():
+        statement = select(models.Task).where(models.Task.dashboard_id == bindparam("dashboard_id")).options(*fieldset.loader_options())
+        if by_id:
+            statement = statement.where(models.Task.id.in_(bindparam("task_ids", expanding=True)))
+        return statement.order_by(models.Task.id)
+    return _registered(("tasks_for_dashboard", by_id, fieldset.key()), build)
+
+def comment_thread_statement(roots, max_depth=None, options: Optional[list] = None):
+    # Builds a SELECT of (Comment, depth) for the given root comment ids and all of their
+    # descendants, using one recursive CTE; authors and files are batch-loaded alongside
+    # unless other loader `options` are given. `max_depth` is an int or a bindparam. Shared
+    # by crud and crud_async so both paths return identical trees.
+    Comment = models.Comment
+    thread = select(roots.c.id, literal(0).label("depth")).cte("thread", recursive=True)
+    descendants = select(Comment.id, thread.c.depth + 1).join(thread, Comment.parent_id == thread.c.id)
+    if max_depth is not None:
+        descendants = descendants.where(thread.c.depth < max_depth)
+    thread = thread.union_all(descendants)
+    return select(Comment, thread.c.depth).join(thread, Comment.id == thread.c.id) \
+        .options(*(options if options is not None else [selectinload(Comment.author), selectinload(Comment.files)])) \
+        .order_by(Comment.created_at.asc(), Comment.id.asc())
+
+def comment_thread(fieldset: fieldsets.FieldSet, paged: bool, depth_limited: bool):
+    # The (Comment, depth) thread of task "task_id". paged: the top-level comments from
+    # "skip", at most "limit" of them; depth_limited: only down to "max_depth".
+    def build():
+        Comment = models.Comment
+        roots = select(Comment.id).where(Comment.task_id == bindparam("task_id"), Comment.parent_id.is_(None)) \
+            .order_by(Comment.created_at.asc(), Comment.id.asc())
+        if paged:
+            roots = roots.offset(bindparam("skip")).limit(bindparam("limit"))
+        max_depth = bindparam("max_depth") if depth_limited else None
+        return comment_thread_statement(roots.subquery(), max_depth, options=fieldset.loader_options())
+    return _registered(("comment_thread", paged, depth_limited, fieldset.key()), build)
+
+def prebuild():
+    """Builds the default-shape statements up front (see warmup.py)."""
+    dashboard, task, comment = (fieldsets.full(schema) for schema in (schemas.Dashboard, schemas.Task, schemas.Comment))
+    built = [USER_BY_ID, USER_BY_EMAIL]
+    for flag in (False, True):
+        built += [dashboards(dashboard, flag), tasks_for_dashboard(task, flag)]
+        built += [comment_thread(comment, flag, depth_limited) for depth_limited in (False, True)]
+    return built
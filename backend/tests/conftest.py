@@ -0,0 +1,66 @@
+# backend/tests/conftest.py
+#
+# The app reads its settings when its modules are imported, so the environment is set up
+# here, before any test module imports them: a scratch directory as the working directory
+# (uploads land in ./uploads), a fresh SQLite database in it, cheap password hashes, and
+# rate limiting and load shedding off (tests that need them switch them back on).
+# Variables already set win, so the suite can be re-run under other settings.
+#
+#   pip install -r requirements-dev.txt
+#   python -m pytest            # from backend/
+
+import os
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="task-dashboard-tests-")
+os.chdir(WORK_DIR)
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{WORK_DIR}/test.db",
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "1",
+    "RATE_LIMIT_ENABLED": "0",
+    "LOAD_SHED_ENABLED": "0",
+    "WARMUP_ENABLED": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database, models, security
+
+database.Base.metadata.create_all(bind=database.engine)
+
+import main
+
+PASSWORD = "pw"
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+def make_user(email: str, role: models.Role = models.Role.WORKER) -> int:
+    with database.SessionLocal() as db:
+        user = models.User(email=email, hashed_password=security.get_password_hash(PASSWORD), full_name=email.split("@")[0], role=role)
+        db.add(user)
+        db.commit()
+        return user.id
+
+def auth_headers(email: str) -> dict:
+    return {"Authorization": f"Bearer {security.create_access_token(data={'sub': email})}"}
+
+@pytest.fixture(scope="session")
+def users(client):
+    # One user per role, shared by the whole session: {role: (id, headers)}.
+    return {role: (make_user(f"{role.value}@example.com", role), auth_headers(f"{role.value}@example.com")) for role in models.Role}
+
+@pytest.fixture
+def dashboard_task(client, users):
+    # A new dashboard owned by the manager, with one task the worker is assigned to.
+    manager = users[models.Role.MANAGER][1]
+    worker_id = users[models.Role.WORKER][0]
+    dashboard = client.post("/dashboards/", json={"name": "Dashboard"}, headers=manager).json()
+    task = client.post("/tasks/", json={"title": "Task", "dashboard_id": dashboard["id"]}, headers=manager).json()
+    assert client.post(f"/tasks/{task['id']}/assign/{worker_id}", headers=manager).status_code == 200
+    return dashboard["id"], task["id"]
@@ -0,0 +1,39 @@
+# backend/tests/test_admission.py
+
+import uuid
+
+import pytest
+
+import admission, models
+
+@pytest.fixture
+def rate_limited(monkeypatch):
+    monkeypatch.setattr(admission, "RATE_LIMIT_ENABLED", True)
+    admission.rate_limiter.clear()
+    yield
+    admission.rate_limiter.clear()
+
+def login(client, username):
+    return client.post("/token", data={"username": username, "password": "wrong"}).status_code
+
+def test_logins_are_limited_per_username(client, users, rate_limited):
+    burst = admission.LIMITS["login"].burst
+    assert [login(client, "ceo@example.com") for _ in range(burst)] == [401] * burst
+    assert login(client, "ceo@example.com") == 429
+    # Someone else behind the same address still gets to log in.
+    assert login(client, "manager@example.com") == 401
+    assert login(client, " CEO@example.com ") == 429
+
+def test_an_address_is_only_flood_guarded(client, rate_limited, monkeypatch):
+    monkeypatch.setitem(admission.LIMITS, "auth", admission.Limit(rate=0.001, burst=3))
+    admission.rate_limiter.clear()
+    assert [login(client, f"user{n}@example.com") for n in range(4)] == [401, 401, 401, 429]
+
+def test_only_comments_with_a_file_count_as_uploads(client, users, dashboard_task, rate_limited):
+    _, task_id = dashboard_task
+    worker = users[models.Role.WORKER][1]
+    burst = admission.LIMITS["upload"].burst
+    post = lambda **files: client.post("/comments/", data={"content": "Hello", "task_id": task_id}, headers=worker, **files).status_code
+    assert [post() for _ in range(burst + 2)] == [201] * (burst + 2)
+    uploads = [post(files={"file": ("notes.txt", uuid.uuid4().bytes)}) for _ in range(burst + 1)]
+    assert uploads == [201] * burst + [429]
@@ -0,0 +1,122 @@
+# backend/tests/test_file_storage.py
+
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+from sqlalchemy import select
+from starlette.datastructures import UploadFile
+
+import crud_async, database, file_storage, models
+from principal_cache import Principal
+from routers import comments
+
+def upload(client, headers, task_id, content: bytes, filename: str = "notes.txt") -> str:
+    response = client.post("/comments/", data={"content": "See attached", "task_id": task_id}, files={"file": (filename, content)}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["files"][0]["file_path"]
+
+def blob_exists(file_name: str) -> bool:
+    return os.path.exists(os.path.join(file_storage.UPLOAD_DIRECTORY, file_name))
+
+def delete_dashboard(client, users, dashboard_id):
+    response = client.delete(f"/dashboards/{dashboard_id}", headers=users[models.Role.CEO][1])
+    assert response.status_code == 204, response.text
+    file_storage.wait_for_removals()
+
+def test_identical_uploads_share_one_blob(client, users, dashboard_task):
+    _, task_id = dashboard_task
+    worker = users[models.Role.WORKER][1]
+    content = uuid.uuid4().bytes
+    first = upload(client, worker, task_id, content)
+    assert upload(client, worker, task_id, content) == first
+    assert blob_exists(first)
+    assert not [name for name in os.listdir(file_storage.UPLOAD_DIRECTORY) if name.endswith(".part")]
+
+def test_blob_is_removed_with_its_last_reference(client, users, dashboard_task):
+    first_dashboard, first_task = dashboard_task
+    manager, worker = users[models.Role.MANAGER][1], users[models.Role.WORKER][1]
+    second_dashboard = client.post("/dashboards/", json={"name": "Second"}, headers=manager).json()["id"]
+    second_task = client.post("/tasks/", json={"title": "Task", "dashboard_id": second_dashboard}, headers=manager).json()["id"]
+    content = uuid.uuid4().bytes
+    file_name = upload(client, worker, first_task, content)
+    upload(client, manager, second_task, content)
+
+    delete_dashboard(client, users, first_dashboard)
+    assert blob_exists(file_name)
+    delete_dashboard(client, users, second_dashboard)
+    assert not blob_exists(file_name)
+
+def test_commit_upload_restores_a_blob_removed_meanwhile(client, users, dashboard_task):
+    # An upload that found its blob already stored races the deletion of the blob's last row.
+    _, task_id = dashboard_task
+    content = uuid.uuid4().bytes
+    file_name = upload(client, users[models.Role.WORKER][1], task_id, content)
+    stored = asyncio.run(file_storage.store_upload(UploadFile(io.BytesIO(content), filename="notes.txt")))
+    assert stored.file_name == file_name
+    temp_path = stored.temp_path
+
+    with database.SessionLocal() as db:
+        comment_id = db.scalars(select(models.File.comment_id).where(models.File.file_path == file_name)).one()
+        db.delete(db.scalars(select(models.File).where(models.File.file_path == file_name)).one())
+        db.commit()
+    file_storage.wait_for_removals()
+    assert not blob_exists(file_name)
+
+    with database.SessionLocal() as db:
+        db.add(models.File(file_name="notes.txt", file_path=file_name, comment_id=comment_id))
+        db.commit()
+    asyncio.run(file_storage.commit_upload(stored))
+    assert blob_exists(file_name)
+    assert not os.path.exists(temp_path)
+
+def test_discard_upload_keeps_a_blob_that_is_referenced(client, users, dashboard_task):
+    _, task_id = dashboard_task
+    content = uuid.uuid4().bytes
+    file_name = upload(client, users[models.Role.WORKER][1], task_id, content)
+
+    stored = asyncio.run(file_storage.store_upload(UploadFile(io.BytesIO(content), filename="notes.txt")))
+    temp_path = stored.temp_path
+    asyncio.run(file_storage.discard_upload(stored))
+    assert blob_exists(file_name)
+    assert not os.path.exists(temp_path)
+
+    unreferenced = asyncio.run(file_storage.store_upload(UploadFile(io.BytesIO(uuid.uuid4().bytes), filename="notes.txt")))
+    assert blob_exists(unreferenced.file_name)
+    asyncio.run(file_storage.discard_upload(unreferenced))
+    assert not blob_exists(unreferenced.file_name)
+
+def test_a_cancelled_comment_leaves_no_upload_behind(users, dashboard_task, monkeypatch):
+    # E.g. the client disconnecting while the comment is being saved.
+    _, task_id = dashboard_task
+    upload_file = UploadFile(io.BytesIO(uuid.uuid4().bytes), filename="notes.txt")
+
+    async def cancelled(*args, **kwargs):
+        raise asyncio.CancelledError
+
+    async def post():
+        async with database.AsyncSessionLocal() as db:
+            user = await crud_async.get_user_by_email(db, "worker@example.com")
+            await comments.create_comment_with_file(content="See attached", task_id=task_id, parent_id=None, file=upload_file, db=db, current_user=Principal.from_user(user))
+
+    monkeypatch.setattr(crud_async, "create_comment", cancelled)
+    before = set(os.listdir(file_storage.UPLOAD_DIRECTORY))
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(post())
+    assert set(os.listdir(file_storage.UPLOAD_DIRECTORY)) == before
+
+@pytest.mark.skipif(os.getenv("DB_READ_POOL_SIZE", "0") != "0", reason="already running with the read pool")
+def test_with_the_read_pool_enabled(tmp_path):
+    # The writer pool then has a single connection, which the session deleting a blob's
+    # last row still holds when the removal is queued. Settings are read at import, so the
+    # tests above run again in a fresh process; a removal waiting on that connection would
+    # time out after DB_POOL_TIMEOUT.
+    environment = {**os.environ, "DB_READ_POOL_SIZE": "2", "DB_POOL_TIMEOUT": "3"}
+    environment.pop("DATABASE_URL", None)
+    result = subprocess.run([sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", __file__],
+                            cwd=os.path.dirname(os.path.dirname(__file__)), env=environment, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
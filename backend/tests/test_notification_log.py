@@ -0,0 +1,72 @@
+# backend/tests/test_notification_log.py
+
+import asyncio
+
+import pytest
+from fastapi import status
+from starlette.websockets import WebSocketDisconnect
+
+import models
+from connection_manager import manager
+from notification_log import NotificationLog
+
+def append(log, user_id, count, dedup_key=None):
+    return [asyncio.run(log.append({"type": "note", "payload": {}}, [user_id], dedup_key=dedup_key)) for _ in range(count)]
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_missed_messages_are_replayed(users, persist):
+    user_id = users[models.Role.WORKER][0]
+    log = NotificationLog(persist=persist)
+    first = append(log, user_id, 1)[0][user_id]
+    append(log, user_id, 2)
+    assert [message["seq"] for message in asyncio.run(log.since(user_id, first))] == [first + 1, first + 2]
+    assert asyncio.run(log.since(user_id, first + 2)) == []
+
+def test_gap_past_the_buffer_needs_a_resync():
+    log = NotificationLog(capacity=2, persist=False)
+    append(log, 1, 5)
+    assert asyncio.run(log.since(1, 1)) is None
+    assert [message["seq"] for message in asyncio.run(log.since(1, 3))] == [4, 5]
+
+def test_seq_from_before_a_restart_needs_a_resync():
+    log = NotificationLog(persist=False)
+    append(log, 1, 3)
+    restarted = NotificationLog(persist=False)
+    assert asyncio.run(restarted.since(1, 3)) is None
+    assert asyncio.run(restarted.since(1, 0)) == []
+    append(restarted, 1, 1)
+    # Seq 1 of the new log isn't the seq 1 the client saw before the restart.
+    assert asyncio.run(restarted.since(1, 3)) is None
+
+def test_persisted_seqs_survive_a_restart(users):
+    user_id = users[models.Role.MANAGER][0]
+    log = NotificationLog(persist=True)
+    last = append(log, user_id, 3)[-1][user_id]
+    restarted = NotificationLog(persist=True)
+    assert asyncio.run(restarted.since(user_id, last)) == []
+    assert [message["seq"] for message in asyncio.run(restarted.since(user_id, last - 2))] == [last - 1, last]
+    assert asyncio.run(restarted.since(user_id, last + 5)) is None
+
+def test_a_retried_message_reaches_each_user_once():
+    log = NotificationLog(persist=False)
+    assert append(log, 7, 1, dedup_key="outbox:1") == [{7: 1}]
+    assert append(log, 7, 1, dedup_key="outbox:1") == [{}]
+    assert log.last_seq(7) == 1
+
+def socket_token(users, role):
+    return users[role][1]["Authorization"].split()[1]
+
+def test_socket_reconnecting_with_an_unknown_seq_is_told_to_resync(client, users):
+    user_id = users[models.Role.CEO][0]
+    last = manager.log.last_seq(user_id)
+    with client.websocket_connect(f"/ws/{user_id}?token={socket_token(users, models.Role.CEO)}&last_seq={last + 10}") as websocket:
+        assert websocket.receive_json() == {"type": "resync_required", "payload": {"seq": last}}
+
+@pytest.mark.parametrize("query", ["", "?token=invalid", "?token={worker}", "?last_seq=0"])
+def test_socket_needs_its_own_users_token(client, users, query):
+    user_id = users[models.Role.CEO][0]
+    asyncio.run(manager.send_personal_message({"type": "note", "payload": {}}, user_id))
+    with pytest.raises(WebSocketDisconnect) as rejected:
+        with client.websocket_connect(f"/ws/{user_id}" + query.format(worker=socket_token(users, models.Role.WORKER))):
+            pass
+    assert rejected.value.code == status.WS_1008_POLICY_VIOLATION
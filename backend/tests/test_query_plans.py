@@ -0,0 +1,10 @@
+# backend/tests/test_query_plans.py
+
+from benchmarks import query_plans
+
+def test_no_unexpected_full_table_scans():
+    # A dropped index or a new unindexed filter fails here; if reading the whole table is
+    # really the point of a query, list it in query_plans.ALLOWED_SCANS.
+    checked, offending = query_plans.find_unexpected_scans()
+    assert checked > 0
+    assert not offending, "\n".join(query_plans.describe(*entry) for entry in offending)
@@ -0,0 +1,40 @@
+# backend/tests/test_sync.py
+
+import models
+from conftest import auth_headers, make_user
+
+def pull(client, headers, since, limit):
+    response = client.get("/sync", params={"since": since, "limit": limit}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_sync_pages_through_every_change(client, users):
+    manager = users[models.Role.MANAGER][1]
+    dashboard_id = client.post("/dashboards/", json={"name": "Synced"}, headers=manager).json()["id"]
+    task_ids = {client.post("/tasks/", json={"title": f"Task {n}", "dashboard_id": dashboard_id}, headers=manager).json()["id"] for n in range(5)}
+
+    seen, since, pages = set(), 0, 0
+    while True:
+        page = pull(client, manager, since, limit=2)
+        pages += 1
+        assert page["cursor"] >= since
+        seen.update(task["id"] for task in page["tasks"])
+        since = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert task_ids <= seen
+    assert pages > 1
+    assert pull(client, manager, since, limit=2) == {"cursor": since, "has_more": False, "dashboards": [], "tasks": [], "comments": [], "deleted": []}
+
+def test_dashboard_tombstones_only_reach_its_workers(client, users, dashboard_task):
+    dashboard_id, _ = dashboard_task
+    worker = users[models.Role.WORKER][1]
+    make_user("outsider@example.com")
+    outsider = auth_headers("outsider@example.com")
+    worker_since = pull(client, worker, 0, limit=2000)["cursor"]
+    outsider_since = pull(client, outsider, 0, limit=2000)["cursor"]
+
+    assert client.delete(f"/dashboards/{dashboard_id}", headers=users[models.Role.CEO][1]).status_code == 204
+    tombstone = {"entity_type": "dashboard", "entity_id": dashboard_id}
+    assert pull(client, worker, worker_since, limit=2000)["deleted"].count(tombstone) == 1
+    assert tombstone not in pull(client, outsider, outsider_since, limit=2000)["deleted"]
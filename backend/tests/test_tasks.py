@@ -0,0 +1,17 @@
+# backend/tests/test_tasks.py
+
+import models
+
+def test_bulk_assign_reports_a_repeated_pair_once(client, users):
+    manager = users[models.Role.MANAGER][1]
+    worker_id, ceo_id = users[models.Role.WORKER][0], users[models.Role.CEO][0]
+    dashboard_id = client.post("/dashboards/", json={"name": "Bulk"}, headers=manager).json()["id"]
+    task_id = client.post("/tasks/", json={"title": "Task", "dashboard_id": dashboard_id}, headers=manager).json()["id"]
+    assignments = [{"task_id": task_id, "user_id": worker_id}, {"task_id": task_id, "user_id": worker_id},
+                   {"task_id": task_id, "user_id": ceo_id}, {"task_id": task_id + 1000, "user_id": worker_id}]
+
+    response = client.post("/tasks/bulk/assign", json={"assignments": assignments}, headers=manager)
+    assert response.status_code == 200, response.text
+    assert [result["status"] for result in response.json()] == ["assigned", "already_assigned", "assigned", "task_not_found"]
+    response = client.post("/tasks/bulk/assign", json={"assignments": assignments[:1]}, headers=manager)
+    assert [result["status"] for result in response.json()] == ["already_assigned"]
@@ -0,0 +1,66 @@
+# backend/versioning.py
+#
+# Keeps `row_version` current on dashboards, tasks and comments, and writes tombstones for
+# deleted ones, from a session hook, so every write path (crud, crud_async, cascades) is
+# covered. All rows written by one flush share the next value of the change counter.
+# SQLite holds the write lock from that increment until commit, so versions become
+# visible in order and a client's `since` cursor never skips a row.
+
+from sqlalchemy import event, insert, select, union, update
+from sqlalchemy.orm import Session
+
+import models
+
+VERSIONED = {models.Dashboard: "dashboard", models.Task: "task", models.Comment: "comment"}
+
+def next_version(session: Session) -> int:
+    counter = models.ChangeCounter.__table__
+    version = session.execute(
+        update(counter).where(counter.c.id == 1).values(version=counter.c.version + 1).returning(counter.c.version)
+    ).scalar()
+    if version is None:
+        session.execute(insert(counter).values(id=1, version=1))
+        version = 1
+    return version
+
+def _tombstone(obj, version: int) -> dict:
+    if isinstance(obj, models.Dashboard):
+        dashboard_id, owner_id = obj.id, obj.owner_id
+    elif isinstance(obj, models.Task):
+        dashboard_id = obj.dashboard_id
+        owner_id = obj.dashboard.owner_id if obj.dashboard else None
+    else:
+        task = obj.task
+        dashboard_id = task.dashboard_id if task else None
+        owner_id = task.dashboard.owner_id if task and task.dashboard else None
+    return {"entity_type": VERSIONED[type(obj)], "entity_id": obj.id, "dashboard_id": dashboard_id, "owner_id": owner_id, "row_version": version}
+
+def _worker_tombstones(session: Session, dashboard_ids: list, version: int) -> list:
+    # A deleted dashboard drops out of its workers' visibility together with their
+    # assignments, so each worker who had a task in it, live or archived, gets a copy of its
+    # tombstone addressed to them.
+    assigned = union(*(
+        select(task.dashboard_id, workers.user_id).join(workers, workers.task_id == task.id).where(task.dashboard_id.in_(dashboard_ids))
+        for task, workers in ((models.Task, models.TaskWorkers), (models.ArchivedTask, models.ArchivedTaskWorkers))
+    ))
+    return [
+        {"entity_type": "dashboard", "entity_id": dashboard_id, "dashboard_id": dashboard_id, "user_id": user_id, "row_version": version}
+        for dashboard_id, user_id in session.execute(assigned)
+    ]
+
+@event.listens_for(Session, "before_flush")
+def _stamp_row_versions(session, flush_context, instances):
+    written = [obj for obj in session.new if type(obj) in VERSIONED]
+    written += [obj for obj in session.dirty if type(obj) in VERSIONED and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if type(obj) in VERSIONED]
+    if not written and not deleted:
+        return
+    version = next_version(session)
+    for obj in written:
+        obj.row_version = version
+    if deleted:
+        tombstones = [_tombstone(obj, version) for obj in deleted]
+        dashboard_ids = [obj.id for obj in deleted if isinstance(obj, models.Dashboard)]
+        if dashboard_ids:
+            tombstones += _worker_tombstones(session, dashboard_ids, version)
+        session.execute(insert(models.Tombstone), tombstones)
@@ -0,0 +1,226 @@
+# backend/visibility.py
+#
+# Who can see what, computed once per user and cached. A Visibility holds the ids of the
+# dashboards and tasks a user may see:
+#   CEO      everything
+#   manager  the dashboards they own, and every task in them
+#   worker   the tasks assigned to them, and the dashboards those tasks belong to
+#
+# crud builds its listing filters from it and the routers check single dashboards, tasks
+# and comments against it, so every read and write goes through the same rules without
+# re-joining task_workers on each request.
+#
+# Entries are dropped once a commit changes what a user can see: worker assignments, a
+# task's dashboard, a dashboard's owner, new or deleted dashboards. The hooks below catch
+# ORM flushes; Core/bulk statements call mark_stale() themselves (see crud's bulk
+# operations). Writes this process never sees (manual SQL, other app processes) are picked
+# up when the entry's TTL runs out.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+import models
+from dashboard_stats import task_workers
+
+VISIBILITY_CACHE_TTL_SECONDS = float(os.getenv("VISIBILITY_CACHE_TTL_SECONDS", "60"))
+VISIBILITY_CACHE_MAX_ENTRIES = int(os.getenv("VISIBILITY_CACHE_MAX_ENTRIES", "10000"))
+
+# Larger id sets are filtered with a subquery instead of bound parameters, staying well
+# under SQLite's bound-parameter limit.
+IN_LIST_MAX = 5000
+
+@dataclass(frozen=True)
+class Visibility:
+    user_id: int
+    role: models.Role
+    # None means every dashboard.
+    dashboard_ids: Optional[FrozenSet[int]]
+    # None means every task of the visible dashboards.
+    task_ids: Optional[FrozenSet[int]]
+
+    @property
+    def sees_nothing(self) -> bool:
+        return self.dashboard_ids is not None and not self.dashboard_ids
+
+    def can_view_dashboard(self, dashboard_id: Optional[int]) -> bool:
+        return self.dashboard_ids is None or dashboard_id in self.dashboard_ids
+
+    def can_view_task(self, task_id: int, dashboard_id: Optional[int]) -> bool:
+        if self.task_ids is not None:
+            return task_id in self.task_ids
+        return self.can_view_dashboard(dashboard_id)
+
+    def dashboard_filter(self, dashboard_id_column):
+        # WHERE clause limiting `dashboard_id_column` to visible dashboards; None if unrestricted.
+        if self.dashboard_ids is None:
+            return None
+        if len(self.dashboard_ids) <= IN_LIST_MAX:
+            return dashboard_id_column.in_(self.dashboard_ids)
+        return dashboard_id_column.in_(self._dashboard_subquery())
+
+    def task_filter(self, task_id_column, dashboard_id_column=None):
+        # WHERE clause limiting `task_id_column` to visible tasks; None if unrestricted. Pass
+        # the task's dashboard column when the query has it, to filter managers by dashboard.
+        if self.task_ids is not None:
+            if len(self.task_ids) <= IN_LIST_MAX:
+                return task_id_column.in_(self.task_ids)
+            return task_id_column.in_(select(models.TaskWorkers.task_id).where(models.TaskWorkers.user_id == self.user_id))
+        if self.dashboard_ids is None:
+            return None
+        if dashboard_id_column is not None:
+            return self.dashboard_filter(dashboard_id_column)
+        return task_id_column.in_(select(models.Task.id).where(self.dashboard_filter(models.Task.dashboard_id)))
+
+    def _dashboard_subquery(self):
+        if self.role == models.Role.MANAGER:
+            return select(models.Dashboard.id).where(models.Dashboard.owner_id == self.user_id)
+        return select(models.Task.dashboard_id).join(models.TaskWorkers, models.TaskWorkers.task_id == models.Task.id) \
+            .where(models.TaskWorkers.user_id == self.user_id)
+
+def compute(db: Session, user) -> Visibility:
+    if user.role == models.Role.CEO:
+        return Visibility(user.id, user.role, None, None)
+    if user.role == models.Role.MANAGER:
+        dashboards = db.scalars(select(models.Dashboard.id).where(models.Dashboard.owner_id == user.id))
+        return Visibility(user.id, user.role, frozenset(dashboards), None)
+    if user.role == models.Role.WORKER:
+        rows = db.execute(select(models.TaskWorkers.task_id, models.Task.dashboard_id).join(models.Task, models.Task.id == models.TaskWorkers.task_id)
+                          .where(models.TaskWorkers.user_id == user.id)).all()
+        return Visibility(user.id, user.role, frozenset(d for _, d in rows if d is not None), frozenset(t for t, _ in rows))
+    return Visibility(user.id, user.role, frozenset(), frozenset())
+
+class VisibilityCache:
+    """Bounded LRU of user id -> Visibility with a TTL."""
+
+    def __init__(self, max_entries: int = VISIBILITY_CACHE_MAX_ENTRIES, ttl_seconds: float = VISIBILITY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple[Visibility, float]]" = OrderedDict()
+        # Bumped by every invalidation. A Visibility computed while it changed may predate
+        # the commit that caused it, so it is returned but not cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user) -> Optional[Visibility]:
+        with self._lock:
+            entry = self._entries.get(user.id)
+            # An entry for another role is stale: the role changed since it was computed.
+            if entry is None or entry[1] <= time.time() or entry[0].role != user.role:
+                if entry is not None:
+                    del self._entries[user.id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user.id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, visibility: Visibility, generation: int):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries.pop(visibility.user_id, None)
+            self._entries[visibility.user_id] = (visibility, time.time() + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def for_user(self, db: Session, user) -> Visibility:
+        visibility = self.get(user)
+        if visibility is None:
+            generation = self._generation
+            visibility = compute(db, user)
+            self.put(visibility, generation)
+        return visibility
+
+    async def for_user_async(self, db, user) -> Visibility:
+        # AsyncSession variant; only a cache miss touches the database.
+        visibility = self.get(user)
+        if visibility is None:
+            generation = self._generation
+            visibility = await db.run_sync(compute, user)
+            self.put(visibility, generation)
+        return visibility
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+visibility_cache = VisibilityCache()
+
+def for_user(db: Session, user) -> Visibility:
+    return visibility_cache.for_user(db, user)
+
+# Like principal_cache, entries are dropped after the commit rather than at flush time, so
+# a concurrent request can't re-cache the old sets before the commit lands.
+ALL_USERS = "*"
+
+def mark_stale(session: Session, user_ids: Iterable[int]):
+    # Queues the users' entries for invalidation when `session` commits.
+    session.info.setdefault("stale_visibility", set()).update(user_ids)
+
+@event.listens_for(Session, "before_flush")
+def _track_visibility_changes(session, flush_context, instances):
+    stale = set()
+    for obj in session.deleted:
+        if isinstance(obj, models.Dashboard):
+            # Takes its tasks and their assignments along; rare enough to start over.
+            mark_stale(session, [ALL_USERS])
+            return
+    for obj in session.new:
+        if isinstance(obj, models.Dashboard):
+            stale.add(obj.owner_id)
+        elif isinstance(obj, models.Task):
+            stale.update(user.id for user in obj.workers)
+    for obj in session.dirty:
+        if isinstance(obj, models.Dashboard):
+            history = inspect(obj).attrs.owner_id.history
+            stale.update([*history.added, *history.deleted])
+        elif isinstance(obj, models.Task):
+            state = inspect(obj)
+            if state.attrs.dashboard_id.history.has_changes():
+                before, after = task_workers(session, obj)
+                stale.update(before + after)
+            else:
+                history = state.attrs.workers.history
+                stale.update(user.id for user in [*history.added, *history.deleted])
+    for obj in session.deleted:
+        if isinstance(obj, models.Task):
+            stale.update(task_workers(session, obj)[0])
+    stale.discard(None)
+    if stale:
+        mark_stale(session, stale)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_visibility(session):
+    stale = session.info.pop("stale_visibility", None)
+    if not stale:
+        return
+    if ALL_USERS in stale:
+        visibility_cache.clear()
+    else:
+        visibility_cache.invalidate_users(stale)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_visibility(session):
+    session.info.pop("stale_visibility", None)
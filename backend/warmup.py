@@ -0,0 +1,105 @@
+# backend/warmup.py
+#
+# Startup warm-up, run from the app's lifespan before it takes traffic, so the first
+# requests after a deploy or scale-out don't pay one-time costs:
+#   - mapper configuration, which SQLAlchemy otherwise does on the first query
+#   - the routes' request validators and dependency graphs, which FastAPI builds on a
+#     route's first match; generating the OpenAPI schema builds them all
+#   - pydantic validators of schemas whose build was deferred (e.g. by forward references)
+#   - response serializers and loader options for the default response shapes
+#   - the pre-built statements in statements.py, compiled into each engine's cache by
+#     running them once with parameters that match nothing
+#   - the connection pools, opened up to their configured size (for SQLite this also runs
+#     the connection pragmas)
+#
+# Warm-up is best effort: a failure is logged and the app starts anyway. Set
+# WARMUP_ENABLED=0 to skip it.
+
+import inspect
+import logging
+import os
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+import database, fieldsets, schemas, serializers, statements
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+
+# Response schemas whose serializers are built up front.
+RESPONSE_SCHEMAS = (
+    schemas.User, schemas.Dashboard, schemas.DashboardSummaryPage, schemas.DashboardStats, schemas.Task, schemas.TaskPage,
+    schemas.Comment, schemas.SearchPage, schemas.SyncResponse, schemas.BulkTaskResult, schemas.BulkAssignmentResult,
+)
+
+# Parameters for running each pre-built statement without matching a row.
+NO_MATCH = {"user_id": -1, "email": "", "dashboard_id": -1, "dashboard_ids": [-1], "task_id": -1, "task_ids": [-1],
+            "skip": 0, "limit": 1, "max_depth": 0}
+
+def _pool_size(engine) -> int:
+    # In-memory SQLite pools don't report a size; one connection is all they hold.
+    size = getattr(engine.pool, "size", None)
+    return size() if callable(size) else 1
+
+def _warm_pool(engine):
+    connections = []
+    try:
+        for _ in range(_pool_size(engine)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+def warm_up(app=None):
+    """Synchronous part of the warm-up; run it off the event loop."""
+    started = time.perf_counter()
+    configure_mappers()
+    if app is not None:
+        app.openapi()
+    for schema in vars(schemas).values():
+        if inspect.isclass(schema) and issubclass(schema, BaseModel) and schema is not BaseModel and getattr(schema, "__pydantic_complete__", True) is False:
+            schema.model_rebuild()
+    for schema in RESPONSE_SCHEMAS:
+        serializers.serializer_for(schema)
+    for schema in fieldsets.SCHEMA_MODELS:
+        fieldset = fieldsets.full(schema)
+        fieldset.loader_options()
+        fieldset.serializer()
+    prebuilt = statements.prebuild()
+
+    engines = {database.engine: database.SessionLocal, database.read_engine: database.ReadSessionLocal}
+    for engine, session_factory in engines.items():
+        try:
+            _warm_pool(engine)
+            with session_factory() as db:
+                for statement in prebuilt:
+                    db.execute(statement, NO_MATCH).all()
+                db.rollback()
+        except Exception:
+            logger.warning("Warm-up of %s failed", engine.url, exc_info=True)
+    logger.info("Warm-up took %.0f ms", (time.perf_counter() - started) * 1000)
+
+async def warm_up_async():
+    """Warms the async engine's pool and the statements the async routes run."""
+    engine = database.async_engine
+    try:
+        connections = []
+        try:
+            for _ in range(_pool_size(engine.sync_engine)):
+                connection = await engine.connect()
+                connections.append(connection)
+                await connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                await connection.close()
+        async with database.AsyncSessionLocal() as db:
+            # The principal lookup behind get_current_user.
+            (await db.execute(statements.USER_BY_EMAIL, NO_MATCH)).all()
+    except Exception:
+        logger.warning("Warm-up of %s failed", engine.url, exc_info=True)